@@ -1,27 +1,201 @@
 from flask import Flask, render_template
+from datetime import timedelta
 import os
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-this-in-production'
 
-# Create directories if they don't exist
-os.makedirs('generated_resumes', exist_ok=True)
-os.makedirs('database', exist_ok=True)
+def load_config(app):
+    """Defaults, overridable through environment variables"""
+    # Sessions are server-side (sessions.py): the cookie is a random id, not signed data
+    app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
 
-# Import blueprints 
-from auth_routes import auth_bp
-from dashboard_routes import dashboard_bp
-from resume_routes import resume_bp
+    # SQLite database file
+    app.config['DATABASE'] = os.environ.get('DATABASE', 'users.db')
 
-# Register blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(resume_bp)
+    # PDF render pool: worker processes and how many jobs may wait before we return 429
+    app.config['RENDER_POOL_SIZE'] = int(os.environ.get('RENDER_POOL_SIZE', os.cpu_count() or 2))
+    app.config['RENDER_QUEUE_DEPTH'] = int(os.environ.get('RENDER_QUEUE_DEPTH', 32))
+    app.config['RENDER_JOB_TIMEOUT'] = int(os.environ.get('RENDER_JOB_TIMEOUT', 300))
+
+    # 'pool' renders in worker processes behind the job queue; 'memory' renders into a
+    # buffer in the request and streams it straight back, persisting afterwards if PDF_PERSIST
+    app.config['PDF_RENDER_MODE'] = os.environ.get('PDF_RENDER_MODE', 'pool')
+    app.config['PDF_PERSIST'] = os.environ.get('PDF_PERSIST', '1') == '1'
+
+    # Largest JSONL/CSV batch accepted by /bulk_generate
+    app.config['BULK_MAX_RECORDS'] = int(os.environ.get('BULK_MAX_RECORDS', 1000))
+
+    # Upper bound for the content-addressed PDF cache (LRU evicted past this)
+    app.config['RENDER_CACHE_MAX_BYTES'] = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+    # SQLite connection pool (per process)
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 8))
+    app.config['DB_BUSY_TIMEOUT_MS'] = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+
+    # Resumes per dashboard page
+    app.config['DASHBOARD_PAGE_SIZE'] = int(os.environ.get('DASHBOARD_PAGE_SIZE', 20))
+
+    # Threads running blocking work when served over ASGI (asgi.py); open connections don't hold one
+    app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 64))
+
+    # Where generated PDFs live (see storage.py): 'filesystem' (sharded under STORAGE_DIR) or 's3'
+    app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'filesystem')
+    app.config['STORAGE_DIR'] = os.environ.get('STORAGE_DIR', 'static/resumes')
+    app.config['STORAGE_SHARD_DEPTH'] = int(os.environ.get('STORAGE_SHARD_DEPTH', 2))
+    # Any S3-compatible endpoint, e.g. http://localhost:9000 for a local MinIO
+    app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+    app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+    app.config['S3_ACCESS_KEY_ID'] = os.environ.get('S3_ACCESS_KEY_ID')
+    app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get('S3_SECRET_ACCESS_KEY')
+    app.config['S3_REGION'] = os.environ.get('S3_REGION', 'us-east-1')
+    app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+    app.config['S3_POOL_SIZE'] = int(os.environ.get('S3_POOL_SIZE', 16))
+    # Object storage downloads redirect to a presigned bucket URL valid this long, bypassing the app
+    app.config['STORAGE_PRESIGNED_URLS'] = os.environ.get('STORAGE_PRESIGNED_URLS', '1') == '1'
+    app.config['STORAGE_PRESIGN_SECONDS'] = int(os.environ.get('STORAGE_PRESIGN_SECONDS', 300))
+
+    # Reverse proxies in front of the app (e.g. 1 for nginx): trust that many X-Forwarded-For/-Proto/-Host
+    # hops, so request.remote_addr (the login rate limiter's per-IP key) is the client, not the proxy.
+    # Leave 0 when clients reach the app directly, or they could spoof their address.
+    app.config['PROXY_FIX_HOPS'] = int(os.environ.get('PROXY_FIX_HOPS', 0))
+
+    # Let the front proxy ship PDF bytes: X-Sendfile, or nginx X-Accel-Redirect to an internal location
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+    app.config['PDF_ACCEL_REDIRECT_PREFIX'] = os.environ.get('PDF_ACCEL_REDIRECT_PREFIX')
+
+    # Export pipeline (see exports.py): in-process cache for non-PDF formats and writer threads
+    app.config['EXPORT_CACHE_MAX_BYTES'] = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['EXPORT_THREADS'] = int(os.environ.get('EXPORT_THREADS', 4))
+
+    # Login sessions (see sessions.py): 'sqlite' is shared by all workers, 'memory' is per process
+    app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=int(os.environ.get('SESSION_LIFETIME_HOURS', 24 * 7)))
+    app.config['SESSION_COOKIE_SECURE'] = os.environ.get('SESSION_COOKIE_SECURE') == '1'
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['SESSION_USER_CACHE_SIZE'] = int(os.environ.get('SESSION_USER_CACHE_SIZE', 10000))
+
+    # Maintenance (see maintenance.py): opt in to running due tasks in each worker (or use cron), cold-storage
+    # directory, archive resumes older than RETENTION_DAYS and cap each user's saved resumes (0 = no limit)
+    app.config['MAINTENANCE_SCHEDULER'] = os.environ.get('MAINTENANCE_SCHEDULER') == '1'
+    app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', 'archive')
+    app.config['RETENTION_DAYS'] = int(os.environ.get('RETENTION_DAYS', 0))
+    app.config['QUOTA_MAX_RESUMES'] = int(os.environ.get('QUOTA_MAX_RESUMES', 0))
+    app.config['QUOTA_MAX_BYTES'] = int(os.environ.get('QUOTA_MAX_BYTES', 0))
+    app.config['VACUUM_PAGES'] = int(os.environ.get('VACUUM_PAGES', 2000))
+
+    # Startup (see warmup.py): PRELOAD_APP is set by gunicorn.conf.py when the app is built once in the
+    # gunicorn master and forked; WARM_ON_START loads the renderer and caches before serving instead of lazily
+    app.config['PRELOAD_APP'] = os.environ.get('PRELOAD_APP') == '1'
+    app.config['WARM_ON_START'] = os.environ.get('WARM_ON_START') == '1'
+
+    # Serve minified, fingerprinted, precompressed JS/CSS (see assets.py)
+    app.config['ASSETS_ENABLED'] = os.environ.get('ASSETS_ENABLED', '1') == '1'
+
+    # Opt-in profiling: sample this fraction of requests and keep profiles of those slower than PROFILE_SLOW_MS
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_SLOW_MS'] = int(os.environ.get('PROFILE_SLOW_MS', 500))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+    # /metrics answers scrapers sending "Authorization: Bearer <METRICS_TOKEN>"; without a token, loopback clients only
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+    # Password hashing: Werkzeug method string (work factor), hashing threads and how many may wait
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000000')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+
+    # Login/signup attempts per minute (token bucket refill) and burst, per email and per client IP
+    app.config['LOGIN_EMAIL_RATE_PER_MINUTE'] = int(os.environ.get('LOGIN_EMAIL_RATE_PER_MINUTE', 5))
+    app.config['LOGIN_EMAIL_BURST'] = int(os.environ.get('LOGIN_EMAIL_BURST', 10))
+    app.config['LOGIN_IP_RATE_PER_MINUTE'] = int(os.environ.get('LOGIN_IP_RATE_PER_MINUTE', 30))
+    app.config['LOGIN_IP_BURST'] = int(os.environ.get('LOGIN_IP_BURST', 60))
+
+
+def create_app(config=None):
+    """
+    Build the Flask app. `config` (a dict) is applied over the environment
+    defaults, e.g. create_app({'DATABASE': 'test.db', 'PDF_RENDER_MODE': 'memory'}).
+    """
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.from_mapping(config)
+
+    if app.config['PROXY_FIX_HOPS']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    import storage
+    storage.configure(storage.settings_from_config(app.config))
+
+    import models
+    models.set_database(app.config['DATABASE'])
+    models.init_db()
+    models.init_app(app)
+
+    # Server-side sessions; before assets.init_app, which wraps the interface
+    import sessions
+    sessions.init_app(app)
+
+    import passwords
+    passwords.configure(method=app.config['PASSWORD_HASH_METHOD'],
+                        workers=app.config['PASSWORD_HASH_WORKERS'],
+                        queue=app.config['PASSWORD_HASH_QUEUE'])
+
+    import exports
+    exports.configure(max_bytes=app.config['EXPORT_CACHE_MAX_BYTES'], threads=app.config['EXPORT_THREADS'])
+
+    # Request timing histograms and /metrics
+    from metrics import init_app as init_metrics
+    init_metrics(app)
+
+    # Import blueprints 
+    from auth_routes import auth_bp
+    from dashboard_routes import dashboard_bp
+    from resume_routes import resume_bp
+
+    # Register blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(resume_bp)
+
+    # Hashed static URLs
+    import assets
+    assets.init_app(app)
+
+    @app.route('/')
+    def index():
+        """Landing page"""
+        return render_template('index.html')
+
+    if app.config['PRELOAD_APP'] or app.config['WARM_ON_START']:
+        import warmup
+        warmup.warm(app)
+    # Threads don't survive a fork: a preloaded app starts them in each worker (gunicorn.conf.py)
+    if not app.config['PRELOAD_APP']:
+        start_background(app)
+    return app
+
+
+def start_background(app):
+    """Start this process's background threads"""
+    # Template picker images, built from the template definitions if missing
+    import template_previews
+    template_previews.warm_in_background()
+
+    # Vacuum, archiving, quotas and cleanup as they fall due
+    if app.config['MAINTENANCE_SCHEDULER']:
+        import maintenance
+        maintenance.start_scheduler(maintenance.settings_from_config(app.config))
+
+
+def __getattr__(name):
+    """`app` is built on first use, so `gunicorn app:app` works and importing create_app doesn't build one"""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@app.route('/')
-def index():
-    """Landing page"""
-    return render_template('index.html')
 
 if __name__ == '__main__':
-    app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='127.0.0.1', port=5000)
@@ -0,0 +1,185 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:application --workers 4
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+
+The Flask app itself stays WSGI. This bridge does all socket I/O on the
+event loop and runs the blocking work (SQLite lookups, password hashing,
+template rendering, file reads) on a thread pool of ASGI_THREADS threads.
+
+A response body is pulled from the app one chunk at a time, and the thread
+is released while the chunk is sent. A slow client downloading a PDF
+therefore holds an open connection, not a worker slot, and one process can
+keep thousands of such downloads open. CPU-bound rendering stays in the
+render process pool, as under gunicorn.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import sys
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+# Request bodies (bulk uploads) past this size are spooled to a temp file
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+class FileWrapper:
+    """wsgi.file_wrapper reading CHUNK_SIZE blocks, so a download costs one thread hop per block"""
+
+    def __init__(self, filelike, blksize=CHUNK_SIZE):
+        self.filelike = filelike
+        self.blksize = blksize
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self.filelike.read(self.blksize)
+        if data:
+            return data
+        raise StopIteration
+
+    def close(self):
+        if hasattr(self.filelike, 'close'):
+            self.filelike.close()
+
+
+class WSGIBridge:
+    """Serve a WSGI app over ASGI without tying a thread to each open response"""
+
+    def __init__(self, wsgi_app, threads=64):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                from render_pool import shutdown_pool
+                await asyncio.get_running_loop().run_in_executor(None, shutdown_pool, True)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                more_body = message.get('more_body', False)
+            body.seek(0)
+            await self._respond(self._environ(scope, body), send)
+        finally:
+            body.close()
+
+    async def _respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        response = {}
+        written = []
+        # Every step of one response runs in the same context, whichever thread picks it up:
+        # stream_with_context generators keep Flask's request context in context variables
+        context = contextvars.copy_context()
+
+        def in_thread(fn, *args):
+            return loop.run_in_executor(self.executor, context.run, fn, *args)
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = status
+            response['headers'] = headers
+            return written.append       # legacy write() callable
+
+        def start():
+            # Pull the first chunk here too: generators call start_response lazily
+            result = self.wsgi_app(environ, start_response)
+            iterator = iter(result)
+            return result, iterator, next(iterator, None)
+
+        result, iterator, chunk = await in_thread(start)
+        try:
+            response['sent'] = True
+            await send({
+                'type': 'http.response.start',
+                'status': int(response['status'].split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response['headers']],
+            })
+            for data in written:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await in_thread(next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await in_thread(result.close)
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        root_path = scope.get('root_path', '')
+        path = scope['path']
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'wsgi.file_wrapper': FileWrapper,
+        }
+        for name, value in scope.get('headers', []):
+            name, value = name.decode('latin-1'), value.decode('latin-1')
+            if name == 'content-type':
+                key = 'CONTENT_TYPE'
+            elif name == 'content-length':
+                key = 'CONTENT_LENGTH'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            if key in environ:
+                # HTTP/2 and HTTP/3 send each cookie as its own header; Cookie joins with '; ', not ','
+                value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+            environ[key] = value
+        return environ
+
+
+def create_asgi_app(config=None):
+    """ASGI application around create_app(config)"""
+    from app import create_app
+    flask_app = create_app(config)
+    return WSGIBridge(flask_app, threads=flask_app.config['ASGI_THREADS'])
+
+
+application = create_asgi_app()
@@ -0,0 +1,248 @@
+"""
+Static asset pipeline.
+
+Every .js and .css file under static/ is minified, named by a hash of its
+content (JS/script.js -> dist/JS/script.1a2b3c4d5e6f.js) and written next to
+.gz (and .br, when the brotli package is installed) copies. A manifest maps
+source names to built ones.
+
+`url_for('static', filename='JS/script.js')` then yields the hashed URL,
+anywhere in templates or code. Hashed files are served precompressed
+according to Accept-Encoding and cached by browsers for a year as
+immutable. A changed file gets a new name, so repeat visits fetch nothing
+until an asset actually changes. Everything else under static/ is served
+as before.
+
+The build runs at startup when the manifest is missing or out of date, or
+ahead of time with `python assets.py`. ASSETS_ENABLED = False serves the
+source files untouched (handy while editing them).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = 'static'
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+EXTENSIONS = ('.js', '.css')
+# Generated or user content, never part of the build
+SKIP_DIRS = {DIST_DIR, 'resumes', 'previews'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_manifest = {}
+
+
+# ---------- MINIFYING ----------
+# Strings (and in JS template literals and regexes) are copied verbatim; only the code between them is touched
+_CSS_TOKENS = re.compile(r"""(?P<literal>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(?P<comment>/\*.*?\*/)""", re.S)
+_JS_TOKENS = re.compile(r"""(?P<literal>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|`(?:[^`\\]|\\.)*`)"""
+                        r"""|(?P<comment>/\*.*?\*/|//[^\n]*)"""
+                        r"""|(?P<regex>/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/)""", re.S)
+# A '/' after one of these starts a regex literal; after anything else it divides
+_REGEX_PRECEDERS = re.compile(r'(?:^|[(,=:\[!&|?{};+\-*%<>~^]|\b(?:return|typeof|case|do|else|in|of|void|delete|new|throw|yield|await))\s*$')
+
+
+def _minify_between_literals(text, tokens, minify_code):
+    """Run `minify_code` over the code between the literals matched by `tokens`, dropping comments"""
+    out, code, pos = [], [], 0
+    while True:
+        match = tokens.search(text, pos)
+        if match is None:
+            code.append(text[pos:])
+            break
+        code.append(text[pos:match.start()])
+        kind = match.lastgroup
+        if kind == 'comment':
+            # Keep a line break the comment spanned, for JS automatic semicolon insertion
+            code.append('\n' if '\n' in match.group() else ' ')
+        elif kind == 'regex' and not _REGEX_PRECEDERS.search(text, 0, match.start()):
+            code.append('/')
+            pos = match.start() + 1
+            continue
+        else:
+            out += [minify_code(''.join(code)), match.group()]
+            code = []
+        pos = match.end()
+    out.append(minify_code(''.join(code)))
+    return ''.join(out).strip()
+
+
+def _minify_css_code(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    # Only after a colon: before one it can be a descendant combinator ('.a :hover')
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}')
+
+
+def _minify_js_code(text):
+    # Conservative: every line break stays, so automatic semicolon insertion is untouched
+    return re.sub(r'[ \t]*\n\s*', '\n', text)
+
+
+def minify_css(text):
+    return _minify_between_literals(text, _CSS_TOKENS, _minify_css_code)
+
+
+def minify_js(text):
+    """
+    Conservative: drops comments, indentation and blank lines but keeps every
+    line break. Strings, template literals and regexes are left untouched.
+    """
+    return _minify_between_literals(text, _JS_TOKENS, _minify_js_code)
+
+
+def _minify(name, text):
+    try:
+        if name.endswith('.css'):
+            import rcssmin
+            return rcssmin.cssmin(text)
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        return minify_css(text) if name.endswith('.css') else minify_js(text)
+
+
+# ---------- BUILDING ----------
+def _sources(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), static_dir) not in SKIP_DIRS]
+        for filename in files:
+            if filename.endswith(EXTENSIONS):
+                yield os.path.relpath(os.path.join(root, filename), static_dir).replace(os.sep, '/')
+
+
+def _write(path, data):
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build(static_dir=STATIC_DIR):
+    """Build every asset and write the manifest; returns {source name: built name}"""
+    manifest = {}
+    for name in sorted(_sources(static_dir)):
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            body = _minify(name, f.read()).encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        built = f"{DIST_DIR}/{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+        path = os.path.join(static_dir, built)
+        _write(path, body)
+        _write(path + '.gz', gzip.compress(body, 9, mtime=0))
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(body, quality=11))
+        manifest[name] = built
+
+    _write_manifest(static_dir, manifest)
+    return manifest
+
+
+def _write_manifest(static_dir, manifest):
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """The current manifest, rebuilding it if any source is newer or new"""
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST)
+    try:
+        built_at = os.path.getmtime(path)
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return build(static_dir)
+
+    for name in _sources(static_dir):
+        if name not in manifest or os.path.getmtime(os.path.join(static_dir, name)) > built_at:
+            return build(static_dir)
+    return manifest
+
+
+# ---------- SERVING ----------
+def asset_url_defaults(endpoint, values):
+    """Point url_for('static', filename=...) at the built file"""
+    if endpoint == 'static' and values.get('filename') in _manifest:
+        values['filename'] = _manifest[values['filename']]
+
+
+def _send_built(static_dir, filename):
+    """A built asset, precompressed when the client accepts it"""
+    accepted = request.accept_encodings
+    candidates = [('br', '.br')] if brotli is not None else []
+    candidates.append(('gzip', '.gz'))
+    encoding = None
+    for name, suffix in candidates:
+        if accepted[name] and os.path.exists(os.path.join(static_dir, filename + suffix)):
+            encoding, filename_on_disk = name, filename + suffix
+            break
+    else:
+        filename_on_disk = filename
+
+    response = send_from_directory(static_dir, filename_on_disk,
+                                   mimetype=mimetypes.guess_type(filename)[0], max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Build the assets if needed and route static URLs to them"""
+    global _manifest
+    if not app.config.get('ASSETS_ENABLED', True):
+        return
+    static_dir = app.static_folder
+    _manifest = load_manifest(static_dir)
+    app.url_defaults(asset_url_defaults)
+
+    serve_static = app.view_functions['static']
+
+    def static(filename):
+        if filename.startswith(DIST_DIR + '/'):
+            return _send_built(static_dir, filename)
+        return serve_static(filename=filename)
+
+    app.view_functions['static'] = static
+    _skip_session_for_assets(app)
+
+
+def _skip_session_for_assets(app):
+    """
+    A session whose expiry is due a refresh is re-sent on whatever response
+    comes next; built assets must not carry Set-Cookie (or Vary: Cookie), or
+    shared caches won't store them.
+    """
+    interface = app.session_interface
+    save_session = interface.save_session
+
+    def save_unless_asset(app, session, response):
+        if request.endpoint == 'static' and request.view_args['filename'].startswith(DIST_DIR + '/'):
+            return
+        save_session(app, session, response)
+
+    interface.save_session = save_unless_asset
+
+
+if __name__ == '__main__':
+    for source, built in build().items():
+        print(f"{source} -> {built}")
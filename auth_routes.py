@@ -1,7 +1,11 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, render_template, redirect, url_for, flash, session, current_app, jsonify, g
 from functools import wraps
 from models import get_db  # Import from models.py
+from metrics import span
+from passwords import hash_password, verify_password, needs_rehash, HashingBusy
+from ratelimit import TokenBucketLimiter
+from pdf_preview import forget_session as forget_preview
+from sessions import User, current_user, remember_user, revoke_user_sessions
 import sqlite3
 import re
 import logging
@@ -36,15 +40,55 @@ def validate_password(password):
         return False, "Password must contain at least one number"
     return True, "Valid"
 
-def login_required(f):
-    """Decorator to protect routes that require authentication"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'warning')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
+def login_required(f=None, *, api=False):
+    """
+    Decorator to protect routes that require authentication. Sets g.user;
+    with api=True an anonymous request gets a JSON 401 instead of a redirect.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.user = current_user()
+            if g.user is None:
+                if api:
+                    return jsonify({'error': 'Not logged in'}), 401
+                flash('Please log in to access this page.', 'warning')
+                next_page = request.full_path.rstrip('?') if request.method == 'GET' else None
+                return redirect(url_for('auth.login', next=next_page))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator(f) if f else decorator
+
+
+def safe_next(next_page):
+    """Only follow `next` to a path on this site"""
+    if next_page and next_page.startswith('/') and not next_page.startswith('//') and '\\' not in next_page:
+        return next_page
+    return None
+
+
+def _limiter(name):
+    """This app's token bucket for `name` ('email' or 'ip'), built from config on first use"""
+    limiters = current_app.extensions.setdefault('auth_rate_limits', {})
+    if name not in limiters:
+        prefix = f'LOGIN_{name.upper()}'
+        limiters[name] = TokenBucketLimiter(current_app.config[f'{prefix}_RATE_PER_MINUTE'],
+                                            current_app.config[f'{prefix}_BURST'])
+    return limiters[name]
+
+def rate_limited(email=None):
+    """
+    Charge one attempt to the client's IP (and the email, if given).
+    Returns the seconds to wait if either bucket is empty, else 0.
+    """
+    checks = [('ip', request.remote_addr or 'unknown')]
+    if email:
+        checks.append(('email', email))
+    for name, key in checks:
+        limiter = _limiter(name)
+        if not limiter.allow(key):
+            return limiter.retry_after(key)
+    return 0
 
 
 # SIGNUP ROUTE
@@ -57,6 +101,11 @@ def signup():
         password = request.form.get('password', '')
         confirm_password = request.form.get('confirm_password', '')
         
+        wait = rate_limited()
+        if wait:
+            flash('Too many attempts. Please wait a minute and try again.', 'danger')
+            return render_template('signup.html'), 429, {'Retry-After': str(wait)}
+        
         # Validation
         if not email or not password:
             flash('Email and password are required.', 'danger')
@@ -75,17 +124,19 @@ def signup():
             flash(message, 'danger')
             return render_template('signup.html')
         
-        # Hash password
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        
         # Database insertion
         conn = None
         try:
+            # Hash password (on the bounded hashing pool)
+            with span('password_hash'):
+                hashed_password = hash_password(password)
+
             conn = get_db()
             c = conn.cursor()
-            c.execute('INSERT INTO users (email, password) VALUES (?, ?)', 
-                     (email, hashed_password))
-            conn.commit()
+            with span('db_insert'):
+                c.execute('INSERT INTO users (email, password) VALUES (?, ?)', 
+                         (email, hashed_password))
+                conn.commit()
             
             logger.info(f"New user registered: {email}")
             flash('Signup successful! Please log in.', 'success')
@@ -95,6 +146,11 @@ def signup():
             logger.warning(f"Signup attempt with existing email: {email}")
             flash('Email already exists. Please use a different one or log in.', 'danger')
             
+        except HashingBusy:
+            logger.warning("Signup rejected: password hashing pool saturated")
+            flash('We are very busy right now. Please try again in a moment.', 'warning')
+            return render_template('signup.html'), 503, {'Retry-After': '5'}
+            
         except Exception as e:
             logger.error(f"Signup error: {str(e)}")
             flash('An error occurred during signup. Please try again.', 'danger')
@@ -112,7 +168,7 @@ def signup():
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     # Redirect if already logged in
-    if 'user_id' in session:
+    if current_user() is not None:
         return redirect(url_for('resume.template_select'))
     
     if request.method == 'POST':
@@ -123,25 +179,42 @@ def login():
             flash('Email and password are required.', 'danger')
             return render_template('login.html')
         
+        wait = rate_limited(email)
+        if wait:
+            logger.warning(f"Rate-limited login attempt for: {email}")
+            flash('Too many login attempts. Please wait a minute and try again.', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(wait)}
+        
         conn = None
         try:
             conn = get_db()
             conn.row_factory = sqlite3.Row
             c = conn.cursor()
-            c.execute('SELECT id, email, password FROM users WHERE email = ?', (email,))
-            user = c.fetchone()
+            with span('db_select'):
+                c.execute('SELECT id, email, password FROM users WHERE email = ?', (email,))
+                user = c.fetchone()
             
-            if user and check_password_hash(user['password'], password):
-                # Successful login
+            with span('password_check'):
+                password_ok = bool(user) and verify_password(user['password'], password)
+            if password_ok:
+                # Upgrade hashes made with older parameters while we have the plain password
+                if needs_rehash(user['password']):
+                    with span('password_hash'):
+                        c.execute('UPDATE users SET password = ? WHERE id = ?',
+                                  (hash_password(password), user['id']))
+                        conn.commit()
+
+                # Successful login, under a fresh session id
+                session.regenerate()
                 session['user_id'] = user['id']
-                session['email'] = user['email']
                 session.permanent = True  # Use permanent session with timeout
+                remember_user(User(user['id'], user['email']))
                 
                 logger.info(f"User logged in: {email}")
                 flash('Login successful!', 'success')
                 
                 # Redirect to next page if specified, otherwise template selection
-                next_page = request.args.get('next')
+                next_page = safe_next(request.args.get('next'))
                 if next_page:
                     return redirect(next_page)
                 return redirect(url_for('resume.template_select'))
@@ -150,6 +223,11 @@ def login():
                 logger.warning(f"Failed login attempt for: {email}")
                 flash('Invalid email or password.', 'danger')
                 
+        except HashingBusy:
+            logger.warning("Login rejected: password hashing pool saturated")
+            flash('We are very busy right now. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+            
         except Exception as e:
             logger.error(f"Login error: {str(e)}")
             flash('An error occurred during login. Please try again.', 'danger')
@@ -166,8 +244,23 @@ def login():
 
 @auth_bp.route('/logout')
 def logout():
-    email = session.get('email', 'Unknown')
+    user = current_user()
+    if 'preview_id' in session:
+        forget_preview(session['preview_id'])
     session.clear()
-    logger.info(f"User logged out: {email}")
+    session.regenerate()
+    logger.info(f"User logged out: {user.email if user else 'Unknown'}")
     flash('Logged out successfully.', 'info')
     return redirect(url_for('index'))
+
+
+@auth_bp.route('/logout_everywhere')
+@login_required
+def logout_everywhere():
+    """End this user's sessions on every device, this one included"""
+    count = revoke_user_sessions(g.user.id)
+    session.clear()
+    session.regenerate()
+    logger.info(f"User logged out everywhere ({count} sessions): {g.user.email}")
+    flash('Logged out on all devices.', 'info')
+    return redirect(url_for('index'))
@@ -0,0 +1,67 @@
+"""
+Layout/render benchmark over very long resumes.
+
+Renders resumes with a growing number of experience entries and reports the
+time per entry; with linear layout the per-entry cost stays flat.
+
+    python benchmarks/bench_layout.py [--sizes 10 100 1000 5000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_layout import layout_resume           # noqa: E402
+from pdf_renderer import render_pdf_bytes      # noqa: E402
+from pdf_templates import get_template         # noqa: E402
+from resume_model import Resume, EducationEntry, ExperienceEntry  # noqa: E402
+
+DESCRIPTION = ("Led the migration of a monolithic billing service to event-driven workers, "
+               "cutting invoice latency and on-call pages while keeping the audit trail intact")
+
+
+def long_resume(entries, template_style='modern'):
+    return Resume(
+        name='Benchmark Candidate', title='Staff Engineer', email='bench@example.com',
+        phone='555-0100', location='Remote', linkedin='linkedin.com/in/bench',
+        education=[EducationEntry('BSc Computer Science', f'University {i}', '2010')
+                   for i in range(max(1, entries // 10))],
+        experience=[ExperienceEntry(f'Senior Engineer {i}', f'Company {i}', '2015 - 2020',
+                                    [f"{DESCRIPTION} ({i})", DESCRIPTION])
+                    for i in range(entries)],
+        skills=[f"Skill{i}" for i in range(entries)],
+        template_style=template_style,
+    )
+
+
+def best_of(repeat, fn, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--template', default='modern')
+    args = parser.parse_args()
+
+    template = get_template(args.template)
+    print(f"{'entries':>8} {'pages':>6} {'layout ms':>10} {'render ms':>10} {'us/entry':>9}")
+    for entries in args.sizes:
+        data = long_resume(entries, args.template)
+        layout_time, pages = best_of(args.repeat, layout_resume, data, template)
+        render_time, _ = best_of(args.repeat, render_pdf_bytes, data)
+        print(f"{entries:>8} {len(pages):>6} {layout_time * 1000:>10.1f} {render_time * 1000:>10.1f} "
+              f"{render_time / entries * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
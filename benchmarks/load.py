@@ -0,0 +1,378 @@
+"""
+Throughput/latency benchmark for the login, dashboard and generate_pdf paths.
+
+Runs against a scratch copy of the app (its own users.db and static/resumes),
+either in-process through Flask's test client or over HTTP against a locally
+started gunicorn. Payloads are synthetic resumes of varying size.
+
+    python benchmarks/load.py                                  # test client, all styles
+    python benchmarks/load.py --target gunicorn --workers 4 --concurrency 8
+    python benchmarks/load.py --output bench.json              # machine-readable results
+    python benchmarks/load.py --baseline bench.json            # exit 1 on regression
+
+Reported per scenario/template/size: requests, PDFs (or requests) per second,
+p50/p95/p99 latency, peak RSS and SQLite lock waits (in-process target only).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+import urllib.error
+import urllib.request
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COPY_ITEMS = ['templates', 'static/JS', 'static/CSS', 'static/previews']
+
+# (education rows, experience rows, description length in words)
+PAYLOAD_SIZES = {
+    'small': (1, 1, 20),
+    'medium': (3, 5, 60),
+    'large': (6, 25, 150),
+}
+
+PASSWORD = 'BenchPassw0rd'
+_counter = iter(range(10 ** 9))
+_counter_lock = threading.Lock()
+
+
+def next_id():
+    with _counter_lock:
+        return next(_counter)
+
+
+# ---------- PAYLOADS ----------
+def resume_form(size, template_style, unique=True):
+    """Form fields for generate_pdf; `unique` defeats the render cache"""
+    education_rows, experience_rows, words = PAYLOAD_SIZES[size]
+    description = ' '.join(f"word{i % 37}" for i in range(words))
+    suffix = f" {next_id()}" if unique else ''
+    fields = [('name', f"Bench Candidate{suffix}"), ('title', 'Engineer'), ('email', 'bench@example.com'),
+              ('phone', '555-0100'), ('location', 'Remote'), ('linkedin', 'linkedin.com/in/bench'),
+              ('template_style', template_style)]
+    for i in range(education_rows):
+        fields += [('education_degree[]', f'BSc {i}'), ('education_school[]', 'State University'),
+                   ('education_year[]', '2015')]
+    for i in range(experience_rows):
+        fields += [('experience_title[]', f'Engineer {i}'), ('experience_company[]', f'Company {i}'),
+                   ('experience_date[]', '2018 - 2020'),
+                   ('experience_description[]', f"{description}\n{description}")]
+    fields.append(('skills[]', 'Python, SQL, Flask, ReportLab'))
+    return fields
+
+
+# ---------- CLIENTS ----------
+class TestClientSession:
+    """Drives the app in-process through Flask's test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, fields=None, headers=None):
+        if method == 'POST':
+            from werkzeug.datastructures import MultiDict
+            response = self.client.post(path, data=MultiDict(fields or []), headers=headers or {})
+        else:
+            response = self.client.get(path, headers=headers or {})
+        return response.status_code, response.get_data(), response.headers
+
+
+class HttpSession:
+    """Same interface over real HTTP (gunicorn), with its own cookie jar"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()),
+                                                  _NoRedirect)
+
+    def request(self, method, path, fields=None, headers=None):
+        data = urlencode(fields or []).encode() if method == 'POST' else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {}, method=method)
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+# ---------- SCENARIOS ----------
+def login(session, email):
+    status, _, _ = session.request('POST', '/login', [('email', email), ('password', PASSWORD)])
+    return status in (200, 302)
+
+
+def signup(session, email):
+    session.request('POST', '/signup', [('email', email), ('password', PASSWORD),
+                                        ('confirm_password', PASSWORD)])
+
+
+def generate(session, size, template_style, unique):
+    """Submit the form and wait until the PDF bytes are in hand"""
+    status, body, _ = session.request('POST', '/generate_pdf', resume_form(size, template_style, unique),
+                                      headers={'Accept': 'application/json'})
+    if status == 200 and body.startswith(b'%PDF'):
+        return True     # in-memory mode answers with the PDF itself
+    if status not in (200, 202):
+        return False
+    job = json.loads(body)
+    while True:
+        status, body, _ = session.request('GET', job['download_url'])
+        if status == 200:
+            return body.startswith(b'%PDF')
+        if status != 202:
+            return False
+        time.sleep(0.02)
+
+
+def run_scenario(make_session, email, action, requests, concurrency):
+    """Run `action(session)` `requests` times across `concurrency` threads; returns latencies and failures"""
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    sessions = []
+    for count in per_thread:
+        if count:
+            session = make_session()
+            login(session, email)
+            sessions.append((session, count))
+
+    def worker(item):
+        nonlocal failures
+        session, count = item
+        for _ in range(count):
+            start = time.perf_counter()
+            ok = action(session)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                failures += 0 if ok else 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, sessions))
+    return latencies, failures, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb(server_pid=None):
+    """
+    Peak RSS in MB. In-process: this process and reaped children (the render pool).
+    Against gunicorn: the largest high-water mark in the server's process tree
+    (Linux /proc only).
+    """
+    if server_pid:
+        return round(max((_vm_hwm_kb(pid) for pid in _process_tree(server_pid)), default=0) / 1024, 1)
+    scale = 1024 * 1024 if platform.system() == 'Darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def _process_tree(pid):
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task') if os.path.isdir(f'/proc/{pid}/task') else []:
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                for child in f.read().split():
+                    pids.extend(_process_tree(int(child)))
+        except OSError:
+            pass
+    return pids
+
+
+def _vm_hwm_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+# ---------- TARGETS ----------
+def prepare_workdir():
+    """Scratch copy of the app so the benchmark never touches the real database or PDFs"""
+    workdir = tempfile.mkdtemp(prefix='cvbuilder-bench-')
+    for name in os.listdir(REPO_ROOT):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(REPO_ROOT, name), workdir)
+    for item in COPY_ITEMS:
+        source = os.path.join(REPO_ROOT, item)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, item))
+    os.makedirs(os.path.join(workdir, 'static', 'resumes'), exist_ok=True)
+    return workdir
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workdir, workers, env):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--chdir', workdir, '-w', str(workers),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1)
+            return process, base_url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def lock_waits(target):
+    """SQLite pool waits + lock retries seen so far (in-process target only)"""
+    if target != 'client':
+        return None
+    import models
+    metrics = models.pool_metrics()
+    return metrics['waits'] + metrics['lock_retries']
+
+
+# ---------- BASELINE ----------
+def compare(results, baseline_path, tolerance):
+    """Print regressions against a stored run; returns True when none exceed `tolerance`"""
+    with open(baseline_path) as f:
+        baseline = {_result_key(r): r for r in json.load(f)['results']}
+
+    ok = True
+    for result in results:
+        before = baseline.get(_result_key(result))
+        if not before:
+            continue
+        slower = before['p95_ms'] and result['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+        fewer = before['throughput'] and result['throughput'] < before['throughput'] * (1 - tolerance)
+        if slower or fewer:
+            ok = False
+            print(f"REGRESSION {_result_key(result)}: p95 {before['p95_ms']} -> {result['p95_ms']} ms, "
+                  f"throughput {before['throughput']} -> {result['throughput']}/s")
+    return ok
+
+
+def _result_key(result):
+    return f"{result['scenario']}/{result['template']}/{result['size']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['client', 'gunicorn'], default='client')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--requests', type=int, default=40, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--templates', nargs='+', default=['modern', 'creative', 'simple'])
+    parser.add_argument('--sizes', nargs='+', default=list(PAYLOAD_SIZES), choices=list(PAYLOAD_SIZES))
+    parser.add_argument('--render-mode', choices=['pool', 'memory'], default='pool')
+    parser.add_argument('--allow-cache', action='store_true', help='resubmit identical payloads')
+    parser.add_argument('--output', help='write JSON results here')
+    parser.add_argument('--baseline', help='compare against a previous --output file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    workdir = prepare_workdir()
+    # One client hammering login: lift the per-email/IP limits so they don't skew the numbers
+    settings = {'PDF_RENDER_MODE': args.render_mode, 'LOGIN_EMAIL_BURST': '1000000',
+                'LOGIN_IP_BURST': '1000000'}
+    env = {**os.environ, **settings}
+    os.environ.update(settings)
+    process = None
+    try:
+        if args.target == 'gunicorn':
+            process, base_url = start_gunicorn(workdir, args.workers, env)
+            make_session = lambda: HttpSession(base_url)  # noqa: E731
+        else:
+            os.chdir(workdir)
+            sys.path.insert(0, workdir)
+            from app import app
+            make_session = lambda: TestClientSession(app)  # noqa: E731
+
+        email = 'bench@example.com'
+        signup(make_session(), email)
+
+        scenarios = [('login', None, None, lambda s: login(s, email)),
+                     ('dashboard', None, None, lambda s: s.request('GET', '/dashboard')[0] == 200)]
+        for template_style in args.templates:
+            for size in args.sizes:
+                scenarios.append(('generate_pdf', template_style, size,
+                                  lambda s, t=template_style, z=size: generate(s, z, t, not args.allow_cache)))
+
+        results = []
+        for name, template_style, size, action in scenarios:
+            waits_before = lock_waits(args.target)
+            latencies, failures, wall = run_scenario(make_session, email, action, args.requests, args.concurrency)
+            waits_after = lock_waits(args.target)
+            result = {
+                'scenario': name,
+                'template': template_style,
+                'size': size,
+                'requests': len(latencies),
+                'failures': failures,
+                'throughput': round(len(latencies) / wall, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'peak_rss_mb': peak_rss_mb(process.pid if process else None),
+                'sqlite_lock_waits': None if waits_before is None else waits_after - waits_before,
+            }
+            results.append(result)
+            print(f"{_result_key(result):<32} {result['throughput']:>8}/s  p50 {result['p50_ms']:>8} ms  "
+                  f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                  f"rss {result['peak_rss_mb']} MB  failures {failures}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        if args.target == 'client':
+            from render_pool import shutdown_pool
+            shutdown_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {'target': args.target, 'render_mode': args.render_mode, 'requests': args.requests,
+                 'concurrency': args.concurrency, 'python': platform.python_version(),
+                 'cpus': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
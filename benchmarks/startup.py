@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark: how long until a fresh process serves its first page and its first PDF.
+
+Every run starts from a scratch copy of the app (bytecode precompiled, no
+template picker images, empty database). The modes:
+
+    lazy              in-process, heavy libraries load on first use (the default)
+    warm              in-process with WARM_ON_START=1 (warmup.py runs in create_app)
+    gunicorn          gunicorn -c gunicorn.conf.py with GUNICORN_PRELOAD=0 (every worker builds the app)
+    gunicorn-preload  gunicorn -c gunicorn.conf.py (app built and warmed once in the master, then forked)
+
+    python benchmarks/startup.py                       # every mode, 5 runs each
+    python benchmarks/startup.py --modes lazy warm --runs 10
+    python benchmarks/startup.py --output startup.json
+
+In-process modes report import time (Flask and the app modules), create_app,
+the first request (GET /), the first PNG live preview and the first PDF
+(generate_pdf, memory mode). Gunicorn modes report the time from launch to the
+first answered request and then the first preview and PDF over HTTP. Medians
+over the runs, in milliseconds.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from load import HttpSession, TestClientSession, PASSWORD, free_port, prepare_workdir, resume_form
+
+MODES = ['lazy', 'warm', 'gunicorn', 'gunicorn-preload']
+EMAIL = 'startup@example.com'
+# Keep password hashing out of the numbers
+SETTINGS = {'PDF_RENDER_MODE': 'memory', 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+            'MAINTENANCE_SCHEDULER': '0'}
+
+
+def first_preview_and_pdf(session):
+    """Sign up, then time the first PNG preview and the first PDF; returns (preview_s, pdf_s)"""
+    session.request('POST', '/signup', [('email', EMAIL), ('password', PASSWORD), ('confirm_password', PASSWORD)])
+    session.request('POST', '/login', [('email', EMAIL), ('password', PASSWORD)])
+    form = resume_form('medium', 'modern')
+
+    start = time.perf_counter()
+    status, _, _ = session.request('POST', '/preview?format=png', form)
+    preview = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f'preview answered {status}')
+
+    start = time.perf_counter()
+    status, body, _ = session.request('POST', '/generate_pdf', form)
+    pdf = time.perf_counter() - start
+    if status != 200 or not body.startswith(b'%PDF'):
+        raise RuntimeError(f'generate_pdf answered {status}')
+    return preview, pdf
+
+
+# ---------- IN-PROCESS ----------
+def child():
+    """One in-process run (in a fresh interpreter); prints its timings as JSON"""
+    sys.path.insert(0, os.getcwd())
+    start = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+    session = TestClientSession(app)
+    status, _, _ = session.request('GET', '/')
+    first_request = time.perf_counter()
+    if status != 200:
+        raise RuntimeError(f'GET / answered {status}')
+    preview, pdf = first_preview_and_pdf(session)
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (first_request - created) * 1000,
+        'ready_ms': (first_request - start) * 1000,
+        'first_preview_ms': preview * 1000,
+        'first_pdf_ms': pdf * 1000,
+    }))
+
+
+def run_in_process(workdir, mode):
+    env = {**os.environ, **SETTINGS, 'WARM_ON_START': '1' if mode == 'warm' else '0'}
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# ---------- GUNICORN ----------
+def run_gunicorn(workdir, mode, workers):
+    port = free_port()
+    env = {**os.environ, **SETTINGS, 'GUNICORN_PRELOAD': '1' if mode == 'gunicorn-preload' else '0'}
+    base_url = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(workers),
+                                '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+                               cwd=workdir, env=env)
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(base_url + '/', timeout=1)
+                break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+        preview, pdf = first_preview_and_pdf(HttpSession(base_url))
+    finally:
+        process.terminate()
+        process.wait()
+    return {'ready_ms': ready * 1000, 'first_preview_ms': preview * 1000, 'first_pdf_ms': pdf * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--output', help='write JSON results here')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    results = []
+    for mode in args.modes:
+        runs = []
+        for _ in range(args.runs):
+            workdir = prepare_workdir()
+            try:
+                # Deployed code has its bytecode; don't time the compiler
+                subprocess.run([sys.executable, '-m', 'compileall', '-q', workdir], check=True)
+                if mode.startswith('gunicorn'):
+                    runs.append(run_gunicorn(workdir, mode, args.workers))
+                else:
+                    runs.append(run_in_process(workdir, mode))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        result = {'mode': mode, 'runs': len(runs),
+                  **{name: round(statistics.median(run[name] for run in runs), 1) for name in runs[0]}}
+        results.append(result)
+        print(f"{mode:<18} " + '  '.join(f"{name[:-3]} {value:>7} ms" for name, value in result.items()
+                                        if name.endswith('_ms')))
+
+    if args.output:
+        report = {'meta': {'runs': args.runs, 'workers': args.workers, 'python': platform.python_version(),
+                           'cpus': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                  'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
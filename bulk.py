@@ -0,0 +1,242 @@
+"""
+Bulk resume generation.
+
+Takes a JSONL or CSV file of resume records, renders them across the worker
+pool and streams back a ZIP of PDFs. Rows for a user are inserted in one
+transaction at the end.
+
+JSONL records use the form's fields, with structured sections:
+
+    {"name": "Sarah Johnson", "email": "...", "template_style": "modern",
+     "education": [{"degree": "BSc", "school": "MIT", "year": "2020"}],
+     "experience": [{"title": "Engineer", "company": "ACME", "date": "2021 - Present",
+                     "description": ["Built things", "Shipped things"]}],
+     "skills": ["Python", "SQL"]}
+
+CSV files use one column per field and numbered columns for repeated
+sections: education_degree_1, education_school_1, experience_title_2, skills_1...
+
+Command line:
+
+    python bulk.py cohort.jsonl -o cohort.zip [--user-email coach@example.com]
+"""
+from datetime import datetime
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+
+from werkzeug.datastructures import MultiDict
+
+from pdf_renderer import parse_resume_form, build_filename
+from render_pool import get_executor, submit_pdf_bytes
+from resume_store import save_resumes
+import render_cache
+import storage
+
+CONTACT_FIELDS = ('name', 'title', 'email', 'phone', 'location', 'linkedin', 'template_style')
+
+# Repeated sections and the form fields each entry contributes
+SECTION_FIELDS = {
+    'education': ('degree', 'school', 'year'),
+    'experience': ('title', 'company', 'date', 'description'),
+}
+
+NUMBERED_COLUMN = re.compile(r'^(education|experience)_([a-z]+)_(\d+)$')
+NUMBERED_SKILL = re.compile(r'^skills_(\d+)$')
+
+
+class BulkInputError(Exception):
+    """Raised when the uploaded file can't be read as JSONL or CSV"""
+
+
+# ---------- INPUT ----------
+def record_to_form(record):
+    """Turn one JSON/CSV record into the same shape the resume form posts"""
+    form = MultiDict()
+    for field in CONTACT_FIELDS:
+        if record.get(field) not in (None, ''):
+            form[field] = str(record[field])
+
+    # Structured sections (JSONL)
+    for section, fields in SECTION_FIELDS.items():
+        entries = record.get(section)
+        if isinstance(entries, str):
+            entries = [{fields[0]: line} for line in entries.splitlines() if line.strip()]
+        for entry in entries or []:
+            for field in fields:
+                value = entry.get(field, '')
+                if isinstance(value, list):
+                    value = '\n'.join(value)
+                form.add(f'{section}_{field}[]', str(value))
+
+    skills = record.get('skills')
+    if isinstance(skills, list):
+        form.add('skills[]', ', '.join(str(skill) for skill in skills))
+    elif skills:
+        form.add('skills[]', str(skills))
+
+    # Numbered columns (CSV); every field of an entry is added so the lists stay aligned
+    numbered = {}
+    for key, value in record.items():
+        match = NUMBERED_COLUMN.match(key)
+        if match:
+            section, field, index = match.groups()
+            numbered.setdefault((section, int(index)), {})[field] = value or ''
+        elif NUMBERED_SKILL.match(key) and value:
+            form.add('skills[]', value)
+    for (section, _), entry in sorted(numbered.items()):
+        for field in SECTION_FIELDS[section]:
+            form.add(f'{section}_{field}[]', entry.get(field, ''))
+
+    return form
+
+
+def read_records(fileobj, filename):
+    """Parse an uploaded/opened file into Resume objects; returns (records, errors)"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig') if isinstance(fileobj.read(0), bytes) else fileobj
+    records, errors = [], []
+
+    if filename.lower().endswith('.csv'):
+        rows = enumerate(csv.DictReader(text), start=2)
+    elif filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        rows = _json_lines(text, errors)
+    else:
+        raise BulkInputError('Upload a .jsonl or .csv file.')
+
+    for line_no, row in rows:
+        try:
+            records.append(parse_resume_form(record_to_form(row)))
+        except Exception as e:
+            errors.append(f"line {line_no}: {e}")
+    return records, errors
+
+
+def _json_lines(text, errors):
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append(f"line {line_no}: invalid JSON ({e})")
+            continue
+        if isinstance(record, dict):
+            yield line_no, record
+        else:
+            errors.append(f"line {line_no}: expected a JSON object")
+
+
+# ---------- OUTPUT ----------
+class _ZipSink:
+    """Write-only target for ZipFile whose bytes can be handed out as they are produced"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def generate_zip(records, pool_size, errors=None, user_id=None, conn=None, cache_max_bytes=256 * 1024 * 1024):
+    """
+    Render `records` in parallel and yield the ZIP archive in chunks.
+    With `user_id` (and a `conn`) the PDFs are also stored and their rows saved.
+    """
+    errors = list(errors or [])
+    now = datetime.now()
+    timestamp = now.strftime('%Y%m%d%H%M%S')
+    created_at = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Identical records render once
+    keys = [render_cache.cache_key(resume) for resume in records]
+    executor = get_executor(pool_size)
+    futures = {}
+    for key, resume in zip(keys, records):
+        if key not in futures:
+            futures[key] = submit_pdf_bytes(executor, resume)
+
+    sink = _ZipSink()
+    saved = {}
+    rows = []
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index, (key, resume) in enumerate(zip(keys, records), start=1):
+            try:
+                pdf_bytes, _ = futures[key].result()
+            except Exception as e:
+                errors.append(f"record {index} ({resume.name}): {e}")
+                continue
+
+            archive.writestr(f"{index:04d}_{build_filename(resume.name, resume.template_style, timestamp)}",
+                             pdf_bytes)
+            if user_id is not None:
+                if key not in saved:
+                    saved[key] = render_cache.write_blob(key, pdf_bytes)
+                rows.append((user_id, resume, created_at, key, *saved[key]))
+            yield sink.drain()
+
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield sink.drain()
+
+    if user_id is not None and rows:
+        # One transaction for the whole batch, sections included
+        save_resumes(conn, rows)
+        render_cache.store_many(conn, [(key, size, checksum) for key, (size, checksum) in saved.items()],
+                                cache_max_bytes)
+
+
+# ---------- COMMAND LINE ----------
+def main():
+    from models import init_db, get_db
+    from render_pool import shutdown_pool
+
+    parser = argparse.ArgumentParser(description="Render a JSONL/CSV file of resumes into a ZIP of PDFs")
+    parser.add_argument('input', help='.jsonl or .csv file of resume records')
+    parser.add_argument('-o', '--output', default='resumes.zip', help='ZIP file to write')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='render processes')
+    parser.add_argument('--user-email', help='also save the resumes to this account')
+    parser.add_argument('--cache-max-bytes', type=int, default=256 * 1024 * 1024)
+    args = parser.parse_args()
+
+    with open(args.input, 'rb') as f:
+        records, errors = read_records(f, args.input)
+
+    user_id = conn = None
+    if args.user_email:
+        # Same storage backend as the web app (STORAGE_BACKEND, S3_* environment variables)
+        storage.configure(storage.settings_from_config(os.environ))
+        init_db()
+        conn = get_db()
+        user = conn.execute('SELECT id FROM users WHERE email = ?', (args.user_email.strip().lower(),)).fetchone()
+        if not user:
+            sys.exit(f"No user with email {args.user_email}")
+        user_id = user[0]
+
+    try:
+        with open(args.output, 'wb') as out:
+            for chunk in generate_zip(records, args.workers, errors, user_id, conn, args.cache_max_bytes):
+                out.write(chunk)
+    finally:
+        if conn:
+            conn.close()
+        shutdown_pool()
+
+    print(f"Wrote {len(records)} resumes to {args.output}" + (f" ({len(errors)} errors)" if errors else ''))
+
+
+if __name__ == '__main__':
+    main()
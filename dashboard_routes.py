@@ -1,16 +1,82 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, request, current_app, g
+from auth_routes import login_required
 from models import get_db
+from storage import legacy_filename
+from metrics import span
+from search import search_resumes
+from pdf_templates import template_names
+from exports import FORMATS
+import sqlite3
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/dashboard')
+@login_required
 def dashboard():
-    if 'user_id' not in session:
-        flash('Please login first.', 'warning')
-        return redirect(url_for('auth.login'))
+    page_size = current_app.config.get('DASHBOARD_PAGE_SIZE', 20)
+    # Keyset cursor: the (created_at, id) of the last row on the previous page
+    before = request.args.get('before')
+    before_id = request.args.get('before_id', type=int)
+
     conn = get_db()
+    conn.row_factory = sqlite3.Row
     c = conn.cursor()
-    c.execute('SELECT * FROM resumes WHERE user_id = ? ORDER BY created_at DESC', (session['user_id'],))
-    resumes = c.fetchall()
+    # Only the columns the page shows; the TEXT blobs stay on disk
+    with span('db_select'):
+        if before is not None and before_id is not None:
+            c.execute('''SELECT id, name, template_style, created_at, storage_key FROM resumes
+                         WHERE user_id = ? AND (created_at, id) < (?, ?)
+                         ORDER BY created_at DESC, id DESC LIMIT ?''',
+                      (g.user.id, before, before_id, page_size + 1))
+        else:
+            c.execute('''SELECT id, name, template_style, created_at, storage_key FROM resumes
+                         WHERE user_id = ?
+                         ORDER BY created_at DESC, id DESC LIMIT ?''',
+                      (g.user.id, page_size + 1))
+        resumes = c.fetchall()
     conn.close()
-    return render_template('dashboard.html', email=session['email'], resumes=resumes)
+
+    # One extra row tells us whether an older page exists
+    next_cursor = None
+    if len(resumes) > page_size:
+        resumes = resumes[:page_size]
+        last = resumes[-1]
+        next_cursor = {'before': last['created_at'], 'before_id': last['id']}
+
+    return render_template('dashboard.html', email=g.user.email, resumes=_with_filenames(resumes),
+                           template_names=template_names(), export_formats=FORMATS.values(),
+                           next_cursor=next_cursor, paginated=before is not None)
+
+
+@dashboard_bp.route('/dashboard/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    template_style = request.args.get('template') or None
+    if not query:
+        return redirect(url_for('dashboard.dashboard'))
+
+    page_size = current_app.config.get('DASHBOARD_PAGE_SIZE', 20)
+    # Ranked results can't use the created_at cursor, so search pages by number
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    conn = get_db()
+    with span('db_search'):
+        resumes, has_more = search_resumes(conn, g.user.id, query, page=page,
+                                           page_size=page_size, template_style=template_style)
+    conn.close()
+
+    def page_args(number):
+        return {'q': query, 'template': template_style, 'page': number}
+
+    return render_template('dashboard.html', email=g.user.email, resumes=_with_filenames(resumes),
+                           template_names=template_names(), export_formats=FORMATS.values(), query=query, template_filter=template_style,
+                           next_cursor=page_args(page + 1) if has_more else None,
+                           prev_page=page_args(page - 1) if page > 1 else None,
+                           paginated=page > 1)
+
+
+def _with_filenames(resumes):
+    # Rows written before storage_key existed fall back to the old filename scheme
+    return [{**dict(r), 'filename': r['storage_key'] or legacy_filename(r['name'], r['template_style'], r['created_at'])}
+            for r in resumes]
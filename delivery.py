@@ -0,0 +1,117 @@
+"""
+PDF delivery for the view/download endpoints.
+
+Responses carry a strong ETag (the stored SHA-256 checksum) so browsers
+revalidate with If-None-Match and get a 304 instead of the whole file, and
+Range requests are answered with 206 partial content. Behind a proxy the
+byte shipping can be handed off entirely:
+
+    USE_X_SENDFILE = True                           # Apache/lighttpd X-Sendfile
+    PDF_ACCEL_REDIRECT_PREFIX = '/protected-resumes' # nginx X-Accel-Redirect
+
+With object storage the app steps out of the download altogether: the
+response is a redirect to a short-lived presigned URL on the bucket
+(STORAGE_PRESIGNED_URLS, on by default). Without presigning, the object is
+streamed through in chunks.
+
+Behind nginx, also set PROXY_FIX_HOPS=1 and pass the client address along
+(`proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;` and
+`proxy_set_header X-Forwarded-Proto $scheme;`), or every request appears to
+come from the proxy and the per-IP login limit is shared by all clients.
+"""
+from urllib.parse import quote
+import os
+
+from flask import current_app, redirect, request, send_file
+
+import storage
+
+
+def send_pdf(storage_key, download_name=None, as_attachment=False, etag=None):
+    """
+    Serve a stored PDF. Raises FileNotFoundError if it isn't stored
+    (only checked when Python ships the bytes itself).
+    """
+    backend = storage.backend()
+    if current_app.config.get('STORAGE_PRESIGNED_URLS', True):
+        url = backend.presigned_url(storage_key, download_name or storage_key, as_attachment,
+                                    expires=current_app.config.get('STORAGE_PRESIGN_SECONDS', 300))
+        if url:
+            response = redirect(url)
+            # The URL expires, so neither the redirect nor the link may be cached
+            response.cache_control.private = True
+            response.cache_control.no_store = True
+            return response
+
+    accel_prefix = current_app.config.get('PDF_ACCEL_REDIRECT_PREFIX')
+    path = backend.local_path(storage_key)
+    if accel_prefix:
+        response = _accel_redirect(accel_prefix, _internal_path(backend, storage_key, path),
+                                   download_name or storage_key, as_attachment, etag)
+    elif path:
+        # send_file streams the file, answers Range requests and If-None-Match,
+        # and switches to X-Sendfile itself when USE_X_SENDFILE is set
+        response = send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=as_attachment,
+            download_name=download_name or storage_key,
+            etag=etag if etag else True,
+            conditional=True,
+        )
+        # Advertise ranges on full responses too, so PDF viewers load incrementally
+        response.accept_ranges = 'bytes'
+    else:
+        response = _stream(backend, storage_key, download_name or storage_key, as_attachment, etag)
+
+    # Private to the logged-in user, but always revalidated so a 304 is possible
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _internal_path(backend, storage_key, path):
+    """Where nginx finds the object under its internal location (shard directories included)"""
+    if path and hasattr(backend, 'root'):
+        return os.path.relpath(path, backend.root).replace(os.sep, '/')
+    if hasattr(backend, 'relative_path'):
+        return backend.relative_path(storage_key)
+    return storage_key
+
+
+def _content_disposition(response, name, as_attachment):
+    try:
+        name.encode('ascii')
+        name_option = {'filename': name}
+    except UnicodeEncodeError:
+        name_option = {'filename*': f"UTF-8''{quote(name)}"}
+    response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline', **name_option)
+
+
+def _stream(backend, storage_key, download_name, as_attachment, etag):
+    """Relay an object from the backend chunk by chunk"""
+    if etag and etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    body = backend.open(storage_key)
+    response = current_app.response_class(body, mimetype='application/pdf', direct_passthrough=True)
+    length = getattr(body, 'headers', {}).get('Content-Length')
+    if length:
+        response.content_length = int(length)
+    _content_disposition(response, download_name, as_attachment)
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def _accel_redirect(prefix, internal_path, download_name, as_attachment, etag):
+    """Empty response telling nginx to serve the file from its internal location"""
+    response = current_app.response_class(mimetype='application/pdf')
+    response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(internal_path)}"
+    _content_disposition(response, download_name, as_attachment)
+    if etag:
+        response.set_etag(etag)
+        # nginx only sees the internal redirect, so the 304 decision is made here
+        response = response.make_conditional(request)
+    return response
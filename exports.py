@@ -0,0 +1,449 @@
+"""
+Resume exports: one parsed resume, several output formats.
+
+A Resume (from the form, or loaded from its normalized tables) is handed to
+every requested writer at once:
+
+    pdf   the ReportLab rendering, through the render pool and render cache
+    docx  Word document with real headings and bullets
+    txt   ATS-friendly plain text: no columns, no tables, standard headings
+    html  semantic, self-contained HTML page
+    json  JSON Resume (https://jsonresume.org/schema)
+
+The text writers run concurrently on a thread pool while the PDF renders on
+the render pool. Outputs are cached per record under a hash of the resume
+content, format and EXPORT_VERSION: the PDF in the content-addressed render
+cache, the others in a bounded in-process LRU. So a multi-format download
+costs one parse, and an unchanged resume costs no writer at all.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape as xml_escape
+import hashlib
+import io
+import json
+import re
+import threading
+import zipfile
+
+from markupsafe import escape
+
+from pdf_layout import SECTIONS
+import metrics
+import render_cache
+import storage
+
+# Bump when a writer's output changes so cached exports stop matching
+EXPORT_VERSION = 1
+EXPORT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Fixed ZIP entry timestamps: identical content gives identical bytes (and ETags)
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class ExportFormat:
+    name: str
+    label: str
+    extension: str
+    mimetype: str
+
+
+FORMATS = OrderedDict((f.name, f) for f in (
+    ExportFormat('pdf', 'PDF', 'pdf', 'application/pdf'),
+    ExportFormat('docx', 'Word', 'docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    ExportFormat('txt', 'Plain text (ATS)', 'txt', 'text/plain; charset=utf-8'),
+    ExportFormat('html', 'HTML', 'html', 'text/html; charset=utf-8'),
+    ExportFormat('json', 'JSON Resume', 'json', 'application/json'),
+))
+
+SECTION_TITLES = {'education': 'Education', 'experience': 'Experience', 'skills': 'Skills'}
+
+
+def parse_formats(value):
+    """Known format names from 'pdf,txt' or a list; all formats if none are given"""
+    if isinstance(value, str):
+        value = value.split(',')
+    names = [name.strip().lower() for name in value or [] if name.strip()]
+    return [name for name in FORMATS if name in names] or list(FORMATS)
+
+
+def _profile_url(value):
+    """Link for a profile field: http(s) URLs as given, anything else (no scheme, javascript:, ...) under https://"""
+    if urlsplit(value.strip()).scheme.lower() in ('http', 'https'):
+        return value.strip()
+    return f"https://{value.strip()}"
+
+
+# ---------- PLAIN TEXT ----------
+def write_text(resume):
+    lines = [resume.name]
+    if resume.title:
+        lines.append(resume.title)
+    lines += [part for part in (resume.email, resume.phone, resume.location, resume.linkedin) if part]
+
+    for section in SECTIONS:
+        if section == 'education' and resume.education:
+            lines += ['', 'EDUCATION']
+            for entry in resume.education:
+                lines.append(', '.join(part for part in (entry.degree, entry.school, entry.year) if part))
+        elif section == 'experience' and resume.experience:
+            lines += ['', 'EXPERIENCE']
+            for i, entry in enumerate(resume.experience):
+                if i:
+                    lines.append('')
+                lines.append(', '.join(part for part in (entry.title, entry.company) if part))
+                if entry.date:
+                    lines.append(entry.date)
+                lines += [f"- {bullet}" for bullet in entry.bullets]
+        elif section == 'skills' and resume.skills:
+            lines += ['', 'SKILLS', ', '.join(resume.skills)]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# ---------- HTML ----------
+def write_html(resume):
+    contact = [escape(part) for part in (resume.email, resume.phone, resume.location) if part]
+    if resume.email:
+        contact[0] = f'<a href="mailto:{escape(resume.email)}">{escape(resume.email)}</a>'
+    if resume.linkedin:
+        contact.append(f'<a href="{escape(_profile_url(resume.linkedin))}">{escape(resume.linkedin)}</a>')
+
+    body = [f'<header>\n<h1>{escape(resume.name)}</h1>']
+    if resume.title:
+        body.append(f'<p class="title">{escape(resume.title)}</p>')
+    if contact:
+        body.append('<address>' + ' · '.join(contact) + '</address>')
+    body.append('</header>')
+
+    for section in SECTIONS:
+        if section == 'education' and resume.education:
+            body.append('<section id="education">\n<h2>Education</h2>')
+            for entry in resume.education:
+                year = f' <time>{escape(entry.year)}</time>' if entry.year else ''
+                school = f', {escape(entry.school)}' if entry.school else ''
+                body.append(f'<p><strong>{escape(entry.degree)}</strong>{school}{year}</p>')
+            body.append('</section>')
+        elif section == 'experience' and resume.experience:
+            body.append('<section id="experience">\n<h2>Experience</h2>')
+            for entry in resume.experience:
+                company = f' <span class="company">{escape(entry.company)}</span>' if entry.company else ''
+                body.append(f'<article>\n<h3>{escape(entry.title)}{company}</h3>')
+                if entry.date:
+                    body.append(f'<p class="date">{escape(entry.date)}</p>')
+                if entry.bullets:
+                    body.append('<ul>' + ''.join(f'<li>{escape(b)}</li>' for b in entry.bullets) + '</ul>')
+                body.append('</article>')
+            body.append('</section>')
+        elif section == 'skills' and resume.skills:
+            body.append('<section id="skills">\n<h2>Skills</h2>\n<ul class="skills">'
+                        + ''.join(f'<li>{escape(skill)}</li>' for skill in resume.skills) + '</ul>\n</section>')
+
+    html = f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{escape(resume.name)}{' – ' + escape(resume.title) if resume.title else ''}</title>
+<style>
+body{{font-family:Helvetica,Arial,sans-serif;max-width:46em;margin:2em auto;padding:0 1em;color:#222;line-height:1.45}}
+h1{{margin-bottom:0}}h2{{border-bottom:1px solid #ccc;padding-bottom:.2em;margin-top:1.6em}}
+h3{{margin-bottom:.2em}}.title{{margin:.2em 0;font-size:1.15em}}address{{font-style:normal;color:#555}}
+.company{{font-weight:normal;color:#555}}.date{{margin:0;color:#777}}
+.skills{{padding:0}}.skills li{{display:inline}}.skills li+li:before{{content:", "}}
+</style>
+</head>
+<body>
+{chr(10).join(body)}
+</body>
+</html>
+'''
+    return html.encode('utf-8')
+
+
+# ---------- JSON RESUME ----------
+_DATE_FORMATS = ('%b %Y', '%B %Y', '%m/%Y', '%Y-%m', '%Y')
+_CURRENT = {'present', 'current', 'now', 'today'}
+
+
+def _iso_date(text):
+    """'Jan 2022' -> '2022-01', '2019' -> '2019'; None if it can't be read"""
+    text = text.strip().rstrip('.')
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.strftime('%Y' if fmt == '%Y' else '%Y-%m')
+    return None
+
+
+def _date_range(text):
+    """(startDate, endDate) from 'Jan 2022 - Present'; unreadable parts are None"""
+    parts = [part for part in re.split(r'\s+(?:-|–|—|to)\s+|\s*[–—]\s*', text or '') if part.strip()]
+    if not parts:
+        return None, None
+    start = _iso_date(parts[0])
+    end = None
+    if len(parts) > 1 and parts[-1].strip().lower() not in _CURRENT:
+        end = _iso_date(parts[-1])
+    return start, end
+
+
+def write_json_resume(resume):
+    basics = {'name': resume.name}
+    if resume.title:
+        basics['label'] = resume.title
+    if resume.email:
+        basics['email'] = resume.email
+    if resume.phone:
+        basics['phone'] = resume.phone
+    if resume.location:
+        basics['location'] = {'address': resume.location}
+    if resume.linkedin:
+        basics['profiles'] = [{'network': 'LinkedIn', 'url': _profile_url(resume.linkedin)}]
+
+    work = []
+    for entry in resume.experience:
+        item = {'name': entry.company, 'position': entry.title}
+        start, end = _date_range(entry.date)
+        if start:
+            item['startDate'] = start
+        if end:
+            item['endDate'] = end
+        if entry.bullets:
+            item['highlights'] = list(entry.bullets)
+        work.append(item)
+
+    education = []
+    for entry in resume.education:
+        item = {'institution': entry.school, 'studyType': entry.degree}
+        year = _iso_date(entry.year) if entry.year else None
+        if year:
+            item['endDate'] = year
+        education.append(item)
+
+    document = {
+        '$schema': 'https://raw.githubusercontent.com/jsonresume/resume-schema/v1.0.0/schema.json',
+        'basics': basics,
+        'work': work,
+        'education': education,
+        'skills': [{'name': skill} for skill in resume.skills],
+    }
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+# ---------- DOCX ----------
+_W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+# Characters XML 1.0 can't carry, which a form field could still contain
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_DOCX_CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>'''
+
+_DOCX_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>'''
+
+_DOCX_DOCUMENT_RELS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>'''
+
+# Built-in style ids, so ATS parsers and Word's navigation pane see real headings
+_DOCX_STYLES = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:styles xmlns:w="{_W}">
+<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:cs="Calibri"/><w:sz w:val="22"/></w:rPr></w:rPrDefault>
+<w:pPrDefault><w:pPr><w:spacing w:after="60"/></w:pPr></w:pPrDefault></w:docDefaults>
+<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>
+<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>
+<w:rPr><w:b/><w:sz w:val="48"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Subtitle"><w:name w:val="Subtitle"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>
+<w:rPr><w:sz w:val="28"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>
+<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="80"/><w:pBdr><w:bottom w:val="single" w:sz="4" w:space="1" w:color="999999"/></w:pBdr><w:outlineLvl w:val="0"/></w:pPr>
+<w:rPr><w:b/><w:caps/><w:sz w:val="26"/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>
+<w:pPr><w:keepNext/><w:spacing w:before="120" w:after="0"/><w:outlineLvl w:val="1"/></w:pPr><w:rPr><w:b/></w:rPr></w:style>
+<w:style w:type="paragraph" w:styleId="ListBullet"><w:name w:val="List Bullet"/><w:basedOn w:val="Normal"/>
+<w:pPr><w:ind w:left="360" w:hanging="360"/></w:pPr></w:style>
+</w:styles>'''
+
+
+def _docx_paragraph(text, style=None):
+    props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    text = xml_escape(_XML_INVALID.sub('', text))
+    return f'<w:p>{props}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def write_docx(resume):
+    paragraphs = [_docx_paragraph(resume.name, 'Title')]
+    if resume.title:
+        paragraphs.append(_docx_paragraph(resume.title, 'Subtitle'))
+    contact = ' | '.join(part for part in (resume.email, resume.phone, resume.location, resume.linkedin) if part)
+    if contact:
+        paragraphs.append(_docx_paragraph(contact))
+
+    for section in SECTIONS:
+        if section == 'education' and resume.education:
+            paragraphs.append(_docx_paragraph(SECTION_TITLES[section], 'Heading1'))
+            for entry in resume.education:
+                paragraphs.append(_docx_paragraph(entry.text()))
+        elif section == 'experience' and resume.experience:
+            paragraphs.append(_docx_paragraph(SECTION_TITLES[section], 'Heading1'))
+            for entry in resume.experience:
+                paragraphs.append(_docx_paragraph(' | '.join(p for p in (entry.title, entry.company) if p), 'Heading2'))
+                if entry.date:
+                    paragraphs.append(_docx_paragraph(entry.date))
+                paragraphs += [_docx_paragraph(f"•\t{bullet}", 'ListBullet') for bullet in entry.bullets]
+        elif section == 'skills' and resume.skills:
+            paragraphs.append(_docx_paragraph(SECTION_TITLES[section], 'Heading1'))
+            paragraphs.append(_docx_paragraph(', '.join(resume.skills)))
+
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:document xmlns:w="{_W}"><w:body>'
+                + ''.join(paragraphs)
+                + '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+                  '<w:pgMar w:top="1080" w:right="1080" w:bottom="1080" w:left="1080"'
+                  ' w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+                  '</w:body></w:document>')
+    return _zip_bytes([('[Content_Types].xml', _DOCX_CONTENT_TYPES), ('_rels/.rels', _DOCX_RELS),
+                       ('word/_rels/document.xml.rels', _DOCX_DOCUMENT_RELS),
+                       ('word/styles.xml', _DOCX_STYLES), ('word/document.xml', document)])
+
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            info = zipfile.ZipInfo(name, ZIP_DATE)
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+WRITERS = {
+    'docx': write_docx,
+    'txt': write_text,
+    'html': write_html,
+    'json': write_json_resume,
+}
+
+
+# ---------- CACHE ----------
+class ExportCache:
+    """Rendered exports by key, LRU-bounded by total size"""
+
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_cache = ExportCache()
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='export')
+
+
+def configure(max_bytes=EXPORT_CACHE_MAX_BYTES, threads=4):
+    """Size the export cache and writer pool (called from create_app)"""
+    global _cache, _executor
+    _cache = ExportCache(max_bytes)
+    _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='export')
+
+
+def export_stats():
+    return dict(_cache.stats)
+
+
+def export_key(resume, fmt):
+    """Hash of everything a writer's output depends on; the PDF's is its render cache key"""
+    if fmt == 'pdf':
+        return render_cache.cache_key(resume)
+    data = resume.to_dict()
+    # Only the PDF is styled by the template
+    data.pop('template_style', None)
+    payload = json.dumps([fmt, EXPORT_VERSION, data], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ---------- PIPELINE ----------
+def _write(fmt, resume):
+    with metrics.job_context(f'export_{fmt}'), metrics.span('export_write'):
+        return WRITERS[fmt](resume)
+
+
+def export_resume(conn, resume, formats, pool_size, cache_max_bytes, timeout=None):
+    """
+    {format: (key, bytes)} for one parsed resume, in FORMATS order. Cached
+    exports are returned as they are; the rest are written concurrently.
+    """
+    from render_pool import render_cached
+
+    results, futures = {}, {}
+    for fmt in formats:
+        if fmt == 'pdf':
+            continue
+        key = export_key(resume, fmt)
+        body = _cache.get(key)
+        if body is not None:
+            results[fmt] = (key, body)
+        else:
+            futures[fmt] = (key, _executor.submit(_write, fmt, resume))
+
+    # The PDF renders on the render pool (or comes from its cache) meanwhile
+    if 'pdf' in formats:
+        entry = render_cached(conn, [resume], pool_size, cache_max_bytes, timeout=timeout)[0]
+        with metrics.span('file_io'):
+            results['pdf'] = (entry['key'], b''.join(storage.backend().open(entry['filename'])))
+
+    for fmt, (key, future) in futures.items():
+        body = future.result(timeout=timeout)
+        _cache.put(key, body)
+        results[fmt] = (key, body)
+    return {fmt: results[fmt] for fmt in FORMATS if fmt in results}
+
+
+def file_stem(name):
+    """`name` without characters that can't appear in file names on common systems"""
+    return re.sub(r'[<>:"|?*\x00-\x1f]', '_', name)
+
+
+def bundle(base_name, exports):
+    """ZIP of several exports named <base_name>.<extension>; the same name and exports give the same bytes"""
+    return _zip_bytes([(f"{base_name}.{FORMATS[fmt].extension}", body) for fmt, (_, body) in exports.items()])
+
+
+def bundle_etag(base_name, exports):
+    """Strong ETag of bundle(base_name, exports): covers the entry names as well as their contents"""
+    tags = ' '.join([base_name, *(f"{fmt}:{key}" for fmt, (key, _) in exports.items())])
+    return hashlib.sha256(tags.encode('utf-8')).hexdigest()
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for production:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is built once in the master (preload_app) and warmed there (see
+warmup.py): ReportLab, the fonts, the compiled templates and the template
+picker images are loaded before the fork and shared copy-on-write, so a new
+worker serves its first request at full speed. Background threads can't be
+inherited through a fork, so each worker starts its own once it's up.
+
+Set GUNICORN_PRELOAD=0 to have every worker build the app itself (each worker
+then loads ReportLab on first use; add WARM_ON_START=1 to load it at boot).
+Workers, bind address and the rest come from the usual gunicorn flags and
+environment (WEB_CONCURRENCY, PORT, GUNICORN_CMD_ARGS).
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+if preload_app:
+    # Read by app.load_config: warm up, and leave the background threads to post_worker_init
+    os.environ['PRELOAD_APP'] = '1'
+
+
+def post_worker_init(worker):
+    if worker.cfg.preload_app:
+        from app import start_background
+        # app:app is the Flask app; asgi:application (uvicorn workers) wraps it
+        flask_app = worker.wsgi if hasattr(worker.wsgi, 'config') else getattr(worker.wsgi, 'wsgi_app', None)
+        if hasattr(flask_app, 'config'):
+            start_background(flask_app)
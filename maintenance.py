@@ -0,0 +1,511 @@
+"""
+Database and storage maintenance.
+
+Tasks, each run at most once per interval:
+
+    vacuum    return free pages to the OS a slice at a time (incremental
+              auto_vacuum) and truncate the WAL
+    analyze   PRAGMA optimize, and merge the search index's segments
+    archive   move resumes older than RETENTION_DAYS to cold storage
+    quotas    archive each user's oldest resumes beyond QUOTA_MAX_RESUMES
+              rows or QUOTA_MAX_BYTES of PDFs
+    sessions  drop expired login sessions
+    orphans   delete stored PDFs nothing references (older than an hour)
+
+Cold storage is ARCHIVE_DIR/resumes-<time>.jsonl.gz: one JSON record per
+resume (its row, sections and why it was archived), written as a complete
+gzip member per batch and fsynced before the rows are deleted. `restore`
+brings records back, re-rendering their PDFs through the render cache.
+
+Each run claims the task's row in `maintenance_runs`, so every app worker
+can run the in-process scheduler (MAINTENANCE_SCHEDULER=1, off by default)
+next to a cron `run` and a task still runs once per interval. `orphans`
+does nothing while any resume still lacks a storage_key (`python storage.py
+backfill` fills them).
+
+    python maintenance.py run [--force]          # every task that is due (cron)
+    python maintenance.py schedule               # keep running tasks as they fall due
+    python maintenance.py vacuum [--full]        # one task now (likewise analyze, archive, ...)
+    python maintenance.py restore FILE [--user someone@example.com]
+    python maintenance.py stats [--storage]
+    python maintenance.py inspect resumes [--user EMAIL] [--limit 50] [--after ID] [--all] [--json]
+"""
+from datetime import datetime, timedelta
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import logging
+
+from models import get_db
+from resume_model import Resume
+from resume_store import load_resume
+import storage
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = 'archive'
+BATCH_SIZE = 200
+# Pages (of 4 KiB by default) an incremental vacuum frees per run
+VACUUM_PAGES = 2000
+# Free pages above this share of the file are worth a one-off full VACUUM
+FULL_VACUUM_FREE_RATIO = 0.25
+SCHEDULER_TICK = 60
+
+TASK_INTERVALS = {
+    'vacuum': 60 * 60,
+    'analyze': 24 * 60 * 60,
+    'archive': 24 * 60 * 60,
+    'quotas': 60 * 60,
+    'sessions': 60 * 60,
+    'orphans': 24 * 60 * 60,
+}
+
+
+def settings_from_config(config):
+    """Maintenance settings from app config (or os.environ, for the command line)"""
+    return {
+        'archive_dir': config.get('ARCHIVE_DIR', ARCHIVE_DIR),
+        'retention_days': int(config.get('RETENTION_DAYS', 0)),
+        'quota_max_resumes': int(config.get('QUOTA_MAX_RESUMES', 0)),
+        'quota_max_bytes': int(config.get('QUOTA_MAX_BYTES', 0)),
+        'vacuum_pages': int(config.get('VACUUM_PAGES', VACUUM_PAGES)),
+        'render_pool_size': int(config.get('RENDER_POOL_SIZE', os.cpu_count() or 2)),
+        'render_cache_max_bytes': int(config.get('RENDER_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    }
+
+
+# ---------- VACUUM / ANALYZE ----------
+def vacuum(conn, settings):
+    """Free up to `vacuum_pages` pages and truncate the WAL"""
+    mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    pages = conn.execute('PRAGMA page_count').fetchone()[0]
+    free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    result = {'pages': pages, 'free_pages': free}
+    if mode == 2:
+        # The pragma only frees pages as its result rows are stepped through
+        conn.execute(f"PRAGMA incremental_vacuum({int(settings['vacuum_pages'])})").fetchall()
+        result['freed'] = free - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    elif pages and free / pages > FULL_VACUUM_FREE_RATIO:
+        result['advice'] = 'run `python maintenance.py vacuum --full` once to enable incremental vacuum'
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+    return result
+
+
+def full_vacuum(db_path):
+    """Rebuild the file with incremental auto_vacuum; blocks writers while it runs"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        before = os.path.getsize(db_path)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return {'bytes_before': before, 'bytes_after': os.path.getsize(db_path)}
+    finally:
+        conn.close()
+
+
+def analyze(conn, settings):
+    """Refresh planner statistics where they're stale and merge the FTS index"""
+    conn.execute('PRAGMA optimize').fetchall()
+    result = {'optimized': True}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'resumes_fts'").fetchone():
+        conn.execute("INSERT INTO resumes_fts (resumes_fts) VALUES ('optimize')")
+        conn.commit()
+        result['fts'] = 'optimized'
+    return result
+
+
+# ---------- ARCHIVING ----------
+def _archive_path(settings):
+    os.makedirs(settings['archive_dir'], exist_ok=True)
+    return os.path.join(settings['archive_dir'], f"resumes-{datetime.now().strftime('%Y%m%dT%H%M%S')}.jsonl.gz")
+
+
+def archive_resumes(conn, resume_ids, reason, path):
+    """
+    Append the resumes to the cold-storage file at `path`, then delete them
+    and release their PDFs. Returns how many were archived.
+    """
+    records = []
+    for resume_id in resume_ids:
+        row = conn.execute('''SELECT r.user_id, u.email, r.created_at, r.storage_key, r.byte_size, r.checksum
+                              FROM resumes r LEFT JOIN users u ON u.id = r.user_id WHERE r.id = ?''',
+                           (resume_id,)).fetchone()
+        resume = load_resume(conn, resume_id)
+        if row is None or resume is None:
+            continue
+        records.append({'id': resume_id, 'user_id': row[0], 'user_email': row[1], 'created_at': row[2],
+                        'storage_key': row[3], 'byte_size': row[4], 'checksum': row[5],
+                        'reason': reason, 'archived_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'resume': resume.to_dict()})
+    if not records:
+        return 0
+
+    # A whole gzip member per batch: the file stays readable if a later batch fails
+    data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(data))
+        f.flush()
+        os.fsync(f.fileno())
+
+    ids = [record['id'] for record in records]
+    conn.execute(f"DELETE FROM resumes WHERE id IN ({','.join('?' * len(ids))})", ids)
+    conn.commit()
+    for storage_key in {record['storage_key'] for record in records}:
+        storage.release(conn, storage_key)
+    return len(records)
+
+
+def archive_expired(conn, settings):
+    """Archive resumes created more than `retention_days` ago"""
+    if not settings['retention_days']:
+        return {'skipped': 'RETENTION_DAYS not set'}
+    cutoff = (datetime.now() - timedelta(days=settings['retention_days'])).strftime('%Y-%m-%d %H:%M:%S')
+    path = _archive_path(settings)
+    archived = last_id = 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM resumes WHERE id > ? AND created_at < ? ORDER BY id LIMIT ?',
+            (last_id, cutoff, BATCH_SIZE))]
+        if not ids:
+            break
+        last_id = ids[-1]
+        archived += archive_resumes(conn, ids, 'retention', path)
+    return {'archived': archived, 'file': path if archived else None}
+
+
+# ---------- QUOTAS ----------
+def quota_usage(conn, user_id):
+    """(saved resumes, bytes of their PDFs) for one user"""
+    return tuple(conn.execute('SELECT COUNT(*), COALESCE(SUM(byte_size), 0) FROM resumes WHERE user_id = ?',
+                              (user_id,)).fetchone())
+
+
+def over_quota(conn, user_id, max_resumes, max_bytes, adding=1):
+    """A message if the user can't save `adding` more resumes, else None (a limit of 0 is no limit)"""
+    if not max_resumes and not max_bytes:
+        return None
+    count, total = quota_usage(conn, user_id)
+    if max_resumes and count + adding > max_resumes:
+        return (f"You have {count} of {max_resumes} saved resumes. "
+                f"Delete some from your dashboard to save more.")
+    if max_bytes and total >= max_bytes:
+        return (f"Your saved resumes use {total // (1024 * 1024)} MB of your {max_bytes // (1024 * 1024)} MB. "
+                f"Delete some from your dashboard to save more.")
+    return None
+
+
+def enforce_quotas(conn, settings):
+    """Archive each user's oldest resumes until they're back within both limits"""
+    max_resumes, max_bytes = settings['quota_max_resumes'], settings['quota_max_bytes']
+    if not max_resumes and not max_bytes:
+        return {'skipped': 'no quota set'}
+    over = conn.execute('''SELECT user_id, COUNT(*), COALESCE(SUM(byte_size), 0) FROM resumes
+                           WHERE user_id IS NOT NULL GROUP BY user_id
+                           HAVING (? > 0 AND COUNT(*) > ?) OR (? > 0 AND COALESCE(SUM(byte_size), 0) > ?)''',
+                        (max_resumes, max_resumes, max_bytes, max_bytes)).fetchall()
+    path = _archive_path(settings)
+    archived = 0
+    for user_id, count, total in over:
+        excess = []
+        for resume_id, byte_size in conn.execute(
+                'SELECT id, COALESCE(byte_size, 0) FROM resumes WHERE user_id = ? ORDER BY created_at, id', (user_id,)):
+            if (not max_resumes or count <= max_resumes) and (not max_bytes or total <= max_bytes):
+                break
+            excess.append(resume_id)
+            count -= 1
+            total -= byte_size
+        for start in range(0, len(excess), BATCH_SIZE):
+            archived += archive_resumes(conn, excess[start:start + BATCH_SIZE], 'quota', path)
+    return {'users_over_quota': len(over), 'archived': archived, 'file': path if archived else None}
+
+
+# ---------- RESTORE ----------
+def read_archive(path):
+    """Yield the records of a cold-storage file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore(conn, path, settings, user_email=None):
+    """Save archived resumes again (re-rendered through the render cache); returns how many"""
+    from render_pool import render_cached
+    from resume_store import save_resumes
+
+    restored = 0
+    batch = []
+    records = (record for record in read_archive(path)
+               if user_email is None or record.get('user_email') == user_email)
+    for record in records:
+        user = conn.execute('SELECT id FROM users WHERE email = ?', (record.get('user_email'),)).fetchone()
+        if user is None:
+            logger.warning(f"Skipping archived resume {record['id']}: user {record.get('user_email')} no longer exists")
+            continue
+        batch.append((user[0], Resume.from_dict(record['resume']), record['created_at']))
+        if len(batch) == BATCH_SIZE:
+            restored += _restore_batch(conn, batch, settings, render_cached, save_resumes)
+            batch = []
+    if batch:
+        restored += _restore_batch(conn, batch, settings, render_cached, save_resumes)
+    return restored
+
+
+def _restore_batch(conn, batch, settings, render_cached, save_resumes):
+    entries = render_cached(conn, [resume for _, resume, _ in batch],
+                            settings['render_pool_size'], settings['render_cache_max_bytes'])
+    save_resumes(conn, [(user_id, resume, created_at, entry['key'], entry['byte_size'], entry['checksum'])
+                        for (user_id, resume, created_at), entry in zip(batch, entries)])
+    return len(batch)
+
+
+# ---------- SESSIONS / ORPHANS ----------
+def purge_sessions(conn, settings):
+    count = conn.execute('DELETE FROM sessions WHERE expires_at < ?', (time.time(),)).rowcount
+    conn.commit()
+    return {'expired_sessions': count}
+
+
+def delete_orphans(conn, settings):
+    """Delete unreferenced PDFs; young ones may belong to a render that hasn't saved its row yet"""
+    legacy = conn.execute('SELECT COUNT(*) FROM resumes WHERE storage_key IS NULL').fetchone()[0]
+    if legacy:
+        # Their files can only be matched by guessing names; don't delete on a guess
+        return {'skipped': f'{legacy} resumes have no storage_key; run `python storage.py backfill` first'}
+    count = total = 0
+    for key, byte_size in storage.find_orphans(conn, min_age=storage.TMP_GRACE_SECONDS):
+        try:
+            storage.backend().delete(key)
+        except OSError as e:
+            logger.error(f"Error deleting file {key}: {e}")
+            continue
+        count += 1
+        total += byte_size
+    return {'deleted': count, 'bytes': total}
+
+
+TASKS = {
+    'vacuum': vacuum,
+    'analyze': analyze,
+    'archive': archive_expired,
+    'quotas': enforce_quotas,
+    'sessions': purge_sessions,
+    'orphans': delete_orphans,
+}
+
+
+# ---------- SCHEDULING ----------
+def claim(conn, task, interval, now=None):
+    """True if this caller gets to run `task` now (no one has within `interval` seconds)"""
+    now = now or time.time()
+    conn.execute('INSERT OR IGNORE INTO maintenance_runs (task, last_started) VALUES (?, 0)', (task,))
+    claimed = conn.execute('UPDATE maintenance_runs SET last_started = ? WHERE task = ? AND last_started <= ?',
+                           (now, task, now - interval)).rowcount == 1
+    conn.commit()
+    return claimed
+
+
+def run_task(conn, task, settings):
+    """Run one task and record its outcome; returns the result dict"""
+    started = time.time()
+    try:
+        result = TASKS[task](conn, settings)
+        error = None
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Maintenance task {task} failed: {e}")
+        result, error = {}, str(e)
+    result['seconds'] = round(time.time() - started, 3)
+    conn.execute('''INSERT INTO maintenance_runs (task, last_started, last_finished, last_result, last_error)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (task) DO UPDATE SET last_started = excluded.last_started,
+                        last_finished = excluded.last_finished, last_result = excluded.last_result,
+                        last_error = excluded.last_error''',
+                 (task, started, time.time(), json.dumps(result), error))
+    conn.commit()
+    if error is None:
+        logger.info(f"Maintenance {task}: {result}")
+    return result
+
+
+def run_due(settings, force=False, tasks=None):
+    """Run every task that is due (all of them with `force`); returns {task: result}"""
+    results = {}
+    conn = get_db()
+    try:
+        for task in tasks or TASKS:
+            if force or claim(conn, task, TASK_INTERVALS[task]):
+                results[task] = run_task(conn, task, settings)
+    finally:
+        conn.close()
+    return results
+
+
+_scheduler = None
+
+
+def start_scheduler(settings, tick=SCHEDULER_TICK):
+    """Run due tasks in a daemon thread of this process (one per process)"""
+    global _scheduler
+    if _scheduler is not None and _scheduler.is_alive():
+        return _scheduler
+
+    def loop():
+        while True:
+            # Out of the way of startup; claims keep a fleet of workers to one run per interval
+            time.sleep(tick)
+            try:
+                run_due(settings)
+            except Exception as e:
+                logger.error(f"Maintenance scheduler error: {e}")
+
+    _scheduler = threading.Thread(target=loop, name='maintenance', daemon=True)
+    _scheduler.start()
+    return _scheduler
+
+
+# ---------- INSPECTION ----------
+# Columns worth reading; no password hashes, session data or resume bodies
+INSPECT = {
+    'users': ('users', 'id', ['id', 'email']),
+    'resumes': ('resumes', 'id', ['id', 'user_id', 'name', 'template_style', 'created_at', 'storage_key', 'byte_size']),
+    'jobs': ('render_jobs', 'rowid', ['rowid', 'id', 'user_id', 'status', 'filename', 'error', 'updated_at']),
+    'cache': ('render_cache', 'rowid', ['rowid', 'key', 'byte_size', 'hits', 'last_used']),
+    'sessions': ('sessions', 'rowid', ['rowid', 'user_id', 'expires_at']),
+    'maintenance': ('maintenance_runs', 'rowid', ['rowid', 'task', 'last_started', 'last_finished', 'last_result', 'last_error']),
+}
+
+
+def inspect_rows(conn, name, user_id=None, after=0, limit=50):
+    """Yield rows of one table as dicts in key order, starting after `after`; `limit` None reads all"""
+    table, key, columns = INSPECT[name]
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {key} > ?"
+    params = [after]
+    if user_id is not None and 'user_id' in columns:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    page_size = min(limit or BATCH_SIZE, BATCH_SIZE)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = conn.execute(f'{query} ORDER BY {key} LIMIT ?', params + [size]).fetchall()
+        for row in rows:
+            yield dict(zip(columns, row))
+        if len(rows) < size:
+            return
+        params[0] = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def database_stats(conn, with_storage=False):
+    pragma = lambda name: conn.execute(f'PRAGMA {name}').fetchone()[0]
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    stats = {
+        'file_bytes': os.path.getsize(path) if path and os.path.exists(path) else None,
+        'wal_bytes': os.path.getsize(path + '-wal') if path and os.path.exists(path + '-wal') else 0,
+        'page_size': pragma('page_size'),
+        'pages': pragma('page_count'),
+        'free_pages': pragma('freelist_count'),
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}[pragma('auto_vacuum')],
+    }
+    for name in ('users', 'resumes', 'render_jobs', 'render_cache', 'sessions'):
+        stats[f'{name}_rows'] = conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+    stats['resume_pdf_bytes'] = conn.execute('SELECT COALESCE(SUM(byte_size), 0) FROM resumes').fetchone()[0]
+    if with_storage:
+        objects = [byte_size for _, byte_size, _ in storage.backend().list()]
+        stats['stored_objects'], stats['stored_bytes'] = len(objects), sum(objects)
+    return stats
+
+
+# ---------- CLI ----------
+def _print_rows(rows, as_json):
+    columns = None
+    last = None
+    for row in rows:
+        if as_json:
+            print(json.dumps(row, ensure_ascii=False, default=str))
+        else:
+            if columns is None:
+                columns = list(row)
+                print('\t'.join(columns))
+            print('\t'.join('' if row[c] is None else str(row[c]) for c in columns))
+        last = row
+    return last
+
+
+def main():
+    import models
+
+    parser = argparse.ArgumentParser(description='Database and storage maintenance')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='run every task that is due')
+    run.add_argument('--force', action='store_true', help='run every task, due or not')
+    sub.add_parser('schedule', help='keep running tasks as they fall due')
+    for task in TASKS:
+        task_parser = sub.add_parser(task, help=f'run the {task} task now')
+        if task == 'vacuum':
+            task_parser.add_argument('--full', action='store_true',
+                                     help='rebuild the file once and switch it to incremental vacuum')
+    restore_parser = sub.add_parser('restore', help='bring archived resumes back')
+    restore_parser.add_argument('file')
+    restore_parser.add_argument('--user', help='only this email address')
+    stats_parser = sub.add_parser('stats', help='database and storage size')
+    stats_parser.add_argument('--storage', action='store_true', help='also list the storage backend')
+    inspect_parser = sub.add_parser('inspect', help='page through a table')
+    inspect_parser.add_argument('table', choices=sorted(INSPECT))
+    inspect_parser.add_argument('--user', help='only rows of this email address')
+    inspect_parser.add_argument('--limit', type=int, default=50)
+    inspect_parser.add_argument('--after', type=int, default=0, help='start after this id')
+    inspect_parser.add_argument('--all', action='store_true', help='stream every row')
+    inspect_parser.add_argument('--json', action='store_true', help='one JSON object per line')
+    args = parser.parse_args()
+
+    models.set_database(os.environ.get('DATABASE', 'users.db'))
+    models.init_db()
+    storage.configure(storage.settings_from_config(os.environ))
+    settings = settings_from_config(os.environ)
+
+    if args.command == 'vacuum' and args.full:
+        print(json.dumps(full_vacuum(models.DB_PATH)))
+        return
+    if args.command == 'schedule':
+        start_scheduler(settings).join()
+        return
+    if args.command in ('run', *TASKS):
+        tasks = None if args.command == 'run' else [args.command]
+        results = run_due(settings, force=args.command != 'run' or args.force, tasks=tasks)
+        for task, result in results.items():
+            print(f"{task}: {json.dumps(result)}")
+        return
+
+    conn = get_db()
+    try:
+        if args.command == 'restore':
+            print(f"Restored {restore(conn, args.file, settings, args.user)} resumes")
+        elif args.command == 'stats':
+            for name, value in database_stats(conn, args.storage).items():
+                print(f"{name}: {value}")
+        else:
+            user_id = None
+            if args.user:
+                row = conn.execute('SELECT id FROM users WHERE email = ?', (args.user.strip().lower(),)).fetchone()
+                if row is None:
+                    parser.error(f"No user {args.user}")
+                user_id = row[0]
+            last = _print_rows(inspect_rows(conn, args.table, user_id, args.after, None if args.all else args.limit),
+                               args.json)
+            if last is not None and not args.all:
+                print(f"-- next page: --after {next(iter(last.values()))}", file=sys.stderr)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
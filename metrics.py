@@ -0,0 +1,260 @@
+"""
+Request timing and a Prometheus-style /metrics endpoint.
+
+Routes wrap their main phases in `span('name')`: form parsing, rendering,
+SQLite reads/writes and file I/O. Each span, and each request as a whole,
+lands in a latency histogram. Render phases that run in pool processes are
+shipped back with the job result and merged into the web worker's
+histograms. The figures are per process, so scrape each gunicorn worker, or
+sum across scrapes.
+
+Slow-request profiling is opt-in:
+
+    PROFILE_SAMPLE_RATE = 0.05      # profile 5% of requests
+    PROFILE_SLOW_MS = 500           # keep the profile only if the request took longer
+    PROFILE_DIR = 'profiles'
+
+pyinstrument is used when installed (HTML reports), cProfile otherwise (.prof
+files for pstats/snakeviz).
+
+/metrics is not public. With METRICS_TOKEN set, scrapers authenticate with
+`Authorization: Bearer <token>`. Without it, only clients on the loopback
+address that didn't come through a proxy (no X-Forwarded-For) are answered.
+"""
+from contextlib import contextmanager
+from bisect import bisect_left
+import cProfile
+import hmac
+import ipaddress
+import logging
+import os
+import random
+import threading
+import time
+
+from flask import Response, abort, current_app, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ---------- HISTOGRAMS ----------
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by label values"""
+
+    def __init__(self, name, help_text, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}       # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+            series[index] += 1
+            series[-1] += value
+
+    def drain(self):
+        """Take (and reset) everything observed so far, for merging into another process"""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series):
+        with self._lock:
+            for labels, values in series.items():
+                current = self._series.setdefault(tuple(labels), [0] * (len(self.buckets) + 1) + [0.0])
+                for i, value in enumerate(values):
+                    current[i] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels))
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {values[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('cvbuilder_request_seconds', 'Request latency by endpoint',
+                            ('endpoint', 'method', 'status'))
+SPAN_SECONDS = Histogram('cvbuilder_span_seconds', 'Time spent in a phase of a request or render job',
+                         ('endpoint', 'span'))
+
+
+# ---------- SPANS ----------
+_context = threading.local()
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into SPAN_SECONDS under the current endpoint"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - start, current_endpoint(), name)
+
+
+def current_endpoint():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return getattr(_context, 'endpoint', 'background')
+
+
+@contextmanager
+def job_context(endpoint):
+    """Label spans recorded outside a request (pool jobs, background threads)"""
+    previous = getattr(_context, 'endpoint', None)
+    _context.endpoint = endpoint
+    try:
+        yield
+    finally:
+        _context.endpoint = previous
+
+
+def drain_spans():
+    return SPAN_SECONDS.drain()
+
+
+def merge_spans(series):
+    if series:
+        SPAN_SECONDS.merge(series)
+
+
+# ---------- EXPOSITION ----------
+def render_metrics():
+    """Prometheus text format for this process"""
+    import render_cache
+    from models import pool_metrics
+
+    lines = REQUEST_SECONDS.expose() + SPAN_SECONDS.expose()
+
+    lines += ['# HELP cvbuilder_render_cache_total Render cache lookups and evictions',
+              '# TYPE cvbuilder_render_cache_total counter']
+    lines += [f'cvbuilder_render_cache_total{{result="{name}"}} {value}'
+              for name, value in sorted(render_cache.cache_stats().items())]
+
+    from pdf_preview import preview_stats
+    lines += ['# HELP cvbuilder_preview_cache_total Live preview section/image cache lookups',
+              '# TYPE cvbuilder_preview_cache_total counter']
+    lines += [f'cvbuilder_preview_cache_total{{result="{name}"}} {value}'
+              for name, value in sorted(preview_stats().items())]
+
+    from exports import export_stats
+    lines += ['# HELP cvbuilder_export_cache_total Export (DOCX/text/HTML/JSON) cache lookups',
+              '# TYPE cvbuilder_export_cache_total counter']
+    lines += [f'cvbuilder_export_cache_total{{result="{name}"}} {value}'
+              for name, value in sorted(export_stats().items())]
+
+    from sessions import user_cache_stats
+    lines += ['# HELP cvbuilder_session_user_cache_total Session user record cache lookups',
+              '# TYPE cvbuilder_session_user_cache_total counter']
+    lines += [f'cvbuilder_session_user_cache_total{{result="{name}"}} {value}'
+              for name, value in sorted(user_cache_stats().items())]
+
+    pool = pool_metrics()
+    lines += ['# HELP cvbuilder_db_pool SQLite connection pool counters and gauges',
+              '# TYPE cvbuilder_db_pool gauge']
+    lines += [f'cvbuilder_db_pool{{stat="{name}"}} {value}' for name, value in sorted(pool.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed():
+    """Whether the current request may read /metrics (see the module docstring)"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(value.encode(), token.encode())
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+# ---------- PROFILING ----------
+def _start_profile():
+    try:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        return ('pyinstrument', profiler)
+    except ImportError:
+        pass
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another request's profiler is already active
+        return None
+    return ('cprofile', profiler)
+
+
+def _finish_profile(profile, elapsed):
+    kind, profiler = profile
+    if kind == 'pyinstrument':
+        profiler.stop()
+    else:
+        profiler.disable()
+
+    threshold = current_app.config.get('PROFILE_SLOW_MS', 500)
+    if elapsed * 1000 < threshold:
+        return
+
+    directory = current_app.config.get('PROFILE_DIR', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    stem = f"{time.strftime('%Y%m%d%H%M%S')}_{request.endpoint or 'unknown'}_{elapsed * 1000:.0f}ms"
+    if kind == 'pyinstrument':
+        path = os.path.join(directory, stem + '.html')
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        path = os.path.join(directory, stem + '.prof')
+        profiler.dump_stats(path)
+    logger.info(f"Slow request {request.method} {request.path} took {elapsed * 1000:.0f} ms, profile in {path}")
+
+
+# ---------- FLASK HOOKS ----------
+def init_app(app):
+    """Time every request, optionally profile slow ones, and serve /metrics"""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+        g.profile = _start_profile() if rate and random.random() < rate else None
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            REQUEST_SECONDS.observe(elapsed, request.endpoint or 'unknown', request.method,
+                                    str(response.status_code))
+            profile = g.pop('profile', None)
+            if profile:
+                _finish_profile(profile, elapsed)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not metrics_allowed():
+            abort(403)
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,10 +1,19 @@
+from flask import g, has_app_context
 import sqlite3
+import threading
+import queue
+import time
 import os
 
+DB_PATH = 'users.db'
+
 def init_db():
     os.makedirs("static/resumes", exist_ok=True)
-    conn = sqlite3.connect('users.db')
+    conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
+    # Lets maintenance.py hand free pages back a slice at a time; only takes
+    # effect on a new file (`python maintenance.py vacuum --full` converts an old one)
+    c.execute('PRAGMA auto_vacuum = INCREMENTAL')
 
     c.execute('''CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,8 +34,370 @@ def init_db():
                     created_at TEXT,
                     FOREIGN KEY (user_id) REFERENCES users(id)
                 )''')
+
+    # Queue for off-request PDF rendering (see render_pool.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS render_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    filename TEXT,
+                    error TEXT,
+                    resume_id INTEGER,
+                    created_at REAL,
+                    updated_at REAL,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON render_jobs (status, updated_at)')
+
+    # Server-side login sessions (see sessions.py); id is the sha256 of the cookie value
+    c.execute('''CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+
+    # Last run of each maintenance task (see maintenance.py); claimed atomically so workers don't double up
+    c.execute('''CREATE TABLE IF NOT EXISTS maintenance_runs (
+                    task TEXT PRIMARY KEY,
+                    last_started REAL NOT NULL DEFAULT 0,
+                    last_finished REAL,
+                    last_result TEXT,
+                    last_error TEXT
+                )''')
+
+    # Content-addressed PDF cache index (see render_cache.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS render_cache (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    byte_size INTEGER NOT NULL,
+                    hits INTEGER DEFAULT 0,
+                    last_used REAL,
+                    created_at REAL
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_render_cache_last_used ON render_cache (last_used)')
+
+    # Rows share rendered PDFs through the cache key
+    _ensure_column(c, 'resumes', 'blob_key', 'TEXT')
+    _ensure_column(c, 'render_jobs', 'blob_key', 'TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_resumes_blob_key ON resumes (blob_key)')
+
+    # Where each row's PDF lives (see storage.py)
+    _ensure_column(c, 'resumes', 'storage_key', 'TEXT')
+    _ensure_column(c, 'resumes', 'byte_size', 'INTEGER')
+    _ensure_column(c, 'resumes', 'checksum', 'TEXT')
+    _ensure_column(c, 'render_cache', 'checksum', 'TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_resumes_storage_key ON resumes (storage_key)')
+
+    # Dashboard listing: newest-first per user, keyset paginated on (created_at, id)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_resumes_user_created ON resumes (user_id, created_at, id)')
+
+    # Normalized sections (see resume_model.py); the text columns above are kept for older readers
+    _ensure_column(c, 'resumes', 'title', 'TEXT')
+    _ensure_column(c, 'resumes', 'location', 'TEXT')
+    _ensure_column(c, 'resumes', 'linkedin', 'TEXT')
+    migrate_sections = not _table_exists(c, 'education_entry')
+    c.execute('''CREATE TABLE IF NOT EXISTS education_entry (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    resume_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    degree TEXT,
+                    school TEXT,
+                    year TEXT,
+                    FOREIGN KEY (resume_id) REFERENCES resumes(id)
+                )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS experience_entry (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    resume_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    title TEXT,
+                    company TEXT,
+                    date TEXT,
+                    description TEXT,
+                    FOREIGN KEY (resume_id) REFERENCES resumes(id)
+                )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS skill (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    resume_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    FOREIGN KEY (resume_id) REFERENCES resumes(id)
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_education_entry_resume ON education_entry (resume_id, position)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_experience_entry_resume ON experience_entry (resume_id, position)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_skill_resume ON skill (resume_id, position)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_skill_name ON skill (name COLLATE NOCASE)')
+    # Foreign keys aren't enforced on these connections, so deletes cascade by trigger
+    c.execute('''CREATE TRIGGER IF NOT EXISTS resumes_delete_sections AFTER DELETE ON resumes BEGIN
+                    DELETE FROM education_entry WHERE resume_id = old.id;
+                    DELETE FROM experience_entry WHERE resume_id = old.id;
+                    DELETE FROM skill WHERE resume_id = old.id;
+                 END''')
+    if migrate_sections:
+        from resume_store import migrate_legacy_rows
+        migrate_legacy_rows(conn)
+
+    # Full-text index for dashboard search (see search.py), over the flattened section columns
+    build_index = not _table_exists(c, 'resumes_fts')
+    try:
+        c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS resumes_fts USING fts5(
+                        name, title, education, experience, skills,
+                        content='resumes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                     )''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search falls back to LIKE
+        build_index = False
+    else:
+        c.execute('''CREATE TRIGGER IF NOT EXISTS resumes_fts_insert AFTER INSERT ON resumes BEGIN
+                        INSERT INTO resumes_fts (rowid, name, title, education, experience, skills)
+                        VALUES (new.id, new.name, new.title, new.education, new.experience, new.skills);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS resumes_fts_delete AFTER DELETE ON resumes BEGIN
+                        INSERT INTO resumes_fts (resumes_fts, rowid, name, title, education, experience, skills)
+                        VALUES ('delete', old.id, old.name, old.title, old.education, old.experience, old.skills);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS resumes_fts_update
+                     AFTER UPDATE OF name, title, education, experience, skills ON resumes BEGIN
+                        INSERT INTO resumes_fts (resumes_fts, rowid, name, title, education, experience, skills)
+                        VALUES ('delete', old.id, old.name, old.title, old.education, old.experience, old.skills);
+                        INSERT INTO resumes_fts (rowid, name, title, education, experience, skills)
+                        VALUES (new.id, new.name, new.title, new.education, new.experience, new.skills);
+                     END''')
+    if build_index:
+        c.execute("INSERT INTO resumes_fts (resumes_fts) VALUES ('rebuild')")
     conn.commit()
     conn.close()
 
+def _table_exists(c, table):
+    return c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+def _ensure_column(c, table, column, decl):
+    """Add a column to an existing table if an older database doesn't have it yet"""
+    columns = [row[1] for row in c.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+# ---------- CONNECTION POOL ----------
+class PooledConnection:
+    """
+    A leased sqlite3 connection. close() hands it back to the pool instead of
+    closing it, so existing `conn.close()` call sites keep working.
+
+    row_factory belongs to this handle, not to the connection: it is applied to
+    the cursors the handle creates, so setting it on one get_db() handle doesn't
+    change the rows seen through another handle on the same request's lease.
+    """
+
+    def __init__(self, pool, conn, context_bound=False):
+        self._pool = pool
+        self._conn = conn
+        self._context_bound = context_bound
+        self._released = False
+        self.row_factory = None
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def handle(self):
+        """Another handle on this lease, with its own row_factory"""
+        return PooledConnection(self._pool, self._conn, self._context_bound)
+
+    def _cursor(self, cursor):
+        cursor.row_factory = self.row_factory
+        return cursor
+
+    def cursor(self):
+        return RetryingCursor(self._pool, self._cursor(self._conn.cursor()))
+
+    def execute(self, sql, params=()):
+        return self._cursor(self._pool.retry_locked(self._conn.execute, sql, params))
+
+    def executemany(self, sql, seq_of_params):
+        return self._cursor(self._pool.retry_locked(self._conn.executemany, sql, seq_of_params))
+
+    def commit(self):
+        return self._pool.retry_locked(self._conn.commit)
+
+    def close(self):
+        # App-context leases are returned at teardown
+        if not self._context_bound:
+            self.release()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class RetryingCursor:
+    """Cursor wrapper that retries statements which hit 'database is locked'"""
+
+    def __init__(self, pool, cursor):
+        self._pool = pool
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, params=()):
+        self._pool.retry_locked(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._pool.retry_locked(self._cursor.executemany, sql, seq_of_params)
+        return self
+
+
+class ConnectionPool:
+    """Per-process pool of SQLite connections set up for concurrent workers"""
+
+    LOCK_RETRIES = 5
+
+    def __init__(self, path=DB_PATH, size=8, busy_timeout_ms=5000, lease_timeout=10.0):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.lease_timeout = lease_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {'leases': 0, 'waits': 0, 'lock_retries': 0, 'connections': 0}
+
+    def _connect(self):
+        # cached_statements keeps prepared statements alive across leases
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, open a new one if under `size`, otherwise wait"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    self.stats['connections'] += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                with self._lock:
+                    self.stats['waits'] += 1
+                try:
+                    conn = self._idle.get(timeout=self.lease_timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError('Timed out waiting for a database connection')
+
+        with self._lock:
+            self.stats['leases'] += 1
+        return conn
+
+    def release(self, conn):
+        # Leave no transaction or per-lease setting behind for the next user
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def lease(self, context_bound=False):
+        return PooledConnection(self, self.acquire(), context_bound)
+
+    def retry_locked(self, fn, *args):
+        """Run `fn`, backing off and retrying when SQLite reports the database as locked"""
+        for attempt in range(self.LOCK_RETRIES + 1):
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as e:
+                message = str(e)
+                if attempt == self.LOCK_RETRIES or ('locked' not in message and 'busy' not in message):
+                    raise
+                with self._lock:
+                    self.stats['lock_retries'] += 1
+                time.sleep(0.05 * (2 ** attempt))
+
+    def metrics(self):
+        with self._lock:
+            return {**self.stats, 'size': self.size, 'idle': self._idle.qsize()}
+
+
+_pool = None
+_pool_pid = None
+_pool_settings = {}
+
+
+def set_database(path):
+    """Point init_db() and the pool at another SQLite file (app config, tests, render workers)"""
+    global DB_PATH, _pool
+    if path != DB_PATH:
+        DB_PATH = path
+        _pool = None
+
+
+def configure_pool(**settings):
+    """Set pool options (size, busy_timeout_ms, lease_timeout) before first use"""
+    global _pool
+    _pool_settings.update(settings)
+    _pool = None
+
+
+def get_pool():
+    """This process's connection pool (rebuilt after a fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ConnectionPool(DB_PATH, **_pool_settings)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def pool_metrics():
+    return get_pool().metrics()
+
+
+def init_app(app):
+    """Size the pool from app config and return app-context leases at teardown"""
+    configure_pool(size=app.config.get('DB_POOL_SIZE', 8),
+                   busy_timeout_ms=app.config.get('DB_BUSY_TIMEOUT_MS', 5000),
+                   lease_timeout=app.config.get('DB_LEASE_TIMEOUT', 10.0))
+
+    @app.teardown_appcontext
+    def release_db(exception=None):
+        lease = g.pop('db_lease', None)
+        if lease is not None:
+            lease.release()
+
+
 def get_db():
-    return sqlite3.connect('users.db')
+    """
+    Lease a pooled connection. Inside a Flask app context every call shares
+    one lease that is returned at teardown (each call gets a fresh handle, so a
+    row_factory set by one caller doesn't leak into the next); elsewhere
+    (render workers, scripts) the caller's close() returns it.
+    """
+    if has_app_context():
+        if 'db_lease' not in g:
+            g.db_lease = get_pool().lease(context_bound=True)
+        return g.db_lease.handle()
+    return get_pool().lease()
@@ -0,0 +1,98 @@
+"""
+Password hashing off the request path.
+
+Hashing and verification run on a small, size-capped thread pool
+(hashlib's pbkdf2/scrypt release the GIL), so a burst of logins uses at most
+PASSWORD_HASH_WORKERS cores. Other requests keep being served. Past
+PASSWORD_HASH_QUEUE waiting hashes, callers get HashingBusy straight away
+instead of queueing without bound.
+
+The work factor is PASSWORD_HASH_METHOD in Werkzeug's format. The default,
+'pbkdf2:sha256:1000000', is what signup has always used (Werkzeug's pbkdf2
+iteration count), so existing accounts are left as they are. Stored hashes
+made with other parameters still verify. On the user's next successful
+login a hash is redone only when the configured method is the same
+algorithm with a higher work factor. A lower one never replaces a stronger
+stored hash, and the algorithm is never switched implicitly.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# What signup hashed with before this was configurable ('pbkdf2:sha256' at Werkzeug's iteration count)
+DEFAULT_METHOD = 'pbkdf2:sha256:1000000'
+
+_executor = None
+_slots = None
+_settings = {'method': DEFAULT_METHOD, 'workers': 2, 'queue': 32, 'timeout': 10}
+_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated"""
+
+
+def configure(method=DEFAULT_METHOD, workers=2, queue=32, timeout=10):
+    """Set the work factor and pool limits (called from app setup)"""
+    global _executor, _slots
+    with _lock:
+        _settings.update(method=_normalize(method), workers=workers, queue=queue, timeout=timeout)
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        _slots = None
+
+
+def _submit(fn, *args):
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_settings['workers'], thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(_settings['workers'] + _settings['queue'])
+        executor, slots = _executor, _slots
+
+    if not slots.acquire(blocking=False):
+        raise HashingBusy('Password hashing pool is saturated')
+    try:
+        future = executor.submit(fn, *args)
+    except RuntimeError:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result(timeout=_settings['timeout'])
+
+
+def hash_password(password):
+    """Hash with the configured work factor"""
+    return _submit(generate_password_hash, password, _settings['method'])
+
+
+def verify_password(stored_hash, password):
+    return _submit(check_password_hash, stored_hash, password)
+
+
+def _normalize(method):
+    """Spell out Werkzeug's implicit defaults so the method matches the header of hashes it produces"""
+    if method == 'scrypt':
+        return 'scrypt:32768:8:1'
+    if method in ('pbkdf2', 'pbkdf2:sha256'):
+        return f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+def _algorithm_and_cost(method):
+    """('pbkdf2:sha256', iterations) or ('scrypt', n * r * p) for a method string"""
+    parts = _normalize(method).split(':')
+    if parts[0] == 'pbkdf2' and len(parts) == 3 and parts[2].isdigit():
+        return ':'.join(parts[:2]), int(parts[2])
+    if parts[0] == 'scrypt' and len(parts) == 4 and all(part.isdigit() for part in parts[1:]):
+        return 'scrypt', int(parts[1]) * int(parts[2]) * int(parts[3])
+    return method, 0
+
+
+def needs_rehash(stored_hash):
+    """True if the configured method is the stored hash's algorithm with a higher work factor"""
+    stored_algorithm, stored_cost = _algorithm_and_cost(stored_hash.split('$', 1)[0])
+    algorithm, cost = _algorithm_and_cost(_settings['method'])
+    return algorithm == stored_algorithm and cost > stored_cost
@@ -0,0 +1,247 @@
+"""
+Text layout for resume PDFs.
+
+Content is laid out in two passes, both linear in the amount of text:
+
+1. Each section becomes a block of lines: wrapped to the frame width, with
+   word widths taken from a cached font-metrics lookup so every distinct
+   word is measured once per process.
+2. Blocks are flowed onto pages. Each page carries the template chrome
+   (header band with the candidate's name, accent rule, footer band).
+
+The result is a list of pages, each a list of drawing operations. The PDF
+canvas replays them, and anything else that wants to draw a resume can do
+the same.
+"""
+from functools import lru_cache
+
+BODY_FONT = ("Helvetica", 11)
+SECTION_FONT = ("Helvetica-Bold", 16)
+NAME_FONT = ("Helvetica-Bold", 24)
+TITLE_FONT = ("Helvetica", 14)
+CONTACT_FONT = ("Helvetica", 11)
+
+SECTION_X = 50
+BODY_X = 70
+RIGHT_MARGIN = 50
+BOTTOM_MARGIN = 40      # above the footer band
+
+SECTION_ADVANCE = 22
+LINE_ADVANCE = 16
+BLANK_ADVANCE = 8
+SECTION_GAP = 10
+SKILLS_ADVANCE = 20
+
+BULLET = "• "
+
+
+# ---------- FONT METRICS ----------
+@lru_cache(maxsize=16384)
+def text_width(text, font, size):
+    """Width of a word (or any string) in points, measured once per process"""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    return stringWidth(text, font, size)
+
+
+def wrap_text(text, font, size, max_width, indent_width=0):
+    """
+    Greedy word wrap. Continuation lines get `indent_width` less room so they
+    can hang under a bullet; words wider than a line are split by character.
+    """
+    space = text_width(' ', font, size)
+    lines = []
+    current = []
+    current_width = 0
+    available = max_width
+
+    for word in text.split():
+        width = text_width(word, font, size)
+        if width > available:
+            # Flush what we have and break the long word across lines
+            if current:
+                lines.append(' '.join(current))
+                current, current_width = [], 0
+                available = max_width - indent_width
+            piece = ''
+            for char in word:
+                if text_width(piece + char, font, size) > available and piece:
+                    lines.append(piece)
+                    piece = ''
+                    available = max_width - indent_width
+                piece += char
+            current, current_width = [piece], text_width(piece, font, size)
+            continue
+
+        needed = width if not current else current_width + space + width
+        if needed > available:
+            lines.append(' '.join(current))
+            current, current_width = [word], width
+            available = max_width - indent_width
+        else:
+            current.append(word)
+            current_width = needed
+
+    if current:
+        lines.append(' '.join(current))
+    return lines or ['']
+
+
+# ---------- BLOCKS ----------
+def _body_lines(text, bullet, max_width):
+    """Wrap one content line, hanging continuation lines under the bullet"""
+    font, size = BODY_FONT
+    prefix = BULLET if bullet else ''
+    indent = text_width(prefix, font, size) if bullet else 0
+    wrapped = wrap_text(text, font, size, max_width - indent)
+    lines = [('body', BODY_X, prefix + wrapped[0], LINE_ADVANCE)]
+    lines.extend(('body', BODY_X + indent, line, LINE_ADVANCE) for line in wrapped[1:])
+    return lines
+
+
+def section_block(title_text, rows, template):
+    """
+    Lay out one section as a list of (kind, x, text, advance) lines.
+    `rows` are (text, bulleted) pairs, with None for the gap between entries.
+    """
+    if not rows:
+        return []
+
+    max_width = template.pagesize[0] - BODY_X - RIGHT_MARGIN
+    lines = [('section', SECTION_X, title_text, SECTION_ADVANCE)]
+    for row in rows:
+        if row is None:
+            lines.append(('blank', 0, '', BLANK_ADVANCE))
+            continue
+        text, bullet = row
+        lines.extend(_body_lines(text, bullet, max_width))
+    lines.append(('blank', 0, '', SECTION_GAP))
+    return lines
+
+
+def education_rows(entries):
+    """Every education entry is one bulleted line"""
+    return [(entry.text(), True) for entry in entries]
+
+
+def experience_rows(entries):
+    """Bulleted heading and description lines; the company line is not bulleted"""
+    rows = []
+    for index, entry in enumerate(entries):
+        if index:
+            rows.append(None)
+        if entry.heading():
+            rows.append((entry.heading(), True))
+        if entry.company:
+            rows.append((f"Company: {entry.company}", False))
+        rows.extend((bullet, True) for bullet in entry.bullets)
+    return rows
+
+
+def skills_block(skills, template):
+    if not skills:
+        return []
+    max_width = template.pagesize[0] - BODY_X - RIGHT_MARGIN
+    font, size = BODY_FONT
+    lines = [('section', SECTION_X, "SKILLS", SECTION_ADVANCE)]
+    wrapped = wrap_text(", ".join(skills), font, size, max_width)
+    lines.extend(('body', BODY_X, line, LINE_ADVANCE) for line in wrapped[:-1])
+    lines.append(('body', BODY_X, wrapped[-1], SKILLS_ADVANCE))
+    return lines
+
+
+def header_ops(resume, template):
+    """Drawing operations for the page header: chrome plus name, title and contact line"""
+    height = template.pagesize[1]
+    ops = [('chrome', 'header'), ('fill', template.header_text_color),
+           ('font',) + NAME_FONT, ('text', 50, height - 60, resume.name)]
+    if resume.title:
+        ops += [('font',) + TITLE_FONT, ('text', 50, height - 80, resume.title)]
+
+    contact_parts = [part for part in (resume.email, resume.phone, resume.location, resume.linkedin) if part]
+    if contact_parts:
+        ops += [('font',) + CONTACT_FONT, ('text', 50, height - 100, " | ".join(contact_parts))]
+    return ops
+
+
+# Content sections in page order
+SECTIONS = ('education', 'experience', 'skills')
+
+
+def block_for(section, resume, template):
+    """Lay out one section of a resume; the unit callers can cache"""
+    if section == 'education':
+        return section_block("EDUCATION", education_rows(resume.education), template)
+    if section == 'experience':
+        return section_block("EXPERIENCE", experience_rows(resume.experience), template)
+    return skills_block(resume.skills, template)
+
+
+def resume_blocks(resume, template):
+    """All content blocks of a resume, in page order"""
+    return [block_for(section, resume, template) for section in SECTIONS]
+
+
+# ---------- PAGINATION ----------
+def paginate(header, blocks, template):
+    """Flow blocks onto pages; every page gets the header and footer chrome"""
+    height = template.pagesize[1]
+    top = height - template.layout['rule_offset'] - 30
+    bottom = template.layout['footer_height'] + BOTTOM_MARGIN
+
+    pages = []
+    page = list(header)
+    y = top
+    current = None      # (font, color) last emitted on this page
+
+    def new_page():
+        nonlocal page, y, current
+        page.append(('chrome', 'footer'))
+        pages.append(page)
+        page = list(header)
+        y = top
+        current = None
+
+    for block in blocks:
+        for index, (kind, x, text, advance) in enumerate(block):
+            if kind == 'blank':
+                y -= advance
+                continue
+
+            # Don't strand a section title at the bottom of a page
+            needed = advance + (LINE_ADVANCE if kind == 'section' and index + 1 < len(block) else 0)
+            if y - needed < bottom and y != top:
+                new_page()
+
+            style = (SECTION_FONT, template.accent_color) if kind == 'section' else (BODY_FONT, template.body_color)
+            if style != current:
+                page.append(('font',) + style[0])
+                page.append(('fill', style[1]))
+                current = style
+            page.append(('text', x, y, text))
+            y -= advance
+
+    page.append(('chrome', 'footer'))
+    pages.append(page)
+    return pages
+
+
+def layout_resume(resume, template):
+    """Pages of drawing operations for a resume"""
+    return paginate(header_ops(resume, template), resume_blocks(resume, template), template)
+
+
+def draw_pages(pdf, pages, template):
+    """Replay laid-out pages onto a ReportLab canvas"""
+    for number, page in enumerate(pages):
+        if number:
+            pdf.showPage()
+        for op in page:
+            kind = op[0]
+            if kind == 'text':
+                pdf.drawString(op[1], op[2], op[3])
+            elif kind == 'font':
+                pdf.setFont(op[1], op[2])
+            elif kind == 'fill':
+                pdf.setFillColor(op[1])
+            elif kind == 'chrome':
+                template.stamp(pdf, op[1])
@@ -0,0 +1,216 @@
+"""
+Live previews for the resume form.
+
+A preview is a page of the same layout the PDF uses, rasterized to SVG (or a
+low-res PNG) instead of being drawn onto a canvas. Nothing is written to the
+database or to disk.
+
+Laid-out sections are cached per preview session, keyed by their content.
+When the user edits one section, only that section is wrapped again; the
+others come from the cache, and pagination then just re-flows the cached
+lines. The last image of each session is kept too, so an unchanged form
+costs nothing to re-request.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import hashlib
+import io
+import threading
+
+from pdf_layout import SECTIONS, block_for, header_ops, paginate
+from pdf_templates import get_template
+
+MAX_SESSIONS = 1000
+FORMATS = ('svg', 'png')
+
+
+# ---------- SESSION CACHE ----------
+class PreviewCache:
+    """Per-session section layouts and last image, LRU-bounded across sessions"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'section_hits': 0, 'section_misses': 0, 'image_hits': 0}
+
+    def _session(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = {'blocks': {}, 'image': None}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def blocks(self, session_id, resume, template):
+        """Section blocks for `resume`, re-laying out only sections whose content changed"""
+        blocks = []
+        for section in SECTIONS:
+            digest = hashlib.sha1(repr(getattr(resume, section)).encode('utf-8')).hexdigest()
+            slot = (section, template.fingerprint)
+            with self._lock:
+                hit = self._session(session_id)['blocks'].get(slot)
+                if hit and hit[0] == digest:
+                    self.stats['section_hits'] += 1
+                else:
+                    self.stats['section_misses'] += 1
+            if hit and hit[0] == digest:
+                blocks.append(hit[1])
+                continue
+            # Laid out outside the lock; the session may have been evicted meanwhile, so look it up again
+            block = block_for(section, resume, template)
+            with self._lock:
+                self._session(session_id)['blocks'][slot] = (digest, block)
+            blocks.append(block)
+        return blocks
+
+    def image(self, session_id, key):
+        with self._lock:
+            image = self._session(session_id)['image']
+            if image and image[0] == key:
+                self.stats['image_hits'] += 1
+                return image[1]
+        return None
+
+    def store_image(self, session_id, key, body):
+        with self._lock:
+            self._session(session_id)['image'] = (key, body)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_cache = PreviewCache()
+
+
+def render_preview(session_id, resume, page_number=1, fmt='svg', scale=0.75):
+    """
+    Image of one page of the resume. Returns (body, mimetype, page_count);
+    `page_number` past the end shows the last page.
+    """
+    template = get_template(resume.template_style)
+    pages = paginate(header_ops(resume, template), _cache.blocks(session_id, resume, template), template)
+    page = pages[min(max(page_number, 1), len(pages)) - 1]
+
+    key = hashlib.sha1(repr((template.fingerprint, fmt, scale, page)).encode('utf-8')).hexdigest()
+    body = _cache.image(session_id, key)
+    if body is None:
+        body = page_png(page, template, scale) if fmt == 'png' else page_svg(page, template)
+        _cache.store_image(session_id, key, body)
+    return body, 'image/png' if fmt == 'png' else 'image/svg+xml', len(pages)
+
+
+def forget_session(session_id):
+    _cache.forget(session_id)
+
+
+def preview_stats():
+    return dict(_cache.stats)
+
+
+# ---------- SVG ----------
+def _css(color):
+    return '#%02x%02x%02x' % tuple(round(channel * 255) for channel in color.rgb())
+
+
+def page_svg(page, template):
+    """A page of drawing operations as an SVG document (PDF points, y flipped)"""
+    width, height = template.pagesize
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}" '
+           f'viewBox="0 0 {width:g} {height:g}">',
+           f'<rect width="{width:g}" height="{height:g}" fill="#ffffff"/>']
+    font, fill = ('Helvetica', 11), '#000000'
+    for op in page:
+        kind = op[0]
+        if kind == 'text':
+            weight = ' font-weight="bold"' if font[0].endswith('Bold') else ''
+            out.append(f'<text x="{op[1]:g}" y="{height - op[2]:g}" font-family="Helvetica, Arial, sans-serif" '
+                       f'font-size="{font[1]}"{weight} fill="{fill}" xml:space="preserve">{escape(op[3])}</text>')
+        elif kind == 'font':
+            font = (op[1], op[2])
+        elif kind == 'fill':
+            fill = _css(op[1])
+        elif kind == 'chrome':
+            out.extend(_chrome_svg(template, op[1], height))
+    out.append('</svg>')
+    return '\n'.join(out).encode('utf-8')
+
+
+def _chrome_svg(template, part, height):
+    fill, stroke, line_width = '#000000', '#000000', 1
+    for op, arg in template.header_ops if part == 'header' else template.footer_ops:
+        if op == 'fill':
+            fill = _css(arg)
+        elif op == 'stroke':
+            stroke = _css(arg)
+        elif op == 'line_width':
+            line_width = arg
+        elif op == 'rect':
+            x, y, w, h = arg
+            yield f'<rect x="{x:g}" y="{height - y - h:g}" width="{w:g}" height="{h:g}" fill="{fill}"/>'
+        elif op == 'line':
+            x1, y1, x2, y2 = arg
+            yield (f'<line x1="{x1:g}" y1="{height - y1:g}" x2="{x2:g}" y2="{height - y2:g}" '
+                   f'stroke="{stroke}" stroke-width="{line_width:g}"/>')
+
+
+# ---------- PNG ----------
+@lru_cache(maxsize=64)
+def _pil_font(name, pixels):
+    """ReportLab's metric-compatible Type 1 font for `name`, falling back to Pillow's default"""
+    from PIL import ImageFont
+    from reportlab.pdfbase._fontdata import findT1File
+    try:
+        return ImageFont.truetype(findT1File(name), pixels)
+    except (OSError, KeyError):
+        return ImageFont.load_default(size=pixels)
+
+
+def _rgb(color):
+    return tuple(round(channel * 255) for channel in color.rgb())
+
+
+def page_png(page, template, scale):
+    """A page of drawing operations rasterized at `scale` pixels per point"""
+    # Pillow is only loaded by the first PNG (SVG previews never need it)
+    from PIL import Image, ImageDraw
+    width, height = template.pagesize
+    image = Image.new('RGB', (round(width * scale), round(height * scale)), 'white')
+    draw = ImageDraw.Draw(image)
+    font, fill = _pil_font('Helvetica', max(1, round(11 * scale))), (0, 0, 0)
+    for op in page:
+        kind = op[0]
+        if kind == 'text':
+            draw.text((op[1] * scale, (height - op[2]) * scale), op[3], font=font, fill=fill, anchor='ls')
+        elif kind == 'font':
+            font = _pil_font(op[1], max(1, round(op[2] * scale)))
+        elif kind == 'fill':
+            fill = _rgb(op[1])
+        elif kind == 'chrome':
+            _chrome_png(draw, template, op[1], height, scale)
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=False)
+    return buffer.getvalue()
+
+
+def _chrome_png(draw, template, part, height, scale):
+    fill, stroke, line_width = (0, 0, 0), (0, 0, 0), 1
+    for op, arg in template.header_ops if part == 'header' else template.footer_ops:
+        if op == 'fill':
+            fill = _rgb(arg)
+        elif op == 'stroke':
+            stroke = _rgb(arg)
+        elif op == 'line_width':
+            line_width = arg
+        elif op == 'rect':
+            x, y, w, h = arg
+            draw.rectangle([x * scale, (height - y - h) * scale, (x + w) * scale, (height - y) * scale], fill=fill)
+        elif op == 'line':
+            x1, y1, x2, y2 = arg
+            draw.line([x1 * scale, (height - y1) * scale, x2 * scale, (height - y2) * scale],
+                      fill=stroke, width=max(1, round(line_width * scale)))
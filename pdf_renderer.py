@@ -0,0 +1,42 @@
+from pdf_templates import get_template
+from pdf_layout import layout_resume, draw_pages
+from metrics import span
+from resume_model import Resume
+import io
+
+
+# ---------- FORM PARSING ----------
+def parse_resume_form(form):
+    """Turn the resume form into the typed model the renderer, job queue and database use"""
+    return Resume.from_form(form)
+
+
+def build_filename(name, template_style, timestamp):
+    """Filename used for a generated resume PDF"""
+    safe_name = name.replace(" ", "_").replace("/", "_").replace("\\", "_")
+    return f"{safe_name}_{template_style}_{timestamp}.pdf"
+
+
+# ---------- PDF RENDERING ----------
+def render_resume_pdf(resume, target):
+    """
+    Draw a resume onto a ReportLab canvas.
+    `target` is anything canvas.Canvas accepts: a file path or a writable buffer.
+    """
+    from reportlab.pdfgen import canvas
+    template = get_template(resume.template_style)
+    with span('render_layout'):
+        pages = layout_resume(resume, template)
+
+    with span('render_draw'):
+        pdf = canvas.Canvas(target, pagesize=template.pagesize)
+        draw_pages(pdf, pages, template)
+    with span('render_save'):
+        pdf.save()
+
+
+def render_pdf_bytes(resume):
+    """Render a resume and return the PDF bytes (picklable entry point for worker pools)"""
+    buffer = io.BytesIO()
+    render_resume_pdf(resume, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,155 @@
+"""
+Resume template registry.
+
+Each style is declared once as data and compiled when it is registered:
+colors are resolved to ReportLab objects and the static chrome (header band,
+accent rule, footer band) becomes a list of draw operations. Per document the
+chrome is emitted once as a Form XObject and every page that needs it just
+references the form.
+
+The built-in styles are compiled on first lookup, so importing this module
+doesn't load ReportLab's color machinery (see warmup.py).
+"""
+import hashlib
+import json
+import threading
+
+from reportlab.lib.pagesizes import letter
+
+DEFAULT_TEMPLATE = 'simple'
+
+# Geometry shared by every style unless a definition overrides it
+DEFAULT_LAYOUT = {
+    'header_height': 120,
+    'footer_height': 20,
+    'rule_offset': 150,     # accent rule distance from the top of the page
+    'rule_margin': 40,
+    'rule_width': 2,
+}
+
+_registry = {}
+_builtins_lock = threading.Lock()
+_builtins_loaded = False
+
+
+# ---------- DEFINITIONS ----------
+def _resolve_color(value):
+    """'#RRGGBB' or a reportlab.lib.colors name"""
+    from reportlab.lib import colors
+    if value.startswith('#'):
+        return colors.HexColor(value)
+    return getattr(colors, value)
+
+
+class CompiledTemplate:
+    """A registered style with its colors resolved and its chrome precomputed"""
+
+    def __init__(self, name, definition, pagesize=letter):
+        self.name = name
+        self.definition = definition
+        self.pagesize = pagesize
+        self.layout = {**DEFAULT_LAYOUT, **definition.get('layout', {})}
+
+        self.header_color = _resolve_color(definition['header'])
+        self.accent_color = _resolve_color(definition['accent'])
+        self.footer_color = _resolve_color(definition['footer'])
+        self.header_text_color = _resolve_color(definition.get('header_text', 'white'))
+        self.body_color = _resolve_color(definition.get('body', 'black'))
+
+        # Changes whenever the definition does; used to invalidate cached renders
+        payload = json.dumps({'name': name, **definition}, sort_keys=True)
+        self.fingerprint = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+        self.header_ops = self._compile_header()
+        self.footer_ops = self._compile_footer()
+
+    def _compile_header(self):
+        width, height = self.pagesize
+        layout = self.layout
+        rule_y = height - layout['rule_offset']
+        return [
+            ('fill', self.header_color),
+            ('rect', (0, height - layout['header_height'], width, layout['header_height'])),
+            ('stroke', self.accent_color),
+            ('line_width', layout['rule_width']),
+            ('line', (layout['rule_margin'], rule_y, width - layout['rule_margin'], rule_y)),
+        ]
+
+    def _compile_footer(self):
+        width, _ = self.pagesize
+        return [
+            ('fill', self.footer_color),
+            ('rect', (0, 0, width, self.layout['footer_height'])),
+        ]
+
+    # ---------- STAMPING ----------
+    def _form_name(self, part):
+        return f"tpl_{self.name}_{self.fingerprint}_{part}"
+
+    def stamp(self, pdf, part):
+        """Draw the 'header' or 'footer' chrome on the current page via a per-document Form XObject"""
+        form_name = self._form_name(part)
+        defined = getattr(pdf, '_template_forms', None)
+        if defined is None:
+            defined = pdf._template_forms = set()
+
+        if form_name not in defined:
+            pdf.beginForm(form_name)
+            _replay(pdf, self.header_ops if part == 'header' else self.footer_ops)
+            pdf.endForm()
+            defined.add(form_name)
+        pdf.doForm(form_name)
+
+
+def _replay(pdf, ops):
+    """Emit compiled draw operations onto a canvas"""
+    for op, arg in ops:
+        if op == 'fill':
+            pdf.setFillColor(arg)
+        elif op == 'stroke':
+            pdf.setStrokeColor(arg)
+        elif op == 'line_width':
+            pdf.setLineWidth(arg)
+        elif op == 'rect':
+            pdf.rect(*arg, fill=True, stroke=False)
+        elif op == 'line':
+            pdf.line(*arg)
+
+
+# ---------- REGISTRY ----------
+def register_template(name, definition):
+    """Compile a style definition and make it available to the renderer"""
+    _registry[name] = CompiledTemplate(name, definition)
+    return _registry[name]
+
+
+def get_template(name):
+    """Compiled template for `name`; unknown styles fall back to the plain one"""
+    _load_builtins()
+    return _registry.get(name) or _registry[DEFAULT_TEMPLATE]
+
+
+def template_names():
+    _load_builtins()
+    return list(_registry)
+
+
+# Built-in styles
+BUILTIN_TEMPLATES = {
+    'modern': {'header': '#1E4DB4', 'accent': '#1E4DB4', 'footer': '#508CFF'},
+    'creative': {'header': '#28A079', 'accent': '#1E805F', 'footer': '#63D8A2'},
+    'simple': {'header': 'black', 'accent': 'black', 'footer': 'gray'},
+}
+
+
+def _load_builtins():
+    """Compile the built-in styles on first use, ahead of any registered since"""
+    global _registry, _builtins_loaded
+    if _builtins_loaded:
+        return
+    with _builtins_lock:
+        if not _builtins_loaded:
+            builtins = {name: CompiledTemplate(name, definition)
+                        for name, definition in BUILTIN_TEMPLATES.items() if name not in _registry}
+            _registry = {**builtins, **_registry}
+            _builtins_loaded = True
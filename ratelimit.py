@@ -0,0 +1,48 @@
+"""
+In-process token-bucket rate limiting.
+
+Each key (an email, an IP) gets a bucket holding up to `burst` tokens that
+refills at `rate_per_minute`. Counts are per worker process, which is
+enough to stop a single client from spending our CPU on password
+hashes.
+"""
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by string; idle full buckets are dropped to bound memory"""
+
+    def __init__(self, rate_per_minute, burst, max_keys=100000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}      # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def allow(self, key, cost=1):
+        """Take `cost` tokens from `key`'s bucket; False if it doesn't have them"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed
+
+    def retry_after(self, key, cost=1):
+        """Seconds until `key` has `cost` tokens again"""
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, time.monotonic()))
+        tokens = min(self.burst, tokens + (time.monotonic() - last) * self.rate)
+        return 0 if tokens >= cost else int((cost - tokens) / self.rate) + 1
+
+    def _prune(self, now):
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for rendered resume PDFs.
+
+A resume's normalized content hashes to a key; the rendered PDF is stored once
+as <key>.pdf in the storage backend and shared by every `resumes` row with that
+content (the row's blob_key column). The `render_cache` table is the LRU index.
+"""
+import hashlib
+import json
+import threading
+import time
+import logging
+
+from pdf_templates import get_template
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the PDF layout changes so old blobs stop matching
+RENDERER_VERSION = 2
+
+# Fields that affect the rendered output
+KEY_FIELDS = ('name', 'title', 'email', 'phone', 'location', 'linkedin',
+              'education', 'experience', 'skills', 'template_style')
+
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(counter):
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def cache_stats():
+    """Hit/miss/eviction counters for this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+# ---------- KEYS ----------
+def _normalize(value):
+    """Collapse line-ending and whitespace differences that don't change the PDF"""
+    lines = str(value or '').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.strip() for line in lines).strip()
+
+
+def cache_key(resume):
+    """
+    Stable hash of the resume fields the renderer draws. Sections are hashed
+    in their flattened text form, so keys match PDFs cached before the typed model.
+    """
+    fields = {field: getattr(resume, field) for field in KEY_FIELDS if field not in ('education', 'experience', 'skills')}
+    fields.update(education=resume.education_text(), experience=resume.experience_text(),
+                  skills=resume.skills_text())
+    normalized = {field: _normalize(fields[field]) for field in KEY_FIELDS}
+    normalized['renderer_version'] = RENDERER_VERSION
+    # Editing a template's definition changes its fingerprint and invalidates old blobs
+    normalized['template'] = get_template(normalized['template_style']).fingerprint
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def blob_filename(key):
+    return f"{key}.pdf"
+
+
+def write_blob(key, pdf_bytes):
+    """
+    Store a rendered PDF under its content-addressed name (an identical
+    object already stored is simply shared); returns (byte_size, checksum).
+    """
+    backend = storage.backend()
+    if not backend.exists(blob_filename(key)):
+        backend.put_bytes(blob_filename(key), pdf_bytes)
+    return len(pdf_bytes), hashlib.sha256(pdf_bytes).hexdigest()
+
+
+# ---------- LOOKUP / STORE ----------
+def lookup(conn, key):
+    """Return {filename, byte_size, checksum} if `key` is cached (and still stored), else None"""
+    row = conn.execute('SELECT filename, byte_size, checksum FROM render_cache WHERE key = ?', (key,)).fetchone()
+    if row and storage.backend().exists(row[0]):
+        conn.execute('UPDATE render_cache SET hits = hits + 1, last_used = ? WHERE key = ?',
+                     (time.time(), key))
+        conn.commit()
+        _count('hits')
+        return {'filename': row[0], 'byte_size': row[1], 'checksum': row[2]}
+
+    if row:
+        # Index entry outlived its file
+        conn.execute('DELETE FROM render_cache WHERE key = ?', (key,))
+        conn.commit()
+    _count('misses')
+    return None
+
+
+def store(conn, key, byte_size, checksum, max_bytes):
+    """Record a freshly rendered blob and evict least-recently-used entries over `max_bytes`"""
+    now = time.time()
+    conn.execute('''INSERT OR REPLACE INTO render_cache (key, filename, byte_size, checksum, hits, last_used, created_at)
+                    VALUES (?, ?, ?, ?, 0, ?, ?)''',
+                 (key, blob_filename(key), byte_size, checksum, now, now))
+    conn.commit()
+    evict(conn, max_bytes)
+
+
+def store_many(conn, entries, max_bytes):
+    """Record several blobs, given as (key, byte_size, checksum), in one transaction"""
+    now = time.time()
+    conn.executemany('''INSERT OR REPLACE INTO render_cache (key, filename, byte_size, checksum, hits, last_used, created_at)
+                        VALUES (?, ?, ?, ?, 0, ?, ?)''',
+                     [(key, blob_filename(key), byte_size, checksum, now, now) for key, byte_size, checksum in entries])
+    conn.commit()
+    evict(conn, max_bytes)
+
+
+def evict(conn, max_bytes):
+    """Drop least-recently-used entries until the cache fits in `max_bytes`"""
+    total = conn.execute('SELECT COALESCE(SUM(byte_size), 0) FROM render_cache').fetchone()[0]
+    if total <= max_bytes:
+        return
+
+    for key, byte_size in conn.execute('SELECT key, byte_size FROM render_cache ORDER BY last_used').fetchall():
+        if total <= max_bytes:
+            break
+        conn.execute('DELETE FROM render_cache WHERE key = ?', (key,))
+        conn.commit()
+        release_blob(conn, key)
+        total -= byte_size
+        _count('evictions')
+
+
+def release_blob(conn, key):
+    """Remove a blob's file once neither the cache nor any resume row references it"""
+    storage.release(conn, blob_filename(key))
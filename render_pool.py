@@ -0,0 +1,306 @@
+"""
+Off-request PDF rendering.
+
+Jobs are recorded in the `render_jobs` table (the queue) and executed by a
+process pool, so the Flask worker only parses the form and hands the job off.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import tempfile
+import threading
+import json
+import time
+import uuid
+import os
+import logging
+
+from models import get_db
+import models
+from pdf_renderer import render_resume_pdf, render_pdf_bytes
+from resume_model import Resume
+from resume_store import save_resume_row
+import metrics
+import render_cache
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept around this long so the client can still download
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Writes rendered-in-memory PDFs to disk after the response has gone out
+_persist_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pdf-persist')
+
+
+class QueueFull(Exception):
+    """Raised when the render queue is at capacity"""
+
+
+# ---------- PROCESS POOL ----------
+def get_executor(pool_size):
+    """Return this process's render pool, creating it on first use (and after a fork)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # spawn keeps the children free of Flask/threads inherited from the web worker
+            _executor = ProcessPoolExecutor(max_workers=pool_size,
+                                            mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker,
+                                            initargs=(models.DB_PATH, storage.current_settings()))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _init_worker(db_path, storage_settings):
+    """Point a freshly spawned pool process at the web app's database and storage backend"""
+    models.set_database(db_path)
+    storage.configure(storage_settings)
+    # Load ReportLab and the fonts now rather than in this process's first job
+    from warmup import warm_renderer
+    try:
+        warm_renderer()
+    except Exception as e:
+        logger.error(f"Render worker warm-up failed: {e}")
+
+
+def _reset_executor(wait=False):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+
+
+def shutdown_pool(wait=False):
+    """Stop the render pool (used on app shutdown and in scripts)"""
+    _reset_executor(wait)
+
+
+# ---------- QUEUE ----------
+def submit_render_job(user_id, resume, filename, blob_key, created_at, pool_size, queue_depth,
+                      job_timeout=300, cache_max_bytes=256 * 1024 * 1024):
+    """
+    Queue a render job and return its id.
+    `filename` is the download name; the PDF itself is written to the blob for `blob_key`.
+    `created_at` is stamped on the resume row so it matches the filename.
+    Raises QueueFull when `queue_depth` jobs are already queued or running.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+
+    conn = get_db()
+    try:
+        # IMMEDIATE takes the write lock up front so the depth check and insert are atomic
+        conn.execute('BEGIN IMMEDIATE')
+
+        # Jobs whose worker died never finish; stop counting them against the queue
+        conn.execute('''UPDATE render_jobs SET status = 'failed', error = 'Render timed out', updated_at = ?
+                        WHERE status IN ('queued', 'running') AND updated_at < ?''',
+                     (now, now - job_timeout))
+        conn.execute("DELETE FROM render_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                     (now - JOB_RETENTION_SECONDS,))
+
+        active = conn.execute("SELECT COUNT(*) FROM render_jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+        if active >= queue_depth:
+            conn.rollback()
+            raise QueueFull(f"Render queue is full ({active}/{queue_depth})")
+
+        conn.execute('''INSERT INTO render_jobs (id, user_id, status, payload, filename, blob_key, created_at, updated_at)
+                        VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)''',
+                     (job_id, user_id, json.dumps({'resume': resume.to_dict(), 'created_at': created_at}),
+                      filename, blob_key, now, now))
+        conn.commit()
+    finally:
+        conn.close()
+
+    try:
+        future = get_executor(pool_size).submit(run_render_job, job_id, cache_max_bytes)
+    except (BrokenProcessPool, RuntimeError):
+        # A crashed child poisons the whole pool; rebuild it once and retry
+        logger.warning("Render pool was broken, restarting it")
+        _reset_executor()
+        future = get_executor(pool_size).submit(run_render_job, job_id, cache_max_bytes)
+    future.add_done_callback(_merge_job_spans)
+
+    return job_id
+
+
+def _merge_job_spans(future):
+    """Fold the timings a pool process recorded for a job into this process's histograms"""
+    if not future.cancelled() and future.exception() is None:
+        metrics.merge_spans(future.result())
+
+
+def submit_pdf_bytes(executor, resume):
+    """Render a resume on the pool; the future's result is (pdf_bytes, spans), the spans already merged here"""
+    future = executor.submit(_render_pdf_job, resume, metrics.current_endpoint())
+    future.add_done_callback(_merge_pdf_spans)
+    return future
+
+
+def _merge_pdf_spans(future):
+    if not future.cancelled() and future.exception() is None:
+        metrics.merge_spans(future.result()[1])
+
+
+def record_completed_job(conn, user_id, filename, blob_key, resume_id):
+    """Record a job that needed no rendering (render cache hit) so it can be downloaded like any other"""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn.execute('''INSERT INTO render_jobs (id, user_id, status, payload, filename, blob_key, resume_id, created_at, updated_at)
+                    VALUES (?, ?, 'done', '{}', ?, ?, ?, ?, ?)''',
+                 (job_id, user_id, filename, blob_key, resume_id, now, now))
+    conn.commit()
+    return job_id
+
+
+def get_job(job_id, user_id):
+    """Return a job's status fields, or None if it doesn't exist for this user"""
+    conn = get_db()
+    try:
+        # checksum: the stored PDF's SHA-256 (its ETag), from the saved row or the cache entry
+        row = conn.execute('''SELECT j.id, j.status, j.filename, j.error, j.resume_id, j.blob_key,
+                                     COALESCE(r.checksum, c.checksum)
+                              FROM render_jobs j
+                              LEFT JOIN resumes r ON r.id = j.resume_id
+                              LEFT JOIN render_cache c ON c.key = j.blob_key
+                              WHERE j.id = ? AND j.user_id = ?''', (job_id, user_id)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    return {'id': row[0], 'status': row[1], 'filename': row[2], 'error': row[3],
+            'resume_id': row[4], 'blob_key': row[5], 'checksum': row[6]}
+
+
+def _set_status(conn, job_id, status, **fields):
+    assignments = ''.join(f', {column} = ?' for column in fields)
+    conn.execute(f'UPDATE render_jobs SET status = ?, updated_at = ?{assignments} WHERE id = ?',
+                 (status, time.time(), *fields.values(), job_id))
+    conn.commit()
+
+
+# ---------- WORKER ----------
+def run_render_job(job_id, cache_max_bytes):
+    """
+    Executed inside a pool process: render the PDF blob, cache it and save the resume row.
+    Returns the span timings recorded for the job so the web worker can merge them.
+    """
+    with metrics.job_context('render_job'):
+        _run_render_job(job_id, cache_max_bytes)
+    return metrics.drain_spans()
+
+
+def _render_pdf_job(resume, endpoint):
+    """Executed inside a pool process: render_pdf_bytes plus the span timings recorded for it"""
+    with metrics.job_context(endpoint):
+        pdf_bytes = render_pdf_bytes(resume)
+    return pdf_bytes, metrics.drain_spans()
+
+
+def _run_render_job(job_id, cache_max_bytes):
+    conn = get_db()
+    try:
+        row = conn.execute('SELECT user_id, payload, blob_key FROM render_jobs WHERE id = ?',
+                           (job_id,)).fetchone()
+        if not row:
+            return
+        user_id, payload, blob_key = row
+        payload = json.loads(payload)
+        resume = Resume.from_dict(payload['resume'])
+        _set_status(conn, job_id, 'running')
+
+        try:
+            # Render to a local temp file and hand the finished file to storage,
+            # so readers never see a partial object
+            fd, tmp_path = tempfile.mkstemp(suffix='.pdf.tmp')
+            os.close(fd)
+            try:
+                render_resume_pdf(resume, tmp_path)
+                with metrics.span('file_io'):
+                    byte_size, checksum = storage.describe_file(tmp_path)
+                    storage.backend().put_file(render_cache.blob_filename(blob_key), tmp_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception as e:
+            logger.error(f"Render job {job_id} failed: {e}")
+            _set_status(conn, job_id, 'failed', error=f'Error generating PDF: {e}')
+            return
+
+        # Save to database; the PDF is still downloadable if this fails
+        try:
+            with metrics.span('db_insert'):
+                resume_id = save_resume_row(conn, user_id, resume, payload['created_at'],
+                                            blob_key, byte_size, checksum)
+                _set_status(conn, job_id, 'done', resume_id=resume_id)
+        except Exception as e:
+            conn.rollback()
+            _set_status(conn, job_id, 'done', error=f'Resume generated but database error: {e}')
+
+        # Cache only once the row references the blob, so eviction can't delete it from under us
+        render_cache.store(conn, blob_key, byte_size, checksum, cache_max_bytes)
+    finally:
+        conn.close()
+
+
+# ---------- SAVED RESUMES ----------
+def render_cached(conn, resumes, pool_size, cache_max_bytes, timeout=None):
+    """
+    Cache entries ({key, byte_size, checksum}) for already-saved resumes,
+    e.g. one resume in several templates. Cache misses render in parallel
+    on the pool; nothing is queued as a job and no resume row is written.
+    """
+    keys = [render_cache.cache_key(resume) for resume in resumes]
+    entries, futures = {}, {}
+    with metrics.span('db_select'):
+        for key in keys:
+            if key not in entries:
+                entries[key] = render_cache.lookup(conn, key)
+    executor = get_executor(pool_size)
+    for key, resume in zip(keys, resumes):
+        if entries[key] is None and key not in futures:
+            futures[key] = submit_pdf_bytes(executor, resume)
+
+    rendered = []
+    for key, future in futures.items():
+        pdf_bytes, _ = future.result(timeout=timeout)
+        with metrics.span('file_io'):
+            byte_size, checksum = render_cache.write_blob(key, pdf_bytes)
+        entries[key] = {'filename': render_cache.blob_filename(key), 'byte_size': byte_size, 'checksum': checksum}
+        rendered.append((key, byte_size, checksum))
+    if rendered:
+        render_cache.store_many(conn, rendered, cache_max_bytes)
+    return [{'key': key, **entries[key]} for key in keys]
+
+
+# ---------- IN-MEMORY MODE ----------
+def persist_in_background(user_id, resume, created_at, blob_key, pdf_bytes, cache_max_bytes):
+    """Save a PDF that was rendered in memory and already sent; the request never waits on disk"""
+    return _persist_executor.submit(_persist_pdf, user_id, resume, created_at, blob_key,
+                                    pdf_bytes, cache_max_bytes)
+
+
+def _persist_pdf(user_id, resume, created_at, blob_key, pdf_bytes, cache_max_bytes):
+    with metrics.job_context('persist_pdf'):
+        _write_persisted_pdf(user_id, resume, created_at, blob_key, pdf_bytes, cache_max_bytes)
+
+
+def _write_persisted_pdf(user_id, resume, created_at, blob_key, pdf_bytes, cache_max_bytes):
+    conn = get_db()
+    try:
+        with metrics.span('file_io'):
+            byte_size, checksum = render_cache.write_blob(blob_key, pdf_bytes)
+
+        with metrics.span('db_insert'):
+            save_resume_row(conn, user_id, resume, created_at, blob_key, byte_size, checksum)
+        render_cache.store(conn, blob_key, byte_size, checksum, cache_max_bytes)
+    except Exception as e:
+        logger.error(f"Saving in-memory resume for user {user_id} failed: {e}")
+    finally:
+        conn.close()
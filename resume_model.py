@@ -0,0 +1,163 @@
+"""
+Typed resume model.
+
+A resume is its contact fields plus lists of education entries, experience
+entries and skills. Form parsing produces one, the renderer lays it out and
+the database stores it in normalized tables (education_entry,
+experience_entry, skill). The newline-joined strings in the old `resumes`
+columns are derived from it for older readers and never parsed back, except
+once to migrate rows written before the tables existed.
+"""
+from dataclasses import dataclass, field
+
+NOT_PROVIDED = "Not provided"
+
+CONTACT_FIELDS = ('name', 'title', 'email', 'phone', 'location', 'linkedin', 'template_style')
+
+
+@dataclass(slots=True)
+class EducationEntry:
+    degree: str = ''
+    school: str = ''
+    year: str = ''
+
+    def text(self):
+        """One line, e.g. 'BSc - MIT (2020)' joined with ' - '"""
+        parts = [self.degree, self.school, f"({self.year})" if self.year else '']
+        return ' - '.join(part for part in parts if part)
+
+
+@dataclass(slots=True)
+class ExperienceEntry:
+    title: str = ''
+    company: str = ''
+    date: str = ''
+    bullets: list = field(default_factory=list)
+
+    def heading(self):
+        return self.title + (f" | {self.date}" if self.date else '')
+
+
+@dataclass(slots=True)
+class Resume:
+    name: str = 'Unnamed'
+    title: str = ''
+    email: str = ''
+    phone: str = ''
+    location: str = ''
+    linkedin: str = ''
+    template_style: str = 'modern'
+    education: list = field(default_factory=list)
+    experience: list = field(default_factory=list)
+    skills: list = field(default_factory=list)
+
+    # ---------- BUILDING ----------
+    @classmethod
+    def from_form(cls, form):
+        """Parse the resume form (or anything with get/getlist); blank entries are dropped"""
+        resume = cls(
+            name=form.get('name', 'Unnamed').strip(),
+            title=form.get('title', '').strip(),
+            email=form.get('email', '').strip(),
+            phone=form.get('phone', '').strip(),
+            location=form.get('location', '').strip(),
+            linkedin=form.get('linkedin', '').strip(),
+            template_style=form.get('template_style', 'modern'),
+        )
+
+        degrees = form.getlist('education_degree[]')
+        schools = form.getlist('education_school[]')
+        years = form.getlist('education_year[]')
+        for i in range(len(degrees)):
+            entry = EducationEntry(degrees[i].strip(), _item(schools, i), _item(years, i))
+            if entry.degree or entry.school or entry.year:
+                resume.education.append(entry)
+
+        titles = form.getlist('experience_title[]')
+        companies = form.getlist('experience_company[]')
+        dates = form.getlist('experience_date[]')
+        descriptions = form.getlist('experience_description[]')
+        for i in range(len(titles)):
+            bullets = [line.strip() for line in _item(descriptions, i).split('\n') if line.strip()]
+            entry = ExperienceEntry(titles[i].strip(), _item(companies, i), _item(dates, i), bullets)
+            if entry.title or entry.company or entry.date or entry.bullets:
+                resume.experience.append(entry)
+
+        for skill_input in form.getlist('skills[]'):
+            resume.skills.extend(skill.strip() for skill in skill_input.split(',') if skill.strip())
+        return resume
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict() (job payloads); old flattened payloads are read as legacy text"""
+        if isinstance(data.get('education'), str):
+            return cls.from_legacy(data)
+        return cls(
+            **{name: data.get(name, '') for name in CONTACT_FIELDS},
+            education=[EducationEntry(**entry) for entry in data.get('education', [])],
+            experience=[ExperienceEntry(**entry) for entry in data.get('experience', [])],
+            skills=list(data.get('skills', [])),
+        )
+
+    @classmethod
+    def from_legacy(cls, row):
+        """
+        Rebuild a resume from the flattened strings of an old row. Each line
+        becomes an entry that renders exactly as before, even where the
+        original fields can't be told apart.
+        """
+        resume = cls(**{name: row.get(name) or '' for name in CONTACT_FIELDS})
+        resume.name = row.get('name') or 'Unnamed'
+        resume.template_style = row.get('template_style') or 'modern'
+
+        education = row.get('education') or NOT_PROVIDED
+        if education != NOT_PROVIDED:
+            resume.education = [EducationEntry(degree=line) for line in education.split('\n') if line.strip()]
+
+        experience = row.get('experience') or NOT_PROVIDED
+        if experience != NOT_PROVIDED:
+            for block in experience.split('\n\n'):
+                lines = [line for line in block.split('\n') if line.strip()]
+                if not lines:
+                    continue
+                entry = ExperienceEntry()
+                if not lines[0].startswith('Company:'):
+                    entry.title = lines.pop(0)
+                if lines and lines[0].startswith('Company:'):
+                    entry.company = lines.pop(0)[len('Company:'):].strip()
+                entry.bullets = lines
+                resume.experience.append(entry)
+
+        skills = row.get('skills') or NOT_PROVIDED
+        if skills != NOT_PROVIDED:
+            resume.skills = [skill.strip() for skill in skills.split(',') if skill.strip()]
+        return resume
+
+    def to_dict(self):
+        """Plain JSON-able form (job queue payloads)"""
+        data = {name: getattr(self, name) for name in CONTACT_FIELDS}
+        data['education'] = [{'degree': e.degree, 'school': e.school, 'year': e.year} for e in self.education]
+        data['experience'] = [{'title': e.title, 'company': e.company, 'date': e.date, 'bullets': list(e.bullets)}
+                              for e in self.experience]
+        data['skills'] = list(self.skills)
+        return data
+
+    # ---------- LEGACY TEXT ----------
+    def education_text(self):
+        return "\n".join(entry.text() for entry in self.education) or NOT_PROVIDED
+
+    def experience_text(self):
+        blocks = []
+        for entry in self.experience:
+            lines = [entry.heading()] if entry.heading() else []
+            if entry.company:
+                lines.append(f"Company: {entry.company}")
+            blocks.append('\n'.join(lines + entry.bullets))
+        return "\n\n".join(blocks) or NOT_PROVIDED
+
+    def skills_text(self):
+        return ", ".join(self.skills) or NOT_PROVIDED
+
+
+def _item(values, index):
+    return values[index].strip() if index < len(values) else ''
@@ -1,343 +1,469 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_from_directory, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_from_directory, send_file, jsonify, current_app, Response, stream_with_context, g
+from auth_routes import login_required
 from models import get_db
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph
+from pdf_renderer import parse_resume_form, build_filename, render_resume_pdf
+from render_pool import submit_render_job, get_job, record_completed_job, persist_in_background, render_cached, QueueFull
+from resume_store import save_resume_row, load_resume
+from maintenance import over_quota
+from pdf_templates import template_names
+import template_previews
+import render_cache
+import storage
+from delivery import send_pdf
+from metrics import span
+import pdf_preview
+import bulk
+import exports
+from dataclasses import replace
 from datetime import datetime
-import os
+import uuid
+import math
+import io
 
 resume_bp = Blueprint('resume', __name__)
-os.makedirs("static/resumes", exist_ok=True)
 
 # ---------- TEMPLATE SELECTION ----------
 @resume_bp.route('/template_select')
+@login_required
 def template_select():
-    if 'user_id' not in session:
-        flash('Please login to continue.', 'warning')
-        return redirect(url_for('auth.login'))
+    previews = {name: url_for('resume.template_preview', filename=filename)
+                for name, filename in template_previews.preview_filenames().items()}
     return render_template('template_select.html', 
-                         username=session.get('email', '').split('@')[0],
-                         email=session['email'])
+                         username=g.user.email.split('@')[0],
+                         email=g.user.email, previews=previews)
+
+@resume_bp.route('/template_preview/<filename>')
+def template_preview(filename):
+    """Generated preview image; the name carries its fingerprint, so it never changes"""
+    path = template_previews.ensure_preview(filename)
+    if path is None:
+        return jsonify({'error': 'Preview not found'}), 404
+    response = send_file(path, mimetype='image/png', max_age=365 * 24 * 60 * 60)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 # ---------- RESUME FORM ----------
 @resume_bp.route('/resume_form/<template_style>')
+@login_required
 def resume_form(template_style):
-    if 'user_id' not in session:
-        flash('Please login to build your resume.', 'warning')
-        return redirect(url_for('auth.login'))
-    return render_template('resume_form.html', email=session['email'], template_style=template_style)
+    return render_template('resume_form.html', email=g.user.email, template_style=template_style)
 
-# ---------- GENERATE PDF + SAVE + DOWNLOAD ----------
+# ---------- GENERATE PDF (queued) ----------
 @resume_bp.route('/generate_pdf', methods=['POST'])
+@login_required
 def generate_pdf():
-    if 'user_id' not in session:
-        flash('Please login to generate a resume.', 'warning')
-        return redirect(url_for('auth.login'))
-    
-    # Store the download flag
-    should_download = True
-
-    # Get basic form data
-    name = request.form.get('name', 'Unnamed').strip()
-    title = request.form.get('title', '').strip()
-    email = request.form.get('email', '').strip()
-    phone = request.form.get('phone', '').strip()
-    location = request.form.get('location', '').strip()
-    linkedin = request.form.get('linkedin', '').strip()
-    
-    # Get education data
-    education_degrees = request.form.getlist('education_degree[]')
-    education_schools = request.form.getlist('education_school[]')
-    education_years = request.form.getlist('education_year[]')
-    
-    # Get experience data
-    experience_titles = request.form.getlist('experience_title[]')
-    experience_companies = request.form.getlist('experience_company[]')
-    experience_dates = request.form.getlist('experience_date[]')
-    experience_descriptions = request.form.getlist('experience_description[]')
-    
-    # Get skills data
-    skills_list = request.form.getlist('skills[]')
-    
-    template_style = request.form.get('template_style', 'modern')
-
-    # Build education entries
-    education_entries = []
-    for i in range(len(education_degrees)):
-        degree = education_degrees[i].strip() if i < len(education_degrees) else ''
-        school = education_schools[i].strip() if i < len(education_schools) else ''
-        year = education_years[i].strip() if i < len(education_years) else ''
-        
-        if degree or school or year:
-            entry = []
-            if degree:
-                entry.append(degree)
-            if school:
-                entry.append(school)
-            if year:
-                entry.append(f"({year})")
-            education_entries.append(' - '.join(entry))
-    
-    education = "\n".join(education_entries) if education_entries else "Not provided"
-    
-    # Build experience entries
-    experience_entries = []
-    for i in range(len(experience_titles)):
-        job_title = experience_titles[i].strip() if i < len(experience_titles) else ''
-        company = experience_companies[i].strip() if i < len(experience_companies) else ''
-        date = experience_dates[i].strip() if i < len(experience_dates) else ''
-        description = experience_descriptions[i].strip() if i < len(experience_descriptions) else ''
-        
-        if job_title or company or date or description:
-            entry_parts = []
-            
-            # Title and date
-            title_line = job_title
-            if date:
-                title_line += f" | {date}"
-            if title_line:
-                entry_parts.append(title_line)
-            
-            # Company
-            if company:
-                entry_parts.append(f"Company: {company}")
-            
-            # Description (bullet points)
-            if description:
-                desc_lines = [line.strip() for line in description.split('\n') if line.strip()]
-                entry_parts.extend(desc_lines)
-            
-            if entry_parts:
-                experience_entries.append('\n'.join(entry_parts))
-    
-    experience = "\n\n".join(experience_entries) if experience_entries else "Not provided"
-    
-    # Build skills
-    all_skills = []
-    for skill_input in skills_list:
-        if skill_input.strip():
-            # Split by comma
-            skills = [s.strip() for s in skill_input.split(',') if s.strip()]
-            all_skills.extend(skills)
-    
-    skills = ", ".join(all_skills) if all_skills else "Not provided"
-
-    # Generate filename with timestamp
-    safe_name = name.replace(" ", "_").replace("/", "_").replace("\\", "_")
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    filename = f"{safe_name}_{template_style}_{timestamp}.pdf"
-    file_path = os.path.join("static/resumes", filename)
+    with span('parse_form'):
+        resume = parse_resume_form(request.form)
+    template_style = resume.template_style
+
+    if current_app.config['PDF_RENDER_MODE'] != 'memory' or current_app.config['PDF_PERSIST']:
+        message = _quota_error()
+        if message:
+            if _wants_json():
+                return jsonify({'error': message}), 403
+            flash(message, 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+
+    # One timestamp for both the filename and the row
+    now = datetime.now()
+    filename = build_filename(resume.name, template_style, now.strftime('%Y%m%d%H%M%S'))
+    created_at = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Same content rendered before: reuse the stored PDF instead of rendering it again
+    blob_key = render_cache.cache_key(resume)
+    conn = get_db()
+    try:
+        with span('db_select'):
+            cached = render_cache.lookup(conn, blob_key)
+        if cached:
+            with span('db_insert'):
+                resume_id = save_resume_row(conn, g.user.id, resume, created_at,
+                                            blob_key, cached['byte_size'], cached['checksum'])
+                job_id = record_completed_job(conn, g.user.id, filename, blob_key, resume_id)
+    finally:
+        conn.close()
+
+    if cached:
+        if _wants_json():
+            return jsonify({'job_id': job_id, 'status': 'done',
+                            'status_url': url_for('resume.render_job_status', job_id=job_id),
+                            'download_url': url_for('resume.render_job_download', job_id=job_id)})
+        flash('Resume generated and downloaded successfully! Also saved to your dashboard.', 'success')
+        try:
+            return send_pdf(render_cache.blob_filename(blob_key), download_name=filename,
+                            as_attachment=True, etag=cached['checksum'])
+        except FileNotFoundError:
+            flash('Resume file not found.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
 
-    # Generate PDF
+    # In-memory mode: render into a buffer, stream it back, save to disk afterwards
+    if current_app.config['PDF_RENDER_MODE'] == 'memory':
+        buffer = io.BytesIO()
+        try:
+            render_resume_pdf(resume, buffer)
+        except Exception as e:
+            flash(f'Error generating PDF: {str(e)}', 'danger')
+            return redirect(url_for('resume.resume_form', template_style=template_style))
+
+        if current_app.config['PDF_PERSIST']:
+            persist_in_background(g.user.id, resume, created_at, blob_key, buffer.getvalue(),
+                                  current_app.config['RENDER_CACHE_MAX_BYTES'])
+            flash('Resume generated and downloaded successfully! Also saved to your dashboard.', 'success')
+        buffer.seek(0)
+        return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
+
+    # Hand the render off to the pool instead of drawing in this request
     try:
-        pdf = canvas.Canvas(file_path, pagesize=letter)
-        width, height = letter
-
-        # Template colors
-        if template_style == "modern":
-            header_color = colors.HexColor("#1E4DB4")
-            accent_color = colors.HexColor("#1E4DB4")
-            bottom_color = colors.HexColor("#508CFF")
-        elif template_style == "creative":
-            header_color = colors.HexColor("#28A079")
-            accent_color = colors.HexColor("#1E805F")
-            bottom_color = colors.HexColor("#63D8A2")
-        else:  # simple
-            header_color = colors.black
-            accent_color = colors.black
-            bottom_color = colors.gray
-
-        # Header
-        pdf.setFillColor(header_color)
-        pdf.rect(0, height - 120, width, 120, fill=True, stroke=False)
-        pdf.setFillColor(colors.white)
-        pdf.setFont("Helvetica-Bold", 24)
-        pdf.drawString(50, height - 60, name)
-        
-        # Title
-        if title:
-            pdf.setFont("Helvetica", 14)
-            pdf.drawString(50, height - 80, title)
-        
-        # Contact info
-        contact_parts = []
-        if email:
-            contact_parts.append(email)
-        if phone:
-            contact_parts.append(phone)
-        if location:
-            contact_parts.append(location)
-        if linkedin:
-            contact_parts.append(linkedin)
-        
-        if contact_parts:
-            pdf.setFont("Helvetica", 11)
-            pdf.drawString(50, height - 100, " | ".join(contact_parts))
-
-        y = height - 150
-        pdf.setStrokeColor(accent_color)
-        pdf.setLineWidth(2)
-        pdf.line(40, y, width - 40, y)
-        y -= 30
-
-        def draw_section(title_text, content):
-            nonlocal y
-            if not content or content == "Not provided":
-                return
-            
-            # Section title
-            pdf.setFont("Helvetica-Bold", 16)
-            pdf.setFillColor(accent_color)
-            pdf.drawString(50, y, title_text)
-            y -= 22
-            
-            pdf.setFont("Helvetica", 11)
-            pdf.setFillColor(colors.black)
-            
-            # Split content into lines
-            lines = content.split("\n")
-            for line in lines:
-                if not line.strip():
-                    y -= 8
-                    continue
-                
-                # Check if line is a bullet point (starts with description from experience)
-                if line and not line.startswith("Company:") and title_text == "EXPERIENCE":
-                    # Check if this is a detail line (not title/company)
-                    if not any(line.startswith(prefix) for prefix in ["Company:", "|"]):
-                        # This is a bullet point
-                        line = f"• {line}"
-                        pdf.drawString(70, y, line)
-                    else:
-                        pdf.drawString(70, y, line)
-                else:
-                    pdf.drawString(70, y, line if title_text != "EDUCATION" else f"• {line}")
-                
-                y -= 16
-                
-                # Check for page overflow
-                if y < 60:
-                    pdf.showPage()
-                    y = height - 80
-                    pdf.setFont("Helvetica", 11)
-                    pdf.setFillColor(colors.black)
-            
-            y -= 10
-
-        draw_section("EDUCATION", education)
-        draw_section("EXPERIENCE", experience)
-        
-        # Skills section
-        if skills and skills != "Not provided":
-            pdf.setFont("Helvetica-Bold", 16)
-            pdf.setFillColor(accent_color)
-            pdf.drawString(50, y, "SKILLS")
-            y -= 22
-            pdf.setFont("Helvetica", 11)
-            pdf.setFillColor(colors.black)
-            pdf.drawString(70, y, skills)
-            y -= 20
-
-        # Footer
-        pdf.setFillColor(bottom_color)
-        pdf.rect(0, 0, width, 20, fill=True, stroke=False)
-        pdf.save()
+        with span('enqueue'):
+            job_id = submit_render_job(g.user.id, resume, filename, blob_key, created_at,
+                                       pool_size=current_app.config['RENDER_POOL_SIZE'],
+                                       queue_depth=current_app.config['RENDER_QUEUE_DEPTH'],
+                                       job_timeout=current_app.config['RENDER_JOB_TIMEOUT'],
+                                       cache_max_bytes=current_app.config['RENDER_CACHE_MAX_BYTES'])
+    except QueueFull:
+        if _wants_json():
+            return jsonify({'error': 'Render queue is full, please retry shortly.'}), 429, {'Retry-After': '5'}
+        flash('We are generating a lot of resumes right now. Please try again in a few seconds.', 'warning')
+        return render_template('resume_form.html', email=g.user.email, template_style=template_style), 429
+
+    status_url = url_for('resume.render_job_status', job_id=job_id)
+    download_url = url_for('resume.render_job_download', job_id=job_id)
+    if _wants_json():
+        return jsonify({'job_id': job_id, 'status': 'queued',
+                        'status_url': status_url, 'download_url': download_url}), 202
+    return render_template('render_job.html', email=g.user.email, job_id=job_id,
+                           status_url=status_url, download_url=download_url), 202
+
+def _wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def _quota_error(adding=1):
+    """Why the user can't save `adding` more resumes, if they're at QUOTA_MAX_RESUMES/QUOTA_MAX_BYTES"""
+    return over_quota(get_db(), g.user.id, current_app.config['QUOTA_MAX_RESUMES'],
+                      current_app.config['QUOTA_MAX_BYTES'], adding)
 
+# ---------- RE-RENDER SAVED RESUME ----------
+@resume_bp.route('/resume/<int:resume_id>/render/<template_style>')
+@login_required
+def render_saved(resume_id, template_style):
+    """A saved resume in any template, from its stored sections; nothing is re-submitted or saved"""
+    if template_style not in template_names():
+        flash('Unknown template.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    conn = get_db()
+    try:
+        with span('db_select'):
+            resume = load_resume(conn, resume_id, g.user.id)
+        if resume is None:
+            flash('Resume not found.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        resume.template_style = template_style
+        with span('render'):
+            entry = render_cached(conn, [resume], current_app.config['RENDER_POOL_SIZE'],
+                                  current_app.config['RENDER_CACHE_MAX_BYTES'],
+                                  timeout=current_app.config['RENDER_JOB_TIMEOUT'])[0]
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'danger')
-        return redirect(url_for('resume.resume_form', template_style=template_style))
+        return redirect(url_for('dashboard.dashboard'))
+    finally:
+        conn.close()
+
+    download_name = build_filename(resume.name, template_style, datetime.now().strftime('%Y%m%d%H%M%S'))
+    try:
+        with span('file_io'):
+            return send_pdf(entry['filename'], download_name=download_name,
+                            as_attachment=request.args.get('download') == '1', etag=entry['checksum'])
+    except FileNotFoundError:
+        flash('Resume file not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
 
-    # Save to database
+# ---------- COMPARE TEMPLATES ----------
+@resume_bp.route('/resume/<int:resume_id>/compare')
+@login_required
+def compare_templates(resume_id):
+    """Render a saved resume in every template at once (in parallel) and show them side by side"""
+    conn = get_db()
     try:
+        with span('db_select'):
+            resume = load_resume(conn, resume_id, g.user.id)
+        if resume is None:
+            if _wants_json():
+                return jsonify({'error': 'Resume not found'}), 404
+            flash('Resume not found.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        styles = template_names()
+        variants = [replace(resume, template_style=style) for style in styles]
+        with span('render'):
+            entries = render_cached(conn, variants, current_app.config['RENDER_POOL_SIZE'],
+                                    current_app.config['RENDER_CACHE_MAX_BYTES'],
+                                    timeout=current_app.config['RENDER_JOB_TIMEOUT'])
+    except Exception as e:
+        if _wants_json():
+            return jsonify({'error': f'Error generating PDF: {e}'}), 500
+        flash(f'Error generating PDF: {str(e)}', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+    finally:
+        conn.close()
+
+    # The per-template URLs are now cache hits
+    renders = [{'template_style': style, 'byte_size': entry['byte_size'],
+                'url': url_for('resume.render_saved', resume_id=resume_id, template_style=style),
+                'download_url': url_for('resume.render_saved', resume_id=resume_id, template_style=style, download=1)}
+               for style, entry in zip(styles, entries)]
+    if _wants_json():
+        return jsonify({'resume_id': resume_id, 'renders': renders})
+    return render_template('resume_compare.html', email=g.user.email, name=resume.name, renders=renders)
+
+# ---------- EXPORT ----------
+@resume_bp.route('/resume/<int:resume_id>/export')
+@login_required
+def export_saved(resume_id):
+    """
+    A saved resume in other formats: ?format=docx for one file, ?formats=txt,json
+    (or nothing, for all of them) for a ZIP. Sections are loaded once for every writer.
+    """
+    single = request.args.get('format')
+    if single == 'pdf':
         conn = get_db()
-        c = conn.cursor()
-        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        c.execute('''INSERT INTO resumes 
-                     (user_id, name, email, phone, education, experience, skills, template_style, created_at)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (session['user_id'], name, email, phone, education, experience, skills, template_style, created_at))
-        conn.commit()
+        row = conn.execute('SELECT template_style FROM resumes WHERE id = ? AND user_id = ?',
+                           (resume_id, g.user.id)).fetchone()
         conn.close()
-        
-        flash('Resume generated and downloaded successfully! Also saved to your dashboard.', 'success')
+        template_style = row[0] if row and row[0] in template_names() else 'modern'
+        return redirect(url_for('resume.render_saved', resume_id=resume_id, template_style=template_style, download=1))
+
+    conn = get_db()
+    try:
+        with span('db_select'):
+            resume = load_resume(conn, resume_id, g.user.id)
+        if resume is None:
+            flash('Resume not found.', 'danger')
+            return redirect(url_for('dashboard.dashboard'))
+        return _export_response(conn, resume, single or request.args.get('formats'), single is not None)
     except Exception as e:
-        flash(f'Resume generated but database error: {str(e)}', 'warning')
-    
-    # Return the file for download
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/pdf'
-    )
+        flash(f'Error exporting resume: {str(e)}', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+    finally:
+        conn.close()
+
+@resume_bp.route('/export', methods=['POST'])
+@login_required
+def export_form():
+    """The resume form in every selected format (a ZIP), parsed once; nothing is saved"""
+    with span('parse_form'):
+        resume = parse_resume_form(request.form)
+    conn = get_db()
+    try:
+        return _export_response(conn, resume, request.form.getlist('formats'), False)
+    except Exception as e:
+        flash(f'Error exporting resume: {str(e)}', 'danger')
+        return redirect(url_for('resume.resume_form', template_style=resume.template_style))
+    finally:
+        conn.close()
+
+def _export_response(conn, resume, formats, single):
+    formats = exports.parse_formats(formats)
+    if single and len(formats) != 1:
+        return jsonify({'error': 'Unknown export format'}), 404
+    with span('export'):
+        results = exports.export_resume(conn, resume, formats, current_app.config['RENDER_POOL_SIZE'],
+                                        current_app.config['RENDER_CACHE_MAX_BYTES'],
+                                        timeout=current_app.config['RENDER_JOB_TIMEOUT'])
+
+    # Only the download name carries the timestamp, so the bundle bytes (and ETag) stay stable
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    base_name = exports.file_stem(build_filename(resume.name, resume.template_style, timestamp)[:-len('.pdf')])
+    entry_name = base_name.rsplit('_', 1)[0]
+    if single:
+        fmt = formats[0]
+        key, body = results[fmt]
+        mimetype, download_name = exports.FORMATS[fmt].mimetype, f"{base_name}.{exports.FORMATS[fmt].extension}"
+    else:
+        key, body = exports.bundle_etag(entry_name, results), exports.bundle(entry_name, results)
+        mimetype, download_name = 'application/zip', f"{base_name}.zip"
+    response = send_file(io.BytesIO(body), mimetype=mimetype, as_attachment=True,
+                         download_name=download_name, etag=key)
+    response.cache_control.private = True
+    return response
+
+# ---------- LIVE PREVIEW ----------
+@resume_bp.route('/preview', methods=['POST'])
+@login_required(api=True)
+def preview():
+    """Image of one page of the resume as it would be generated; never saved anywhere"""
+    fmt = request.args.get('format', 'svg')
+    if fmt not in pdf_preview.FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(pdf_preview.FORMATS)}"}), 400
+    page = request.args.get('page', 1, type=int)
+    scale = request.args.get('scale', 0.75, type=float)
+    if not math.isfinite(scale):
+        return jsonify({'error': 'scale must be a number'}), 400
+    scale = min(max(scale, 0.25), 2.0)
+
+    # Identifies this browser's section cache; the PDF pipeline never sees it
+    if 'preview_id' not in session:
+        session['preview_id'] = uuid.uuid4().hex
+
+    with span('parse_form'):
+        resume = parse_resume_form(request.form)
+    with span('preview_render'):
+        body, mimetype, page_count = pdf_preview.render_preview(session['preview_id'], resume, page, fmt, scale)
+
+    response = current_app.response_class(body, mimetype=mimetype)
+    response.headers['X-Preview-Pages'] = str(page_count)
+    response.cache_control.no_store = True
+    return response
+
+# ---------- BULK GENERATE (JSONL/CSV -> ZIP) ----------
+@resume_bp.route('/bulk_generate', methods=['POST'])
+@login_required(api=True)
+def bulk_generate():
+    upload = request.files.get('records')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Upload a .jsonl or .csv file as "records".'}), 400
+
+    try:
+        records, errors = bulk.read_records(upload.stream, upload.filename)
+    except bulk.BulkInputError as e:
+        return jsonify({'error': str(e)}), 400
+
+    max_records = current_app.config['BULK_MAX_RECORDS']
+    if len(records) > max_records:
+        return jsonify({'error': f'At most {max_records} resumes per upload.'}), 413
+    if not records:
+        return jsonify({'error': 'No resume records found.', 'details': errors}), 400
+
+    # Save to the dashboard unless the caller only wants the ZIP
+    save = request.form.get('save', '1') != '0'
+    if save:
+        message = _quota_error(adding=len(records))
+        if message:
+            return jsonify({'error': message}), 403
+    stream = bulk.generate_zip(records, current_app.config['RENDER_POOL_SIZE'], errors,
+                               user_id=g.user.id if save else None,
+                               conn=get_db() if save else None,
+                               cache_max_bytes=current_app.config['RENDER_CACHE_MAX_BYTES'])
+    archive_name = f"resumes_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
+    return Response(stream_with_context(stream), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={archive_name}'})
+
+# ---------- RENDER JOB STATUS ----------
+@resume_bp.route('/jobs/<job_id>')
+@login_required(api=True)
+def render_job_status(job_id):
+    job = get_job(job_id, g.user.id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    body = {'job_id': job['id'], 'status': job['status'], 'error': job['error']}
+    if job['status'] == 'done':
+        body['download_url'] = url_for('resume.render_job_download', job_id=job_id)
+    return jsonify(body)
+
+# ---------- RENDER JOB DOWNLOAD ----------
+@resume_bp.route('/jobs/<job_id>/download')
+@login_required
+def render_job_download(job_id):
+    job = get_job(job_id, g.user.id)
+    if not job:
+        flash('Resume job not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    if job['status'] in ('queued', 'running'):
+        # Not ready yet; tell the client when to come back
+        return jsonify({'job_id': job_id, 'status': job['status']}), 202, {'Retry-After': '1'}
+
+    if job['status'] == 'failed':
+        flash(job['error'] or 'Resume file not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+
+    storage_key = render_cache.blob_filename(job['blob_key']) if job['blob_key'] else job['filename']
+    try:
+        return send_pdf(storage_key, download_name=job['filename'], as_attachment=True, etag=job['checksum'])
+    except FileNotFoundError:
+        flash(job['error'] or 'Resume file not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
 
 # ---------- VIEW RESUME (Opens in browser) ----------
 @resume_bp.route('/view_resume/<filename>')
+@login_required
 def view_resume(filename):
-    if 'user_id' not in session:
-        flash('Please login to view resumes.', 'warning')
-        return redirect(url_for('auth.login'))
-    
-    file_path = os.path.join("static/resumes", filename)
-    if not os.path.exists(file_path):
+    # Send file for inline viewing (opens in browser); browsers fetch ranges as they render
+    info = _stored_file_info(filename)
+    if info is None:
+        flash('Resume file not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+    download_name, checksum = info
+    try:
+        with span('file_io'):
+            return send_pdf(filename, download_name=download_name, etag=checksum)
+    except FileNotFoundError:
         flash('Resume file not found.', 'danger')
         return redirect(url_for('dashboard.dashboard'))
-    
-    # Send file for inline viewing (opens in browser)
-    return send_file(file_path, mimetype='application/pdf')
 
 # ---------- DOWNLOAD RESUME (Forces download) ----------
 @resume_bp.route('/download_resume/<filename>')
+@login_required
 def download_resume(filename):
-    if 'user_id' not in session:
-        flash('Please login to download resumes.', 'warning')
-        return redirect(url_for('auth.login'))
-    
-    file_path = os.path.join("static/resumes", filename)
-    if not os.path.exists(file_path):
+    # Send file as attachment to force download
+    info = _stored_file_info(filename)
+    if info is None:
+        flash('Resume file not found.', 'danger')
+        return redirect(url_for('dashboard.dashboard'))
+    download_name, checksum = info
+    try:
+        with span('file_io'):
+            return send_pdf(filename, download_name=download_name, as_attachment=True, etag=checksum)
+    except FileNotFoundError:
         flash('Resume file not found.', 'danger')
         return redirect(url_for('dashboard.dashboard'))
-    
-    # Send file as attachment to force download
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/pdf'
-    )
+
+def _stored_file_info(filename):
+    """
+    Readable download name and content checksum (the ETag) for a stored file,
+    or None unless one of the current user's resumes references it.
+    Shared cache blobs are named by hash, so the name comes from the user's row.
+    """
+    conn = get_db()
+    with span('db_select'):
+        row = conn.execute('''SELECT name, template_style, created_at, checksum FROM resumes
+                              WHERE storage_key = ? AND user_id = ? LIMIT 1''',
+                           (filename, g.user.id)).fetchone()
+        # Rows not backfilled yet own their file under its legacy name
+        legacy = [] if row else conn.execute('''SELECT name, template_style, created_at FROM resumes
+                                                 WHERE storage_key IS NULL AND user_id = ?''',
+                                              (g.user.id,)).fetchall()
+    conn.close()
+    if row:
+        timestamp = (row[2] or '').replace(':', '').replace('-', '').replace(' ', '')
+        return build_filename(row[0] or 'Unnamed', row[1] or 'modern', timestamp), row[3]
+    if any(filename == storage.legacy_filename(*r) or filename in storage.legacy_candidates(*r) for r in legacy):
+        return filename, None
+    return None
 
 # ---------- DELETE RESUME ----------
 @resume_bp.route('/delete_resume/<int:resume_id>')
+@login_required
 def delete_resume(resume_id):
-    if 'user_id' not in session:
-        flash('Please login to delete resumes.', 'warning')
-        return redirect(url_for('auth.login'))
-
     conn = get_db()
     c = conn.cursor()
-    c.execute('SELECT name, template_style, created_at FROM resumes WHERE id = ? AND user_id = ?', 
-              (resume_id, session['user_id']))
-    resume = c.fetchone()
+    with span('db_select'):
+        c.execute('SELECT name, template_style, created_at, storage_key FROM resumes WHERE id = ? AND user_id = ?', 
+                  (resume_id, g.user.id))
+        resume = c.fetchone()
 
     if resume:
-        # Safely generate filename
-        safe_name = (resume[0] or 'Unnamed').replace(' ', '_')
-        safe_template = resume[1] or 'modern'
-        safe_timestamp = (resume[2] or '').replace(':', '').replace('-', '').replace(' ', '')
-        filename = f"{safe_name}_{safe_template}_{safe_timestamp}.pdf"
-        
-        file_path = os.path.join("static/resumes", filename)
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"Error deleting file: {e}")
-
-        c.execute('DELETE FROM resumes WHERE id = ? AND user_id = ?', (resume_id, session['user_id']))
-        conn.commit()
+        # Rows from before storage_key existed are matched to their file on disk
+        with span('file_io'):
+            storage_key = resume[3] or storage.find_legacy_file(resume[0], resume[1], resume[2])
+
+        with span('db_delete'):
+            c.execute('DELETE FROM resumes WHERE id = ? AND user_id = ?', (resume_id, g.user.id))
+            conn.commit()
+        # Shared files are only removed once no other row or cache entry uses them
+        with span('file_io'):
+            storage.release(conn, storage_key)
         flash('Resume deleted successfully.', 'success')
     else:
         flash('Resume not found.', 'danger')
@@ -0,0 +1,118 @@
+"""
+Resumes in the database.
+
+A saved resume is one `resumes` row plus its education_entry,
+experience_entry and skill rows. They are always written together, in one
+transaction per batch, and read back into the typed model without parsing
+any text.
+"""
+from resume_model import Resume, EducationEntry, ExperienceEntry
+import render_cache
+
+RESUME_INSERT = '''INSERT INTO resumes
+                   (user_id, name, title, email, phone, location, linkedin, education, experience, skills,
+                    template_style, created_at, blob_key, storage_key, byte_size, checksum)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+EDUCATION_INSERT = 'INSERT INTO education_entry (resume_id, position, degree, school, year) VALUES (?, ?, ?, ?, ?)'
+EXPERIENCE_INSERT = '''INSERT INTO experience_entry (resume_id, position, title, company, date, description)
+                       VALUES (?, ?, ?, ?, ?, ?)'''
+SKILL_INSERT = 'INSERT INTO skill (resume_id, position, name) VALUES (?, ?, ?)'
+
+
+# ---------- WRITING ----------
+def resume_row_values(user_id, resume, created_at, blob_key, byte_size, checksum):
+    """Parameters for RESUME_INSERT"""
+    return (user_id, resume.name, resume.title, resume.email, resume.phone, resume.location, resume.linkedin,
+            resume.education_text(), resume.experience_text(), resume.skills_text(),
+            resume.template_style, created_at,
+            blob_key, render_cache.blob_filename(blob_key), byte_size, checksum)
+
+
+def _section_rows(resume_id, resume, education, experience, skills):
+    education.extend((resume_id, position, entry.degree, entry.school, entry.year)
+                     for position, entry in enumerate(resume.education))
+    experience.extend((resume_id, position, entry.title, entry.company, entry.date, '\n'.join(entry.bullets))
+                      for position, entry in enumerate(resume.experience))
+    skills.extend((resume_id, position, name) for position, name in enumerate(resume.skills))
+
+
+def _insert_sections(c, education, experience, skills):
+    c.executemany(EDUCATION_INSERT, education)
+    c.executemany(EXPERIENCE_INSERT, experience)
+    c.executemany(SKILL_INSERT, skills)
+
+
+def save_resumes(conn, rows):
+    """
+    Insert resumes with their sections in one transaction and return their ids.
+    `rows` are (user_id, resume, created_at, blob_key, byte_size, checksum) tuples.
+    """
+    c = conn.cursor()
+    ids = []
+    education, experience, skills = [], [], []
+    try:
+        for user_id, resume, *stored in rows:
+            c.execute(RESUME_INSERT, resume_row_values(user_id, resume, *stored))
+            ids.append(c.lastrowid)
+            _section_rows(c.lastrowid, resume, education, experience, skills)
+        _insert_sections(c, education, experience, skills)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return ids
+
+
+def save_resume_row(conn, user_id, resume, created_at, blob_key, byte_size, checksum):
+    """Insert one generated resume and return its id"""
+    return save_resumes(conn, [(user_id, resume, created_at, blob_key, byte_size, checksum)])[0]
+
+
+# ---------- READING ----------
+def load_resume(conn, resume_id, user_id=None):
+    """The saved resume as a Resume, or None (also None if it belongs to another user)"""
+    query = '''SELECT name, title, email, phone, location, linkedin, template_style,
+                      education, experience, skills FROM resumes WHERE id = ?'''
+    params = [resume_id]
+    if user_id is not None:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    row = conn.execute(query, params).fetchone()
+    if not row:
+        return None
+
+    resume = Resume(name=row[0] or 'Unnamed', title=row[1] or '', email=row[2] or '', phone=row[3] or '',
+                    location=row[4] or '', linkedin=row[5] or '', template_style=row[6] or 'modern')
+    resume.education = [EducationEntry(*entry) for entry in conn.execute(
+        'SELECT degree, school, year FROM education_entry WHERE resume_id = ? ORDER BY position', (resume_id,))]
+    resume.experience = [ExperienceEntry(title, company, date, description.split('\n') if description else [])
+                         for title, company, date, description in conn.execute(
+        'SELECT title, company, date, description FROM experience_entry WHERE resume_id = ? ORDER BY position',
+        (resume_id,))]
+    resume.skills = [name for (name,) in conn.execute(
+        'SELECT name FROM skill WHERE resume_id = ? ORDER BY position', (resume_id,))]
+    return resume
+
+
+# ---------- MIGRATION ----------
+def migrate_legacy_rows(conn, batch_size=500):
+    """
+    Fill the section tables for rows saved before they existed, from the
+    flattened text columns. Runs once, when init_db() creates the tables;
+    the caller commits.
+    """
+    c = conn.cursor()
+    last_id = 0
+    while True:
+        rows = c.execute('''SELECT id, name, email, phone, template_style, education, experience, skills
+                            FROM resumes WHERE id > ? ORDER BY id LIMIT ?''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        education, experience, skills = [], [], []
+        for resume_id, name, email, phone, template_style, education_text, experience_text, skills_text in rows:
+            resume = Resume.from_legacy({'name': name, 'email': email, 'phone': phone,
+                                         'template_style': template_style, 'education': education_text,
+                                         'experience': experience_text, 'skills': skills_text})
+            _section_rows(resume_id, resume, education, experience, skills)
+        _insert_sections(c, education, experience, skills)
+        last_id = rows[-1][0]
@@ -0,0 +1,87 @@
+"""
+Dashboard search over a user's saved resumes.
+
+`resumes_fts` is an FTS5 index over the name, title and flattened
+education/experience/skills columns, kept in sync by triggers on `resumes`
+(see models.init_db). Results are ranked with bm25, weighting a hit in the
+name or skills above one in a job description, and paginated by page
+number. Where SQLite lacks FTS5 the same query runs as a LIKE scan.
+"""
+from markupsafe import Markup, escape
+import re
+
+# bm25 weights per column: name, title, education, experience, skills
+WEIGHTS = (10.0, 5.0, 2.0, 1.0, 4.0)
+COLUMNS = ('name', 'title', 'education', 'experience', 'skills')
+# Snippet highlight markers; control characters can't come from the form
+MARK_START, MARK_END = '\x02', '\x03'
+MAX_TERMS = 8
+
+_fts_available = {}
+
+
+def query_terms(text):
+    """Words of the search box, at most MAX_TERMS"""
+    return re.findall(r'\w+', text or '')[:MAX_TERMS]
+
+
+def match_expression(terms):
+    """FTS5 query matching every term as a prefix ('pyth' finds 'Python')"""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def has_fts(conn):
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    if path not in _fts_available:
+        _fts_available[path] = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'resumes_fts'").fetchone() is not None
+    return _fts_available[path]
+
+
+def search_resumes(conn, user_id, text, page=1, page_size=20, template_style=None):
+    """
+    One page of the user's resumes matching `text`, best first. Returns
+    (rows, has_more); each row has id, name, template_style, created_at,
+    storage_key and a highlighted `snippet`.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return [], False
+    offset = (max(page, 1) - 1) * page_size
+
+    if has_fts(conn):
+        query = f'''SELECT r.id, r.name, r.template_style, r.created_at, r.storage_key,
+                           snippet(resumes_fts, -1, '{MARK_START}', '{MARK_END}', '…', 12) AS snippet
+                    FROM resumes_fts JOIN resumes r ON r.id = resumes_fts.rowid
+                    WHERE resumes_fts MATCH ? AND r.user_id = ?'''
+        params = [match_expression(terms), user_id]
+        order = f"bm25(resumes_fts, {', '.join(map(str, WEIGHTS))}), r.created_at DESC"
+    else:
+        query = '''SELECT r.id, r.name, r.template_style, r.created_at, r.storage_key, NULL AS snippet
+                   FROM resumes r WHERE r.user_id = ?'''
+        params = [user_id]
+        for term in terms:
+            query += ' AND (' + ' OR '.join(f'r.{column} LIKE ?' for column in COLUMNS) + ')'
+            params += [f'%{term}%'] * len(COLUMNS)
+        order = 'r.created_at DESC, r.id DESC'
+
+    if template_style:
+        query += ' AND r.template_style = ?'
+        params.append(template_style)
+    query += f' ORDER BY {order} LIMIT ? OFFSET ?'
+    params += [page_size + 1, offset]
+
+    c = conn.execute(query, params)
+    names = [column[0] for column in c.description]
+    rows = [dict(zip(names, row)) for row in c.fetchall()]
+    for row in rows:
+        row['snippet'] = highlight(row['snippet'])
+    return rows[:page_size], len(rows) > page_size
+
+
+def highlight(snippet):
+    """Escape a snippet and turn the match markers into <mark> tags"""
+    if not snippet:
+        return None
+    html = str(escape(snippet)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return Markup(html)
@@ -0,0 +1,420 @@
+"""
+Server-side sessions.
+
+The session cookie carries only a random id; the data lives in a store:
+
+- 'sqlite' (default): the `sessions` table of the app database, shared by
+  every worker process, so any worker can serve any request and a logout
+  anywhere is a logout everywhere.
+- 'memory': a dict with TTL eviction, for a single process (development,
+  tests).
+
+Ids are stored as sha256 hashes, so a copy of the table can't be replayed
+as cookies. A session is only read from the store when a request first
+touches it (static files and previews never do), and only written back
+when it changed or its expiry needs pushing out.
+
+The user record for a session is kept in a per-process LRU keyed by
+session id, so `current_user()` is a dict hit after a worker's first
+request; the users table is only read on a miss. Revoking sessions deletes
+their rows: every worker sees the session gone on its next request and
+never needs to consult the users table for it.
+
+    python sessions.py revoke someone@example.com   # log a user out everywhere
+    python sessions.py revoke --all                 # log everyone out
+    python sessions.py purge                        # drop expired sessions
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import argparse
+import hashlib
+import secrets
+import threading
+import time
+import logging
+
+from flask import session, current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+
+from models import get_db
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps of expired sessions (per process)
+PURGE_INTERVAL = 600
+USER_CACHE_SIZE = 10000
+
+serializer = TaggedJSONSerializer()
+
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+
+def _key(sid):
+    return hashlib.sha256(sid.encode('utf-8')).hexdigest()
+
+
+# ---------- STORES ----------
+class SQLiteSessionStore:
+    """Sessions in the app database (see models.init_db), shared by every worker"""
+
+    def __init__(self, purge_interval=PURGE_INTERVAL):
+        self.purge_interval = purge_interval
+        self._next_purge = 0
+
+    def load(self, sid):
+        """(data, expires_at) of a live session, else None"""
+        conn = get_db()
+        row = conn.execute('SELECT data, expires_at FROM sessions WHERE id = ?', (_key(sid),)).fetchone()
+        conn.close()
+        if row is None or row[1] < time.time():
+            return None
+        return serializer.loads(row[0]), row[1]
+
+    def save(self, sid, data, expires_at):
+        conn = get_db()
+        conn.execute('INSERT OR REPLACE INTO sessions (id, user_id, data, expires_at) VALUES (?, ?, ?, ?)',
+                     (_key(sid), data.get('user_id'), serializer.dumps(data), expires_at))
+        conn.commit()
+        self._maybe_purge(conn)
+        conn.close()
+
+    def touch(self, sid, expires_at):
+        conn = get_db()
+        conn.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, _key(sid)))
+        conn.commit()
+        conn.close()
+
+    def delete(self, sid):
+        conn = get_db()
+        conn.execute('DELETE FROM sessions WHERE id = ?', (_key(sid),))
+        conn.commit()
+        conn.close()
+
+    def revoke_user(self, user_id):
+        """End every session of `user_id`; returns how many"""
+        conn = get_db()
+        count = conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,)).rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    def revoke_all(self):
+        conn = get_db()
+        count = conn.execute('DELETE FROM sessions').rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    def purge(self):
+        """Drop expired sessions; returns how many"""
+        conn = get_db()
+        count = conn.execute('DELETE FROM sessions WHERE expires_at < ?', (time.time(),)).rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    def _maybe_purge(self, conn):
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            conn.execute('DELETE FROM sessions WHERE expires_at < ?', (now,))
+            conn.commit()
+
+
+class MemorySessionStore:
+    """Sessions in this process only, evicted once expired"""
+
+    def __init__(self, purge_interval=PURGE_INTERVAL):
+        self.purge_interval = purge_interval
+        self._next_purge = 0
+        self._sessions = {}     # hashed id -> (user_id, serialized data, expires_at)
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(_key(sid))
+            if entry is None:
+                return None
+            if entry[2] < time.time():
+                del self._sessions[_key(sid)]
+                return None
+        return serializer.loads(entry[1]), entry[2]
+
+    def save(self, sid, data, expires_at):
+        entry = (data.get('user_id'), serializer.dumps(data), expires_at)
+        with self._lock:
+            self._sessions[_key(sid)] = entry
+            now = time.time()
+            if now >= self._next_purge:
+                self._next_purge = now + self.purge_interval
+                self._purge(now)
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            entry = self._sessions.get(_key(sid))
+            if entry is not None:
+                self._sessions[_key(sid)] = entry[:2] + (expires_at,)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(_key(sid), None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            keys = [key for key, entry in self._sessions.items() if entry[0] == user_id]
+            for key in keys:
+                del self._sessions[key]
+        return len(keys)
+
+    def revoke_all(self):
+        with self._lock:
+            count = len(self._sessions)
+            self._sessions.clear()
+        return count
+
+    def purge(self):
+        with self._lock:
+            return self._purge(time.time())
+
+    def _purge(self, now):
+        expired = [key for key, entry in self._sessions.items() if entry[2] < now]
+        for key in expired:
+            del self._sessions[key]
+        return len(expired)
+
+
+def create_store(backend):
+    if backend == 'sqlite':
+        return SQLiteSessionStore()
+    if backend == 'memory':
+        return MemorySessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND {backend!r}")
+
+
+# ---------- SESSION ----------
+class ServerSession(SessionMixin):
+    """Session data held in a store, loaded on first access"""
+
+    def __init__(self, store, sid):
+        self.store = store
+        self.sid = sid
+        self.had_cookie = sid is not None
+        self.expires_at = None
+        self.modified = False
+        self.accessed = False
+        self.replaced_sid = None
+        self._data = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def _load(self):
+        if self._data is None:
+            self.accessed = True
+            record = self.store.load(self.sid) if self.sid else None
+            if record is None:
+                # Unknown, expired or revoked: never adopt an id we didn't issue
+                self.sid = None
+                self._data = {}
+            else:
+                self._data, self.expires_at = record
+        return self._data
+
+    def regenerate(self):
+        """
+        Move the data to a fresh id (call on login), so an id planted
+        before authentication is worthless afterwards.
+        """
+        self._load()
+        if self.sid:
+            self.replaced_sid = self.sid
+        self.sid = new_session_id()
+        self.modified = True
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface over a session store"""
+
+    def __init__(self, store, touch_interval=60):
+        self.store = store
+        # Push the expiry out at most this often for sessions that haven't changed
+        self.touch_interval = touch_interval
+
+    def open_session(self, app, request):
+        return ServerSession(self.store, request.cookies.get(self.get_cookie_name(app)))
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            return
+        response.vary.add('Cookie')
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced_sid:
+            self.store.delete(session.replaced_sid)
+            _users.forget(session.replaced_sid)
+
+        if not session:
+            if session.had_cookie:
+                if session.sid:
+                    self.store.delete(session.sid)
+                    _users.forget(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        now = time.time()
+        expires_at = now + app.permanent_session_lifetime.total_seconds()
+        if session.sid is None:
+            session.sid = new_session_id()
+            session.modified = True
+        if session.modified:
+            self.store.save(session.sid, dict(session), expires_at)
+        elif session.expires_at is not None and expires_at - session.expires_at > self.touch_interval:
+            self.store.touch(session.sid, expires_at)
+        else:
+            return
+
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                            partitioned=self.get_cookie_partitioned(app))
+
+
+# ---------- USERS ----------
+@dataclass(frozen=True, slots=True)
+class User:
+    id: int
+    email: str
+
+
+class UserCache:
+    """User records by session id, LRU-bounded"""
+
+    def __init__(self, max_entries=USER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, sid, user_id):
+        with self._lock:
+            user = self._users.get(sid)
+            if user is not None and user.id == user_id:
+                self._users.move_to_end(sid)
+                self.stats['hits'] += 1
+                return user
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, sid, user):
+        with self._lock:
+            self._users[sid] = user
+            self._users.move_to_end(sid)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+
+    def forget(self, sid):
+        with self._lock:
+            self._users.pop(sid, None)
+
+
+_users = UserCache()
+
+
+def remember_user(user):
+    """Cache the logged-in user for the current session (after regenerate())"""
+    _users.put(session.sid, user)
+
+
+def current_user():
+    """The logged-in User of this request, or None"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    user = _users.get(session.sid, user_id)
+    if user is None:
+        conn = get_db()
+        row = conn.execute('SELECT id, email FROM users WHERE id = ?', (user_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        user = User(row[0], row[1])
+        _users.put(session.sid, user)
+    return user
+
+
+def revoke_user_sessions(user_id):
+    """Log `user_id` out on every device; returns how many sessions ended"""
+    return current_app.session_interface.store.revoke_user(user_id)
+
+
+def user_cache_stats():
+    return dict(_users.stats)
+
+
+def init_app(app):
+    """Serve this app's sessions from the configured store"""
+    global _users
+    _users = UserCache(app.config.get('SESSION_USER_CACHE_SIZE', USER_CACHE_SIZE))
+    app.session_interface = ServerSideSessionInterface(
+        create_store(app.config.get('SESSION_BACKEND', 'sqlite')),
+        touch_interval=app.config.get('SESSION_TOUCH_INTERVAL', 60))
+
+
+# ---------- CLI ----------
+def main():
+    import os
+    import models
+
+    parser = argparse.ArgumentParser(description='Manage login sessions (SQLite store)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    revoke = sub.add_parser('revoke', help="end a user's sessions on every device")
+    revoke.add_argument('email', nargs='?')
+    revoke.add_argument('--all', action='store_true', help='end every session')
+    sub.add_parser('purge', help='drop expired sessions')
+    args = parser.parse_args()
+
+    models.set_database(os.environ.get('DATABASE', 'users.db'))
+    models.init_db()
+    store = SQLiteSessionStore()
+    if args.command == 'purge':
+        print(f"Removed {store.purge()} expired sessions")
+    elif args.all:
+        print(f"Ended {store.revoke_all()} sessions")
+    elif args.email:
+        conn = get_db()
+        row = conn.execute('SELECT id FROM users WHERE email = ?', (args.email.strip().lower(),)).fetchone()
+        conn.close()
+        if row is None:
+            parser.error(f"No user {args.email}")
+        print(f"Ended {store.revoke_user(row[0])} sessions of {args.email}")
+    else:
+        parser.error('give an email or --all')
+
+if __name__ == '__main__':
+    main()
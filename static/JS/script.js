@@ -122,6 +122,7 @@ function updateNavigationButtons() {
   const prevBtn = document.getElementById('prevBtn');
   const nextBtn = document.getElementById('nextBtn');
   const submitBtn = document.getElementById('submitBtn');
+  const exportBtn = document.getElementById('exportBtn');
   
   // Disable Previous button on first step
   if (prevBtn) {
@@ -133,9 +134,11 @@ function updateNavigationButtons() {
     if (currentStep === totalSteps) {
       nextBtn.classList.add('hidden');
       submitBtn.classList.remove('hidden');
+      if (exportBtn) exportBtn.classList.remove('hidden');
     } else {
       nextBtn.classList.remove('hidden');
       submitBtn.classList.add('hidden');
+      if (exportBtn) exportBtn.classList.add('hidden');
     }
   }
 }
@@ -155,6 +158,62 @@ function updatePreview() {
   updatePreviewEducation();
   updatePreviewExperience();
   updatePreviewSkills();
+  scheduleServerPreview();
+}
+
+// ========================================
+// SERVER PREVIEW
+// ========================================
+
+let serverPreviewTimer = null;
+let serverPreviewRequest = null;
+let serverPreviewObjectUrl = null;
+
+/**
+ * Ask the server for the first page as it will really be generated,
+ * once typing pauses. The DOM preview stays up if this fails.
+ */
+function scheduleServerPreview() {
+  if (typeof previewUrl === 'undefined') return;
+  clearTimeout(serverPreviewTimer);
+  serverPreviewTimer = setTimeout(fetchServerPreview, 400);
+}
+
+function fetchServerPreview() {
+  const form = document.getElementById('resumeForm');
+  if (!form) return;
+
+  // Only the newest preview matters
+  if (serverPreviewRequest) serverPreviewRequest.abort();
+  serverPreviewRequest = new AbortController();
+
+  fetch(`${previewUrl}?format=svg`, {
+    method: 'POST',
+    body: new FormData(form),
+    credentials: 'same-origin',
+    signal: serverPreviewRequest.signal
+  })
+    .then(response => {
+      if (!response.ok) throw new Error(`Preview failed: ${response.status}`);
+      const pages = parseInt(response.headers.get('X-Preview-Pages') || '1', 10);
+      return response.blob().then(blob => ({ blob, pages }));
+    })
+    .then(({ blob, pages }) => {
+      if (serverPreviewObjectUrl) URL.revokeObjectURL(serverPreviewObjectUrl);
+      serverPreviewObjectUrl = URL.createObjectURL(blob);
+      document.getElementById('serverPreviewImage').src = serverPreviewObjectUrl;
+
+      const pagesNote = document.getElementById('serverPreviewPages');
+      pagesNote.textContent = `Page 1 of ${pages}`;
+      pagesNote.classList.toggle('hidden', pages < 2);
+
+      const domPreview = document.getElementById(`${templateStyle}Preview`);
+      if (domPreview) domPreview.classList.add('hidden');
+      document.getElementById('serverPreview').classList.remove('hidden');
+    })
+    .catch(error => {
+      if (error.name !== 'AbortError') console.warn(error);
+    });
 }
 
 /**
@@ -0,0 +1,247 @@
+"""
+Storage bookkeeping for generated PDFs.
+
+Every `resumes` row records the object it points at (storage_key) together
+with its byte size and SHA-256 checksum, so nothing has to rebuild
+filenames from name/template/created_at any more. The objects themselves
+live in the configured backend (see storage_backends.py):
+
+    STORAGE_BACKEND = 'filesystem'      # sharded under STORAGE_DIR (default)
+    STORAGE_BACKEND = 's3'              # S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY_ID, ...
+
+Run as a script to reconcile older databases and the stored files:
+
+    python storage.py backfill          # fill storage columns for legacy rows
+    python storage.py orphans           # list files no row or cache entry references
+    python storage.py orphans --delete  # ...and remove them
+    python storage.py reshard           # move static/resumes files into their shard directories
+"""
+from datetime import datetime, timedelta
+import argparse
+import hashlib
+import os
+import time
+import logging
+
+from storage_backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DIR = "static/resumes"
+
+# Half-written renders (*.tmp) younger than this may still be in progress
+TMP_GRACE_SECONDS = 60 * 60
+
+_settings = {'backend': 'filesystem', 'root': STORAGE_DIR, 'shard_depth': 2}
+_backend = None
+
+
+# ---------- BACKEND ----------
+def settings_from_config(config):
+    """Backend settings from app config (or os.environ, for the command line tools)"""
+    return {
+        'backend': config.get('STORAGE_BACKEND', 'filesystem'),
+        'root': config.get('STORAGE_DIR', STORAGE_DIR),
+        'shard_depth': int(config.get('STORAGE_SHARD_DEPTH', 2)),
+        's3_endpoint_url': config.get('S3_ENDPOINT_URL'),
+        's3_bucket': config.get('S3_BUCKET'),
+        's3_access_key_id': config.get('S3_ACCESS_KEY_ID'),
+        's3_secret_access_key': config.get('S3_SECRET_ACCESS_KEY'),
+        's3_region': config.get('S3_REGION', 'us-east-1'),
+        's3_prefix': config.get('S3_PREFIX', ''),
+        's3_pool_size': int(config.get('S3_POOL_SIZE', 16)),
+    }
+
+
+def configure(settings):
+    """Switch this process to the backend described by `settings` (a plain dict, so pool workers get it too)"""
+    global _settings, _backend
+    _settings = dict(settings)
+    _backend = None
+
+
+def current_settings():
+    return dict(_settings)
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend(_settings)
+    return _backend
+
+
+def describe(storage_key):
+    """Return (byte_size, sha256 hex) of a stored object"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in backend().open(storage_key):
+        digest.update(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def describe_file(path):
+    """Return (byte_size, sha256 hex) of a local file"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def is_referenced(conn, storage_key):
+    """True while a resume row or the render cache still points at the file"""
+    if conn.execute('SELECT 1 FROM resumes WHERE storage_key = ? LIMIT 1', (storage_key,)).fetchone():
+        return True
+    return conn.execute('SELECT 1 FROM render_cache WHERE filename = ?', (storage_key,)).fetchone() is not None
+
+
+def release(conn, storage_key):
+    """Delete a stored file once nothing references it any more"""
+    if not storage_key or is_referenced(conn, storage_key):
+        return
+    try:
+        backend().delete(storage_key)
+    except OSError as e:
+        logger.error(f"Error deleting file {storage_key}: {e}")
+
+
+# ---------- LEGACY ROWS ----------
+def legacy_filename(name, template_style, created_at):
+    """The filename the dashboard used to rebuild for rows written before storage_key existed"""
+    safe_name = (name or 'Unnamed').replace(' ', '_')
+    safe_template = template_style or 'modern'
+    safe_timestamp = (created_at or '').replace(':', '').replace('-', '').replace(' ', '')
+    return f"{safe_name}_{safe_template}_{safe_timestamp}.pdf"
+
+
+def legacy_candidates(name, template_style, created_at):
+    """
+    Filenames the PDF of a legacy row may have. The old code stamped the
+    filename and created_at with two separate datetime.now() calls, so the
+    file can be a few seconds older than the row.
+    """
+    safe_name = (name or 'Unnamed').replace(" ", "_").replace("/", "_").replace("\\", "_")
+    safe_template = template_style or 'modern'
+    try:
+        stamp = datetime.strptime(created_at or '', "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return [legacy_filename(name, template_style, created_at)]
+    return [f"{safe_name}_{safe_template}_{(stamp - timedelta(seconds=offset)).strftime('%Y%m%d%H%M%S')}.pdf"
+            for offset in range(0, 6)]
+
+
+def find_legacy_file(name, template_style, created_at):
+    """Locate the PDF of a legacy row"""
+    for candidate in legacy_candidates(name, template_style, created_at):
+        if backend().exists(candidate):
+            return candidate
+    return None
+
+
+def backfill(conn, batch_size=500):
+    """Fill storage_key/byte_size/checksum for rows that predate them; returns counts"""
+    stats = {'updated': 0, 'missing': 0}
+    last_id = 0
+    while True:
+        rows = conn.execute('''SELECT id, name, template_style, created_at, blob_key FROM resumes
+                               WHERE storage_key IS NULL AND id > ? ORDER BY id LIMIT ?''',
+                            (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = []
+        for resume_id, name, template_style, created_at, blob_key in rows:
+            storage_key = f"{blob_key}.pdf" if blob_key else find_legacy_file(name, template_style, created_at)
+            if not storage_key or not backend().exists(storage_key):
+                stats['missing'] += 1
+                continue
+            byte_size, checksum = describe(storage_key)
+            updates.append((storage_key, byte_size, checksum, resume_id))
+
+        # One transaction per batch
+        conn.executemany('UPDATE resumes SET storage_key = ?, byte_size = ?, checksum = ? WHERE id = ?', updates)
+        conn.commit()
+        stats['updated'] += len(updates)
+    return stats
+
+
+# ---------- ORPHANS ----------
+def find_orphans(conn, min_age=0):
+    """
+    Yield (storage key, byte_size) for stored files that nothing references.
+    With `min_age`, younger files are left alone: a render writes its file
+    before the row that references it.
+    """
+    referenced = {row[0] for row in conn.execute('SELECT storage_key FROM resumes WHERE storage_key IS NOT NULL')}
+    referenced.update(row[0] for row in conn.execute('SELECT filename FROM render_cache'))
+    # Rows not backfilled yet still own their file under its blob or legacy name
+    for name, template_style, created_at, blob_key in conn.execute(
+            'SELECT name, template_style, created_at, blob_key FROM resumes WHERE storage_key IS NULL'):
+        if blob_key:
+            referenced.add(f"{blob_key}.pdf")
+        referenced.add(legacy_filename(name, template_style, created_at))
+        referenced.update(legacy_candidates(name, template_style, created_at))
+
+    now = time.time()
+    for key, byte_size, mtime in backend().list():
+        if key.endswith('.tmp'):
+            if now - mtime > TMP_GRACE_SECONDS:
+                yield key, byte_size
+        elif key.endswith('.pdf') and key not in referenced and now - mtime >= min_age:
+            yield key, byte_size
+
+
+def collect_garbage(conn, delete=False):
+    """Report (and optionally delete) orphaned files; returns (count, bytes)"""
+    count = total = 0
+    # Safe while the app runs: a file written moments ago may be about to get its row
+    for filename, byte_size in find_orphans(conn, min_age=TMP_GRACE_SECONDS):
+        count += 1
+        total += byte_size
+        print(f"{'deleted' if delete else 'orphan'}: {filename} ({byte_size} bytes)")
+        if delete:
+            try:
+                backend().delete(filename)
+            except OSError as e:
+                logger.error(f"Error deleting file {filename}: {e}")
+    return count, total
+
+
+def main():
+    from models import init_db, get_db
+
+    parser = argparse.ArgumentParser(description="Reconcile resume PDFs on disk with the database")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('backfill', help='record storage key, size and checksum for legacy rows')
+    orphans = sub.add_parser('orphans', help='list files no resume row references')
+    orphans.add_argument('--delete', action='store_true', help='remove the orphaned files')
+    sub.add_parser('reshard', help='move files into the shard directories of STORAGE_SHARD_DEPTH')
+    args = parser.parse_args()
+
+    configure(settings_from_config(os.environ))
+    if args.command == 'reshard':
+        if not hasattr(backend(), 'reshard'):
+            parser.error('reshard only applies to the filesystem backend')
+        print(f"Moved {backend().reshard()} files into shard directories")
+        return
+
+    init_db()
+    conn = get_db()
+    try:
+        if args.command == 'backfill':
+            stats = backfill(conn)
+            print(f"Backfilled {stats['updated']} rows, {stats['missing']} rows have no file on disk")
+        else:
+            count, total = collect_garbage(conn, delete=args.delete)
+            print(f"{count} orphaned files, {total} bytes{' reclaimed' if args.delete else ''}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+"""
+Where generated PDFs are kept.
+
+Two backends share one small interface (put_file, put_bytes, open, exists,
+stat, delete, list, local_path, presigned_url):
+
+FilesystemBackend
+    Files under a root directory, sharded two levels deep by a hash of the
+    key (ab/cd/<key>) so no directory grows past a few thousand entries.
+    Files written before sharding are still found at the top level.
+    It's also the stand-in for object storage in development.
+
+S3Backend
+    Any S3-compatible store (AWS S3, MinIO, Ceph, R2...). Requests are
+    signed with AWS Signature V4 and sent over a pool of keep-alive
+    connections. Uploads and downloads stream in CHUNK_SIZE blocks, and
+    presigned GET URLs let browsers download straight from the bucket.
+    Path-style addressing is used, which every S3-compatible server
+    accepts.
+"""
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+import hashlib
+import hmac
+import http.client
+import io
+import os
+import queue
+import shutil
+
+CHUNK_SIZE = 64 * 1024
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+
+class StorageError(OSError):
+    """The storage backend refused or failed a request"""
+
+
+def _atomic_copy(fileobj, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{id(fileobj)}.tmp"
+    with open(tmp_path, 'wb') as f:
+        shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+    os.replace(tmp_path, path)
+
+
+# ---------- FILESYSTEM ----------
+class FilesystemBackend:
+    name = 'filesystem'
+
+    def __init__(self, root, shard_depth=2):
+        self.root = root
+        self.shard_depth = shard_depth
+
+    def relative_path(self, key):
+        """Sharded location of `key` under the root, e.g. '3f/a9/<key>'"""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        return '/'.join(shards + [key])
+
+    def _path(self, key):
+        return os.path.join(self.root, *self.relative_path(key).split('/'))
+
+    def local_path(self, key):
+        """Path of an existing file (sharded, or flat from before sharding), else None"""
+        for path in (self._path(key), os.path.join(self.root, key)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def exists(self, key):
+        return self.local_path(key) is not None
+
+    def stat(self, key):
+        """(byte_size, mtime); raises FileNotFoundError"""
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        info = os.stat(path)
+        return info.st_size, info.st_mtime
+
+    def put_file(self, key, path):
+        """Store a finished local file under `key`; the source is moved when it can be"""
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            with open(path, 'rb') as f:
+                _atomic_copy(f, target)
+
+    def put_bytes(self, key, data):
+        _atomic_copy(io.BytesIO(data), self._path(key))
+
+    def open(self, key):
+        """Iterator over the object's bytes in CHUNK_SIZE blocks"""
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return _file_chunks(open(path, 'rb'))
+
+    def delete(self, key):
+        for path in (self._path(key), os.path.join(self.root, key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def list(self):
+        """
+        Yield (key, byte_size, mtime) for every stored file. Leftover temp
+        files are listed by their path under the root, which delete() accepts.
+        """
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                info = os.stat(path)
+                if filename.endswith('.tmp'):
+                    filename = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield filename, info.st_size, info.st_mtime
+
+    def reshard(self):
+        """
+        Move every file to its shard directory for the current depth (flat
+        files from before sharding, or a previous depth); returns how many moved.
+        """
+        moved = 0
+        for directory, _, files in os.walk(self.root, topdown=False):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                target = self._path(filename)
+                if filename.endswith('.tmp') or path == target:
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(path, target)
+                moved += 1
+            if directory != self.root and not os.listdir(directory):
+                os.rmdir(directory)
+        return moved
+
+    def presigned_url(self, key, download_name=None, as_attachment=False, expires=300):
+        return None
+
+
+def _file_chunks(f):
+    with f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            yield chunk
+
+
+# ---------- SIGNATURE V4 ----------
+def _hmac(key, message):
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _uri_encode(value, safe='-_.~'):
+    return quote(value, safe=safe)
+
+
+def sign_v4(method, host, path, query, headers, payload_hash, access_key, secret_key, region,
+            now, service='s3', presign_expires=None):
+    """
+    AWS Signature Version 4. With `presign_expires` the signature goes into
+    the query string (a presigned URL) and the signed query string is
+    returned; otherwise the request headers including Authorization are.
+    """
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    headers = {name.lower(): str(value).strip() for name, value in headers.items()}
+    headers['host'] = host
+    query = dict(query)
+
+    if presign_expires is not None:
+        query.update({
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{access_key}/{scope}",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(presign_expires),
+            'X-Amz-SignedHeaders': ';'.join(sorted(headers)),
+        })
+    else:
+        headers['x-amz-date'] = amz_date
+        headers['x-amz-content-sha256'] = payload_hash
+
+    signed_headers = ';'.join(sorted(headers))
+    canonical_query = '&'.join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(query.items()))
+    canonical_request = '\n'.join([
+        method,
+        _uri_encode(path, safe='/-_.~'),
+        canonical_query,
+        ''.join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ])
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope,
+                                hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+
+    key = _hmac(f"AWS4{secret_key}".encode('utf-8'), date)
+    for part in (region, service, 'aws4_request'):
+        key = _hmac(key, part)
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    if presign_expires is not None:
+        return f"{canonical_query}&X-Amz-Signature={signature}"
+    headers['authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                                f"SignedHeaders={signed_headers}, Signature={signature}")
+    return headers
+
+
+# ---------- S3 ----------
+class _ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across requests and threads"""
+
+    def __init__(self, scheme, host, port, size, timeout):
+        self._factory = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self._host, self._port, self._timeout = host, port, timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.stats = {'created': 0, 'reused': 0}
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            self.stats['reused'] += 1
+            return conn
+        except queue.Empty:
+            self.stats['created'] += 1
+            return self._factory(self._host, self._port, timeout=self._timeout, blocksize=CHUNK_SIZE)
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+class S3Backend:
+    name = 's3'
+
+    def __init__(self, endpoint_url, bucket, access_key, secret_key, region='us-east-1', prefix='',
+                 pool_size=16, timeout=30):
+        parts = urlsplit(endpoint_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.endpoint_url = f"{self.scheme}://{self.host}"
+        self.pool = _ConnectionPool(self.scheme, parts.hostname, parts.port, pool_size, timeout)
+
+    def _path(self, key=None):
+        return f"/{self.bucket}" + (f"/{self.prefix}{key}" if key is not None else '')
+
+    def _request(self, method, key=None, query=None, headers=None, body=None, payload_hash=EMPTY_SHA256,
+                 stream=False):
+        """Signed request; returns (status, headers, body bytes) or, with `stream`, the open response"""
+        path = self._path(key)
+        query = query or {}
+        for attempt in range(2):
+            signed = sign_v4(method, self.host, path, query, headers or {}, payload_hash,
+                             self.access_key, self.secret_key, self.region, datetime.now(timezone.utc))
+            url = _uri_encode(path, safe='/-_.~')
+            if query:
+                url += '?' + '&'.join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(query.items()))
+            conn = self.pool.acquire()
+            try:
+                conn.request(method, url, body=body, headers=signed)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # A pooled keep-alive connection the server already closed: retry once on a fresh one
+                conn.close()
+                if attempt or (body is not None and not hasattr(body, 'seek')):
+                    raise
+                if hasattr(body, 'seek'):
+                    body.seek(0)
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if stream and response.status < 300:
+                return _PooledResponse(self.pool, conn, response)
+            data = response.read()
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(conn)
+            if response.status == 404:
+                raise FileNotFoundError(key)
+            if response.status >= 300:
+                raise StorageError(f"S3 {method} {path} failed: {response.status} {data[:200]!r}")
+            return response.status, response.headers, data
+
+    def exists(self, key):
+        try:
+            self._request('HEAD', key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stat(self, key):
+        _, headers, _ = self._request('HEAD', key)
+        modified = datetime.strptime(headers['Last-Modified'], '%a, %d %b %Y %H:%M:%S GMT')
+        return int(headers['Content-Length']), modified.replace(tzinfo=timezone.utc).timestamp()
+
+    def put_file(self, key, path):
+        """Stream a local file up in CHUNK_SIZE blocks, then remove it"""
+        with open(path, 'rb') as f:
+            self._request('PUT', key, body=f, payload_hash=UNSIGNED_PAYLOAD,
+                          headers={'Content-Length': os.fstat(f.fileno()).st_size,
+                                   'Content-Type': 'application/pdf'})
+        os.remove(path)
+
+    def put_bytes(self, key, data):
+        self._request('PUT', key, body=data, payload_hash=hashlib.sha256(data).hexdigest(),
+                      headers={'Content-Length': len(data), 'Content-Type': 'application/pdf'})
+
+    def open(self, key):
+        """Iterator streaming the object in CHUNK_SIZE blocks"""
+        return self._request('GET', key, stream=True)
+
+    def delete(self, key):
+        try:
+            self._request('DELETE', key)
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        """Yield (key, byte_size, mtime) for every object under the prefix"""
+        ns = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+        query = {'list-type': '2', 'prefix': self.prefix}
+        while True:
+            _, _, data = self._request('GET', query=query)
+            root = ElementTree.fromstring(data)
+            for item in root.iter(f'{ns}Contents'):
+                modified = item.findtext(f'{ns}LastModified').replace('Z', '+00:00')
+                yield (item.findtext(f'{ns}Key')[len(self.prefix):], int(item.findtext(f'{ns}Size')),
+                       datetime.fromisoformat(modified).timestamp())
+            token = root.findtext(f'{ns}NextContinuationToken')
+            if root.findtext(f'{ns}IsTruncated') != 'true' or not token:
+                return
+            query['continuation-token'] = token
+
+    def local_path(self, key):
+        return None
+
+    def presigned_url(self, key, download_name=None, as_attachment=False, expires=300):
+        """Time-limited GET URL for the object, so the browser downloads it without the app"""
+        query = {'response-content-type': 'application/pdf'}
+        if download_name:
+            disposition = 'attachment' if as_attachment else 'inline'
+            query['response-content-disposition'] = f"{disposition}; filename*=UTF-8''{quote(download_name)}"
+        path = self._path(key)
+        signed_query = sign_v4('GET', self.host, path, query, {}, UNSIGNED_PAYLOAD,
+                               self.access_key, self.secret_key, self.region,
+                               datetime.now(timezone.utc), presign_expires=expires)
+        return f"{self.endpoint_url}{_uri_encode(path, safe='/-_.~')}?{signed_query}"
+
+
+class _PooledResponse:
+    """A streaming GET body; the connection goes back to the pool once it is read or closed"""
+
+    def __init__(self, pool, conn, response):
+        self._pool, self._conn, self._response = pool, conn, response
+        self.headers = response.headers
+
+    def __iter__(self):
+        try:
+            for chunk in iter(lambda: self._response.read(CHUNK_SIZE), b''):
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if self._conn is None:
+            return
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool.release(self._conn)
+        else:
+            # Stopped mid-body: the connection can't be reused
+            self._conn.close()
+        self._conn = None
+
+
+def create_backend(settings):
+    """Backend for a settings dict (see storage.configure)"""
+    if settings.get('backend', 'filesystem') == 's3':
+        return S3Backend(settings['s3_endpoint_url'], settings['s3_bucket'], settings['s3_access_key_id'],
+                         settings['s3_secret_access_key'], region=settings.get('s3_region') or 'us-east-1',
+                         prefix=settings.get('s3_prefix') or '', pool_size=settings.get('s3_pool_size', 16))
+    return FilesystemBackend(settings.get('root', 'static/resumes'), shard_depth=settings.get('shard_depth', 2))
@@ -0,0 +1,77 @@
+"""
+Startup warm-up.
+
+ReportLab (canvas, font metrics, colors) and Pillow are imported on first
+use, so a worker boots quickly and its first PDF or PNG preview pays for
+them instead. `warm(app)` pays up front: it loads those libraries, compiles
+the templates, measures the fonts, builds the template picker images and
+compiles every Jinja template.
+
+- With PRELOAD_APP (gunicorn.conf.py runs create_app once in the gunicorn
+  master), all of that is shared copy-on-write by every forked worker.
+- With WARM_ON_START, each worker warms itself before serving.
+
+Nothing here opens a database connection or starts a thread; neither may
+cross a fork.
+"""
+from dataclasses import replace
+import io
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Live previews render at this scale by default (pdf_preview.render_preview)
+PREVIEW_SCALE = 0.75
+
+
+def warm_renderer():
+    """Draw the sample resume in every template: loads the canvas, colors and font metrics"""
+    from reportlab.pdfgen import canvas
+    from pdf_layout import layout_resume, draw_pages
+    from pdf_templates import get_template, template_names
+    from template_previews import SAMPLE_RESUME
+
+    for name in template_names():
+        template = get_template(name)
+        pages = layout_resume(replace(SAMPLE_RESUME, template_style=name), template)
+        pdf = canvas.Canvas(io.BytesIO(), pagesize=template.pagesize)
+        draw_pages(pdf, pages, template)
+        pdf.save()
+
+
+def warm_previews():
+    """Build missing template picker images and rasterize a live preview page per template"""
+    from pdf_layout import layout_resume
+    from pdf_preview import page_png, page_svg
+    from pdf_templates import get_template, template_names
+    import template_previews
+
+    template_previews.build_all()
+    for name in template_names():
+        template = get_template(name)
+        page = layout_resume(replace(template_previews.SAMPLE_RESUME, template_style=name), template)[0]
+        page_svg(page, template)
+        page_png(page, template, PREVIEW_SCALE)
+
+
+def warm_templates(app):
+    """Compile every Jinja template into the environment's cache"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def warm(app):
+    """Run every warm-up step; returns {step: seconds}"""
+    timings = {}
+    for step, fn in (('renderer', warm_renderer), ('previews', warm_previews),
+                     ('templates', lambda: warm_templates(app))):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            # A cold cache is slower, not broken: serve anyway
+            logger.error(f"Warm-up step {step} failed: {e}")
+        timings[step] = round(time.perf_counter() - start, 4)
+    logger.info(f"Warmed up in {sum(timings.values()):.3f}s: {timings}")
+    return timings